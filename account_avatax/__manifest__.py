@@ -6,15 +6,24 @@
     "summary": "Automatic Tax application using the Avalara Avatax Service",
     "license": "AGPL-3",
     "category": "Accounting",
-    "depends": ["account", "sale_stock", "base_geolocalize"],
+    "depends": [
+        "account",
+        "sale_stock",
+        "base_geolocalize",
+        "account_lookup_cache",
+    ],
     "data": [
         "security/avalara_salestax_security.xml",
         "security/ir.model.access.csv",
         "data/avalara_salestax_data.xml",
         "data/avalara_salestax_exemptions.xml",
+        "data/avalara_salestax_cron.xml",
         "wizard/avalara_salestax_ping_view.xml",
         "wizard/avalara_salestax_address_validate_view.xml",
+        "wizard/avalara_salestax_address_validate_multi_view.xml",
         "views/avalara_salestax_view.xml",
+        "views/avalara_salestax_backfill_view.xml",
+        "views/avalara_salestax_profile_view.xml",
         "views/partner_view.xml",
         "views/product_view.xml",
         "views/account_move_action.xml",
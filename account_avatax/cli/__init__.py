@@ -0,0 +1 @@
+from . import migrate_exemption_data
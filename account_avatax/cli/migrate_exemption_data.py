@@ -0,0 +1,50 @@
+import argparse
+import logging
+import time
+
+import odoo
+from odoo.cli import Command
+from odoo.tools import config
+
+from ..models.partner import EXEMPTION_MIGRATION_CHUNK
+
+_logger = logging.getLogger(__name__)
+
+
+class MigrateAvataxExemptionData(Command):
+    """Migrate the partner exemption data to the per company properties"""
+
+    def run(self, cmdargs):
+        parser = argparse.ArgumentParser(
+            prog="odoo-bin migrateavataxexemptiondata",
+            description=self.__doc__,
+            epilog="Each chunk of partners is committed, so the migration can"
+            " be interrupted and run again to resume it. Other arguments are"
+            " passed to the Odoo configuration, for instance -c odoo.conf -d"
+            " database",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=EXEMPTION_MIGRATION_CHUNK,
+            help="Number of partners migrated per transaction",
+        )
+        args, odoo_args = parser.parse_known_args(cmdargs)
+        config.parse_config(odoo_args)
+        dbname = config["db_name"]
+        if not dbname:
+            parser.error("a database is required, use -d")
+
+        start = time.time()
+        with odoo.api.Environment.manage():
+            registry = odoo.registry(dbname)
+            with registry.cursor() as cr:
+                env = odoo.api.Environment(cr, odoo.SUPERUSER_ID, {})
+                migrated = env["res.partner"]._migrate_exemption_data(
+                    chunk_size=args.chunk_size, commit=True
+                )
+        _logger.info(
+            "Migrated exemption data on %d partners in %.1fs",
+            migrated,
+            time.time() - start,
+        )
@@ -5,4 +5,7 @@ from . import account_move
 from . import account_fiscal_position
 from . import account_tax
 from . import res_company
+from . import res_country
 from . import avatax_rest_api
+from . import avalara_salestax_backfill
+from . import avalara_salestax_profile
@@ -128,35 +128,60 @@ class AccountMove(models.Model):
         ]
         return [x for x in lines if x]
 
+    def _avatax_prepare_transaction(self, commit=False):
+        """
+        Prepare the arguments to use for an Avatax transaction.
+        Returns a dict of keyword arguments for ``create_transaction``
+        """
+        self.ensure_one()
+        doc_type = self._get_avatax_doc_type(commit=commit)
+        return {
+            "doc_date": self.invoice_date or fields.Date.today(),
+            "doc_code": self.name,
+            "doc_type": doc_type,
+            "partner": self.partner_id,
+            "ship_from_address": (
+                self.warehouse_id.partner_id or self.company_id.partner_id
+            ),
+            "shipping_address": self.tax_address_id or self.partner_id,
+            "lines": self._avatax_prepare_lines(doc_type),
+            "user": self.user_id,
+            "exemption_number": self.exemption_code or None,
+            "exemption_code_name": self.exemption_code_id.code or None,
+            "commit": commit,
+            "invoice_date": self.get_origin_tax_date() or self.invoice_date,
+            # TODO: can we report self.invoice_doc_no?
+            "reference_code": self.name if self.type == "out_refund" else "",
+            "location_code": self.location_code or "",
+            "is_override": self.type == "out_refund",
+            "currency_id": self.currency_id,
+        }
+
+    def _avatax_get_reusable_result(self, transaction):
+        """
+        Hook returning a tax result already computed for the same
+        transaction, to use instead of requesting Avatax, or None.
+        """
+        return None
+
     # Same as v12
     def _avatax_compute_tax(self, commit=False):
         """ Contact REST API and recompute taxes for a Sale Order """
         self and self.ensure_one()
         Tax = self.env["account.tax"]
         avatax_config = self.company_id.get_avatax_config_company()
-        doc_type = self._get_avatax_doc_type(commit=commit)
-        tax_date = self.get_origin_tax_date() or self.invoice_date
-        taxable_lines = self._avatax_prepare_lines(doc_type)
-        tax_result = avatax_config.create_transaction(
-            self.invoice_date or fields.Date.today(),
-            self.name,
-            doc_type,
-            self.partner_id,
-            self.warehouse_id.partner_id or self.company_id.partner_id,
-            self.tax_address_id or self.partner_id,
-            taxable_lines,
-            self.user_id,
-            self.exemption_code or None,
-            self.exemption_code_id.code or None,
-            commit,
-            tax_date,
-            # TODO: can we report self.invoice_doc_no?
-            self.name if self.type == "out_refund" else "",
-            self.location_code or "",
-            is_override=self.type == "out_refund",
-            currency_id=self.currency_id,
-            ignore_error=300 if commit else None,
+        profiler = self.env["avalara.salestax.profile"]._get_profiler(
+            self, avatax_config
         )
+        doc_type = self._get_avatax_doc_type(commit=commit)
+        with profiler.phase("prepare"):
+            transaction = self._avatax_prepare_transaction(commit=commit)
+        with profiler.phase("request"):
+            tax_result = not commit and self._avatax_get_reusable_result(transaction)
+            if not tax_result:
+                tax_result = avatax_config.create_transaction(
+                    ignore_error=300 if commit else None, **transaction
+                )
         # If commiting, and document exists, try unvoiding it
         # Error number 300 = GetTaxError, Expected Saved|Posted
         if commit and tax_result.get("number") == 300:
@@ -167,36 +192,47 @@ class AccountMove(models.Model):
                 self.name,
                 doc_type,
             )
-            avatax_config.unvoid_transaction(self.name, doc_type)
-            avatax_config.commit_transaction(self.name, doc_type)
+            with profiler.phase("request"):
+                avatax_config.unvoid_transaction(self.name, doc_type)
+                avatax_config.commit_transaction(self.name, doc_type)
+            profiler.save(doc_type, len(transaction["lines"]))
             return tax_result
 
         tax_result_lines = {int(x["lineNumber"]): x for x in tax_result["lines"]}
         taxes_to_set = []
+        line_amounts = []
         lines = self.invoice_line_ids.filtered(lambda l: not l.display_type)
-        for index, line in enumerate(lines):
-            tax_result_line = tax_result_lines.get(line.id)
-            if tax_result_line:
-                rate = tax_result_line.get("rate", 0.0)
-                tax = Tax.get_avalara_tax(rate, doc_type)
-                if tax and tax not in line.tax_ids:
-                    line_taxes = line.tax_ids.filtered(lambda x: not x.is_avatax)
-                    taxes_to_set.append((index, line_taxes | tax))
-                line.avatax_amt_line = tax_result_line["tax"]
-        self.avatax_amount = tax_result["totalTax"]
-        self.with_context(
-            avatax_invoice=self, check_move_validity=False
-        )._recompute_dynamic_lines(True, False)
-        self.line_ids.mapped("move_id")._check_balanced()
+        with profiler.phase("tax_lookup"):
+            for index, line in enumerate(lines):
+                tax_result_line = tax_result_lines.get(line.id)
+                if tax_result_line:
+                    rate = tax_result_line.get("rate", 0.0)
+                    tax = Tax.get_avalara_tax(rate, doc_type)
+                    if tax and tax not in line.tax_ids:
+                        line_taxes = line.tax_ids.filtered(lambda x: not x.is_avatax)
+                        taxes_to_set.append((index, line_taxes | tax))
+                    line_amounts.append((line, tax_result_line["tax"]))
+        with profiler.phase("apply"):
+            for line, tax_amt in line_amounts:
+                line.avatax_amt_line = tax_amt
+            self.avatax_amount = tax_result["totalTax"]
+        with profiler.phase("recompute"):
+            self.with_context(
+                avatax_invoice=self, check_move_validity=False
+            )._recompute_dynamic_lines(True, False)
+        with profiler.phase("check_balanced"):
+            self.line_ids.mapped("move_id")._check_balanced()
         # Set Taxes on lines in a way that properly triggers onchanges
         # This same approach is also used by the official account_taxcloud connector
-        with Form(self) as move_form:
-            for index, taxes in taxes_to_set:
-                with move_form.invoice_line_ids.edit(index) as line_form:
-                    line_form.tax_ids.clear()
-                    for tax in taxes:
-                        line_form.tax_ids.add(tax)
+        with profiler.phase("form"):
+            with Form(self) as move_form:
+                for index, taxes in taxes_to_set:
+                    with move_form.invoice_line_ids.edit(index) as line_form:
+                        line_form.tax_ids.clear()
+                        for tax in taxes:
+                            line_form.tax_ids.add(tax)
 
+        profiler.save(doc_type, len(transaction["lines"]))
         return tax_result
 
     # Same as v12
@@ -223,7 +259,7 @@ class AccountMove(models.Model):
         avatax_config = self.company_id.get_avatax_config_company()
         if avatax_config and avatax_config.force_address_validation:
             for addr in [self.partner_id, self.partner_shipping_id]:
-                if not addr.date_validation:
+                if not addr._is_avatax_address_validated():
                     # The Validate action will be interrupted
                     # if the address is not validated
                     return addr.button_avatax_validate_address()
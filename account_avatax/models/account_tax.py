@@ -4,6 +4,12 @@ from odoo import _, api, fields, models
 from odoo.exceptions import UserError
 from odoo.tools.float_utils import float_compare
 
+# Lookup cache namespace of the Avatax taxes by rate
+TAX_CACHE = "account.tax.avalara"
+
+# Document types the Avatax taxes are preloaded for
+WARM_UP_DOC_TYPES = ["SalesOrder", "SalesInvoice", "ReturnOrder", "ReturnInvoice"]
+
 
 class AccountTax(models.Model):
     """Inherit to implement the tax using avatax API"""
@@ -23,9 +29,50 @@ class AccountTax(models.Model):
     def _get_avalara_tax_name(self, tax_rate, doc_type=None):
         return _("{}%*").format(str(tax_rate))
 
+    @api.model_create_multi
+    def create(self, vals_list):
+        taxes = super().create(vals_list)
+        self.env["account.lookup.cache"].invalidate(TAX_CACHE)
+        return taxes
+
+    def write(self, vals):
+        result = super().write(vals)
+        self.env["account.lookup.cache"].invalidate(TAX_CACHE)
+        return result
+
+    def unlink(self):
+        result = super().unlink()
+        self.env["account.lookup.cache"].invalidate(TAX_CACHE)
+        return result
+
+    @api.model
+    def _get_avalara_tax_cache_key(self, tax_rate, doc_type):
+        return (tuple(sorted(self.env.companies.ids)), tax_rate, doc_type)
+
+    @api.model
+    def _warm_up_avalara_taxes(self, company):
+        """ Preload the active Avatax taxes of the company, yields for each """
+        Tax = self.with_context(allowed_company_ids=company.ids)
+        lookup_cache = self.env["account.lookup.cache"]
+        taxes = Tax.search([("is_avatax", "=", True), ("company_id", "=", company.id)])
+        for tax_rate in sorted(set(taxes.mapped("amount")) - {0.0}):
+            for doc_type in WARM_UP_DOC_TYPES:
+                tax = Tax.with_context(active_test=False).search(
+                    Tax._get_avalara_tax_domain(tax_rate, doc_type), limit=1
+                )
+                if tax.active:
+                    key = Tax._get_avalara_tax_cache_key(tax_rate, doc_type)
+                    lookup_cache.set(TAX_CACHE, key, tax.id)
+                    yield tax
+
     @api.model
     def get_avalara_tax(self, tax_rate, doc_type):
         if tax_rate:
+            lookup_cache = self.env["account.lookup.cache"]
+            key = self._get_avalara_tax_cache_key(tax_rate, doc_type)
+            tax_id = lookup_cache.get(TAX_CACHE, key)
+            if tax_id:
+                return self.browse(tax_id)
             tax = self.with_context(active_test=False).search(
                 self._get_avalara_tax_domain(tax_rate, doc_type), limit=1
             )
@@ -39,6 +86,7 @@ class AccountTax(models.Model):
                 # If you get a unique constraint error here,
                 # check the data for your existing Avatax taxes.
                 tax.name = self._get_avalara_tax_name(tax_rate, doc_type)
+            lookup_cache.set(TAX_CACHE, key, tax.id)
             return tax
         else:
             return self
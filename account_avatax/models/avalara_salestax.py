@@ -1,9 +1,11 @@
+import hashlib
 import logging
 
 from odoo import _, api, fields, models
 from odoo.exceptions import UserError
 
-from .avatax_rest_api import AvaTaxRESTService
+from .avatax_rest_api import ADDRESS_CACHE, AvaTaxRESTService
+from .res_company import CONFIG_CACHE
 
 _logger = logging.getLogger(__name__)
 
@@ -131,6 +133,11 @@ class AvalaraSalestax(models.Model):
         default=lambda self: self.env.company,
         help="Company which has subscribed to the AvaTax service",
     )
+    profile_tax_computation = fields.Boolean(
+        "Profile Tax Computation",
+        help="Record the time and SQL queries spent on each phase"
+        " of the document tax computations, for performance analysis",
+    )
     upc_enable = fields.Boolean(
         "Enable UPC Taxability",
         help="Allows ean13 to be reported in place of Item Reference"
@@ -152,6 +159,67 @@ class AvalaraSalestax(models.Model):
         ),
     ]
 
+    @api.model_create_multi
+    def create(self, vals_list):
+        configs = super().create(vals_list)
+        self._invalidate_lookup_caches()
+        return configs
+
+    def write(self, vals):
+        result = super().write(vals)
+        self._invalidate_lookup_caches()
+        return result
+
+    def unlink(self):
+        result = super().unlink()
+        self._invalidate_lookup_caches()
+        return result
+
+    def _register_hook(self):
+        super()._register_hook()
+        self.env["account.lookup.cache"]._warm_up_on_load(
+            "Avatax", self._get_warm_up_loaders()
+        )
+
+    @api.model
+    def _get_warm_up_loaders(self):
+        """
+        Lookups preloaded when the registry is loaded, see
+        ``account.lookup.cache``: the codes of the countries and states,
+        then the configuration and Avatax taxes of each company.
+        """
+        companies = self.env["res.company"].search([])
+        return [
+            ("code maps", self._warm_up_code_maps()),
+            ("configurations", self._warm_up_configs(companies)),
+            ("taxes", self._warm_up_taxes(companies)),
+        ]
+
+    @api.model
+    def _warm_up_code_maps(self):
+        Partner = self.env["res.partner"]
+        yield Partner._get_country_ids_by_code()
+        yield Partner._get_state_ids_by_code()
+
+    @api.model
+    def _warm_up_configs(self, companies):
+        for company in companies:
+            company = company.with_context(allowed_company_ids=company.ids)
+            yield company.get_avatax_config_company()
+
+    @api.model
+    def _warm_up_taxes(self, companies):
+        Tax = self.env["account.tax"]
+        for company in companies:
+            company = company.with_context(allowed_company_ids=company.ids)
+            if company.get_avatax_config_company():
+                yield from Tax._warm_up_avalara_taxes(company)
+
+    @api.model
+    def _invalidate_lookup_caches(self):
+        """ Drop the configurations of the companies and validated addresses """
+        self.env["account.lookup.cache"].invalidate(CONFIG_CACHE, ADDRESS_CACHE)
+
     def get_avatax_rest_service(self):
         self.ensure_one()
         if self.disable_tax_calculation:
@@ -167,33 +235,14 @@ class AvalaraSalestax(models.Model):
             self.logging,
         )
 
-    def create_transaction(
-        self,
-        doc_date,
-        doc_code,
-        doc_type,
-        partner,
-        ship_from_address,
-        shipping_address,
-        lines,
-        user=None,
-        exemption_number=None,
-        exemption_code_name=None,
-        commit=False,
-        invoice_date=None,
-        reference_code=None,
-        location_code=None,
-        is_override=None,
-        currency_id=None,
-        ignore_error=None,
-    ):
+    def _check_transaction(self, partner, ship_from_address, shipping_address):
+        """
+        Check the partner and addresses of a transaction, generating the
+        customer code and validating the addresses when configured to.
+        """
         self.ensure_one()
         avatax_config = self
 
-        currency_code = self.env.user.company_id.currency_id.name
-        if currency_id:
-            currency_code = currency_id.name
-
         if not partner.customer_code:
             if not avatax_config.auto_generate_customer_code:
                 raise UserError(
@@ -217,9 +266,12 @@ class AvalaraSalestax(models.Model):
             raise UserError(_("There is no Company address defined."))
 
         if avatax_config.validation_on_save:
-            for address in [partner, shipping_address, ship_from_address]:
-                if not address.date_validation:
-                    address.multi_address_validation()
+            # Only the addresses changed since their validation are sent again
+            addresses = (partner | shipping_address | ship_from_address).filtered(
+                lambda a: not a._is_avatax_address_validated()
+            )
+            if addresses:
+                addresses.multi_address_validation(avatax_config=avatax_config)
 
         # this condition is required, in case user select force address validation
         # on AvaTax API Configuration
@@ -227,7 +279,7 @@ class AvalaraSalestax(models.Model):
             avatax_config.force_address_validation
             and not avatax_config.disable_address_validation
         ):
-            if not shipping_address.date_validation:
+            if not shipping_address._is_avatax_address_validated():
                 raise UserError(
                     _(
                         "Please validate the shipping address for the partner %s."
@@ -236,9 +288,33 @@ class AvalaraSalestax(models.Model):
                 )
 
             # if not avatax_config.address_validation:
-            if not ship_from_address.date_validation:
+            if not ship_from_address._is_avatax_address_validated():
                 raise UserError(_("Please validate the origin warehouse address."))
 
+    def create_transaction(
+        self,
+        doc_date,
+        doc_code,
+        doc_type,
+        partner,
+        ship_from_address,
+        shipping_address,
+        lines,
+        user=None,
+        exemption_number=None,
+        exemption_code_name=None,
+        commit=False,
+        invoice_date=None,
+        reference_code=None,
+        location_code=None,
+        is_override=None,
+        currency_id=None,
+        ignore_error=None,
+    ):
+        self.ensure_one()
+        avatax_config = self
+        avatax_config._check_transaction(partner, ship_from_address, shipping_address)
+
         if avatax_config.disable_tax_calculation:
             _logger.info(
                 "Avatax tax calculation is disabled. Skipping %s %s.",
@@ -254,8 +330,170 @@ class AvalaraSalestax(models.Model):
             )
 
         avatax = self.get_avatax_rest_service()
-        result = avatax.get_tax(
-            avatax_config.company_code,
+        tax_document = self._prepare_transaction_document(
+            doc_date,
+            doc_code,
+            doc_type,
+            partner,
+            ship_from_address,
+            shipping_address,
+            lines,
+            user=user,
+            exemption_number=exemption_number,
+            exemption_code_name=exemption_code_name,
+            commit=commit,
+            invoice_date=invoice_date,
+            reference_code=reference_code,
+            location_code=location_code,
+            is_override=is_override,
+            currency_id=currency_id,
+            avatax=avatax,
+        )
+        result = avatax.create_transaction_document(
+            tax_document, ignore_error=ignore_error
+        )
+        return result
+
+    def create_transactions(
+        self, transactions, ignore_error=None, max_workers=4, max_rate=None
+    ):
+        """
+        Create the transactions of several documents, sending the requests
+        concurrently. ``transactions`` are dicts of ``create_transaction``
+        keyword arguments. The customer codes and the addresses of all the
+        documents are generated and validated together, beforehand, and a
+        failed address only fails the documents using it. Returns a list, in
+        the same order as the transactions, holding either the tax result or
+        the exception raised for it.
+        """
+        self.ensure_one()
+        if self.disable_tax_calculation:
+            _logger.info(
+                "Avatax tax calculation is disabled. Skipping %d documents.",
+                len(transactions),
+            )
+            return [False] * len(transactions)
+        Partner = self.env["res.partner"]
+        partners = Partner.union(*[x["partner"] for x in transactions])
+        if self.auto_generate_customer_code:
+            partners.filtered(lambda p: not p.customer_code).generate_cust_code()
+        address_errors = {}
+        if self.validation_on_save:
+            addresses = partners.union(
+                *[x["shipping_address"] | x["ship_from_address"] for x in transactions]
+            ).filtered(lambda a: not a._is_avatax_address_validated())
+            addresses = addresses._filter_avatax_addresses()
+            if addresses:
+                validations = addresses._avatax_validate_addresses(
+                    self, max_workers=max_workers
+                )
+                # A failed address only fails the documents using it
+                address_errors = addresses._avatax_write_validated_addresses(
+                    validations
+                )
+        avatax = self.get_avatax_rest_service()
+        results = [None] * len(transactions)
+        documents = []
+        for index, transaction in enumerate(transactions):
+            addresses = (
+                transaction["partner"]
+                | transaction["shipping_address"]
+                | transaction["ship_from_address"]
+            )
+            errors = [address_errors[a] for a in addresses if a in address_errors]
+            if errors:
+                results[index] = errors[0]
+                continue
+            try:
+                self._check_transaction(
+                    transaction["partner"],
+                    transaction["ship_from_address"],
+                    transaction["shipping_address"],
+                )
+                tax_document = self._prepare_transaction_document(
+                    avatax=avatax, **transaction
+                )
+            except UserError as e:
+                results[index] = e
+                continue
+            documents.append((index, tax_document))
+        responses = avatax.submit_transactions(
+            [tax_document for __, tax_document in documents],
+            max_workers=max_workers,
+            max_rate=max_rate,
+        )
+        for (index, __), response in zip(documents, responses):
+            try:
+                if isinstance(response, Exception):
+                    raise response
+                result = avatax.get_result(response, ignore_error=ignore_error)
+                results[index] = avatax._enrich_tax_result(result)
+            except Exception as e:
+                results[index] = e
+        return results
+
+    @api.model
+    def _get_transaction_fingerprint(self, transaction, line_key):
+        """
+        Fingerprint of what the taxes of a transaction depend on: customer,
+        addresses, exemption, currency, month and lines. ``transaction`` is
+        a dict of ``create_transaction`` keyword arguments, and ``line_key``
+        returns the key identifying the record of a line across documents.
+        """
+        doc_date = fields.Date.to_date(transaction["doc_date"])
+        currency = transaction.get("currency_id")
+        data = [
+            transaction["partner"].customer_code,
+            transaction["ship_from_address"]._get_avatax_address(),
+            transaction["shipping_address"]._get_avatax_address(),
+            transaction.get("exemption_number"),
+            transaction.get("exemption_code_name"),
+            currency and currency.name,
+            doc_date and doc_date.strftime("%Y-%m"),
+            sorted(
+                (
+                    line_key(line["id"]) or 0,
+                    line["itemcode"],
+                    line["qty"],
+                    round(line["amount"], 2),
+                    line["tax_code"] or "",
+                )
+                for line in transaction["lines"]
+            ),
+        ]
+        return hashlib.md5(repr(data).encode("utf-8")).hexdigest()
+
+    def _prepare_transaction_document(
+        self,
+        doc_date,
+        doc_code,
+        doc_type,
+        partner,
+        ship_from_address,
+        shipping_address,
+        lines,
+        user=None,
+        exemption_number=None,
+        exemption_code_name=None,
+        commit=False,
+        invoice_date=None,
+        reference_code=None,
+        location_code=None,
+        is_override=None,
+        currency_id=None,
+        avatax=None,
+    ):
+        """
+        Build the CreateTransaction request document for a Odoo document,
+        with no checks or side effects on the partners or the document.
+        """
+        self.ensure_one()
+        currency_code = self.env.user.company_id.currency_id.name
+        if currency_id:
+            currency_code = currency_id.name
+        avatax = avatax or self.get_avatax_rest_service()
+        return avatax._prepare_tax_document(
+            self.company_code,
             doc_date,
             doc_type,
             partner.customer_code,
@@ -266,16 +504,14 @@ class AvalaraSalestax(models.Model):
             exemption_number,
             exemption_code_name,
             user and user.name or None,
-            commit and not avatax_config.disable_tax_reporting,
+            commit and not self.disable_tax_reporting,
             invoice_date,
             reference_code,
             location_code,
             currency_code,
             partner.vat or None,
             is_override,
-            ignore_error=ignore_error,
         )
-        return result
 
     def commit_transaction(self, doc_code, doc_type):
         self.ensure_one()
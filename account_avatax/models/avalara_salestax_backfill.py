@@ -0,0 +1,285 @@
+import logging
+import threading
+
+import psycopg2
+
+from odoo import _, api, fields, models
+from odoo.exceptions import UserError
+
+_logger = logging.getLogger(__name__)
+
+
+class AvalaraSalestaxBackfill(models.Model):
+    """
+    Record posted invoices in the Avatax service, in batch.
+
+    Meant for onboarding, when the historical invoices need to be committed
+    to Avatax. The invoices are processed in chunks, ordered by id,
+    and the last processed id is stored so that an interrupted job
+    resumes where it stopped. The invoices that failed are kept, to be
+    tried again once the cause is fixed. The invoices are not modified.
+    """
+
+    _name = "avalara.salestax.backfill"
+    _description = "AvaTax Invoice Backfill"
+    _order = "id desc"
+
+    name = fields.Char(
+        required=True, readonly=True, states={"draft": [("readonly", False)]}
+    )
+    company_id = fields.Many2one(
+        "res.company",
+        "Company",
+        required=True,
+        default=lambda self: self.env.company,
+        readonly=True,
+        states={"draft": [("readonly", False)]},
+    )
+    date_from = fields.Date(
+        "Invoice Date From", readonly=True, states={"draft": [("readonly", False)]}
+    )
+    date_to = fields.Date(
+        "Invoice Date To", readonly=True, states={"draft": [("readonly", False)]}
+    )
+    chunk_size = fields.Integer(
+        default=100, help="Number of invoices processed, and committed, at a time"
+    )
+    max_workers = fields.Integer(
+        "Concurrent Requests",
+        default=4,
+        help="Maximum number of requests sent to Avatax in parallel",
+    )
+    max_rate = fields.Float(
+        "Maximum Requests per Second",
+        default=10.0,
+        help="Rate limit for the requests sent to Avatax. Zero means no limit.",
+    )
+    state = fields.Selection(
+        [
+            ("draft", "Draft"),
+            ("running", "Running"),
+            ("done", "Done"),
+            ("error", "Error"),
+            ("cancel", "Cancelled"),
+        ],
+        default="draft",
+        required=True,
+        readonly=True,
+        copy=False,
+    )
+    last_move_id = fields.Integer(
+        "Last Processed Invoice ID",
+        readonly=True,
+        copy=False,
+        help="Processing resumes from the invoices after this one",
+    )
+    move_done_count = fields.Integer("Invoices Recorded", readonly=True, copy=False)
+    move_error_count = fields.Integer("Invoices Failed", readonly=True, copy=False)
+    failed_move_ids = fields.Many2many(
+        "account.move",
+        "avalara_salestax_backfill_failed_move_rel",
+        "backfill_id",
+        "move_id",
+        "Failed Invoices",
+        readonly=True,
+        copy=False,
+    )
+    retry_move_ids = fields.Many2many(
+        "account.move",
+        "avalara_salestax_backfill_retry_move_rel",
+        "backfill_id",
+        "move_id",
+        "Invoices to Retry",
+        readonly=True,
+        copy=False,
+        help="Failed invoices processed again, before the remaining ones",
+    )
+    error_log = fields.Text(readonly=True, copy=False)
+
+    def _get_move_domain(self):
+        self.ensure_one()
+        domain = [
+            ("company_id", "=", self.company_id.id),
+            ("state", "=", "posted"),
+            ("type", "in", ["out_invoice", "out_refund"]),
+            ("fiscal_position_id.is_avatax", "=", True),
+            ("id", ">", self.last_move_id),
+        ]
+        if self.date_from:
+            domain.append(("invoice_date", ">=", self.date_from))
+        if self.date_to:
+            domain.append(("invoice_date", "<=", self.date_to))
+        return domain
+
+    def _commit_progress(self):
+        """ Commit after each chunk, so that an interruption loses no work """
+        if not getattr(threading.currentThread(), "testing", False):
+            self.env.cr.commit()  # pylint: disable=invalid-commit
+
+    def _prepare_backfill_documents(self, moves, avatax_config, avatax):
+        """
+        Build the CreateTransaction documents for the invoices.
+        Returns the (invoice, document) pairs and the (invoice, error) pairs
+        """
+        documents, errors = [], []
+        missing_code = moves.mapped("partner_id").filtered(
+            lambda p: not p.customer_code
+        )
+        if missing_code and avatax_config.auto_generate_customer_code:
+            missing_code.generate_cust_code()
+        for move in moves:
+            if not move.partner_id.customer_code:
+                errors.append((move, _("Customer Code not defined")))
+                continue
+            try:
+                tax_document = avatax_config._prepare_transaction_document(
+                    avatax=avatax, **move._avatax_prepare_transaction(commit=True)
+                )
+            except UserError as e:
+                errors.append((move, e.name))
+                continue
+            documents.append((move, tax_document))
+        return documents, errors
+
+    def _get_chunk_moves(self):
+        """
+        The next invoices to process: the failed invoices to retry first,
+        then the invoices after the last processed one.
+        Returns the invoices, and whether they are retried.
+        """
+        self.ensure_one()
+        moves = self.retry_move_ids.sorted("id")[: self.chunk_size]
+        if moves:
+            return moves, True
+        moves = self.env["account.move"].search(
+            self._get_move_domain(), order="id", limit=self.chunk_size
+        )
+        return moves, False
+
+    def _log_errors(self, log_lines):
+        self.ensure_one()
+        self.error_log = "\n".join(filter(None, [self.error_log] + log_lines))
+
+    def _process_chunk(self):
+        """
+        Record the next chunk of invoices in Avatax.
+        Returns False when there are no invoices left to process,
+        or when the backfill cannot go on.
+        """
+        self.ensure_one()
+        moves, retry = self._get_chunk_moves()
+        if not moves:
+            self.state = "done"
+            return False
+        avatax_config = self.company_id.get_avatax_config_company()
+        if not avatax_config:
+            # Stop there, rather than failing the scheduled action on each run
+            message = (
+                _("Company %s has no Avatax configuration.")
+                % self.company_id.display_name
+            )
+            _logger.warning("Avatax backfill %s: %s", self.name, message)
+            self._log_errors([message])
+            self.state = "error"
+            return False
+        avatax = avatax_config.get_avatax_rest_service()
+        documents, errors = self._prepare_backfill_documents(
+            moves, avatax_config, avatax
+        )
+        responses = avatax.submit_transactions(
+            [tax_document for __, tax_document in documents],
+            max_workers=self.max_workers,
+            max_rate=self.max_rate,
+        )
+        done = self.env["account.move"]
+        for (move, __), response in zip(documents, responses):
+            try:
+                if isinstance(response, Exception):
+                    raise response
+                # Error number 300 = GetTaxError, Expected Saved|Posted
+                # The document is already recorded in Avatax
+                avatax.get_result(response, ignore_error=300)
+                done |= move
+            except Exception as e:
+                errors.append((move, getattr(e, "name", None) or str(e)))
+        failed = self.env["account.move"].browse([move.id for move, __ in errors])
+        self._log_errors(["%s: %s" % (move.name, error) for move, error in errors])
+        failed_moves = (self.failed_move_ids - done) | failed
+        vals = {
+            "move_done_count": self.move_done_count + len(done),
+            "move_error_count": len(failed_moves),
+            "failed_move_ids": [(6, 0, failed_moves.ids)],
+            "retry_move_ids": [(6, 0, (self.retry_move_ids - moves).ids)],
+        }
+        if not retry:
+            vals["last_move_id"] = moves[-1].id
+        self.write(vals)
+        _logger.info(
+            "Avatax backfill %s: %d invoices recorded, %d failed, up to id %d",
+            self.name,
+            len(done),
+            len(errors),
+            self.last_move_id,
+        )
+        return True
+
+    def _process(self):
+        for backfill in self.filtered(lambda x: x.state == "running"):
+            while backfill._process_chunk():
+                backfill._commit_progress()
+            backfill._commit_progress()
+        return True
+
+    def action_start(self):
+        self.filtered(lambda x: x.state == "draft").write({"state": "running"})
+        return True
+
+    def action_process(self):
+        """
+        Start the backfills, and have the scheduled action process them
+        right away, rather than within the request.
+        """
+        self.action_start()
+        cron = self.env.ref(
+            "account_avatax.ir_cron_avalara_salestax_backfill",
+            raise_if_not_found=False,
+        )
+        if not cron:
+            return True
+        try:
+            with self.env.cr.savepoint():
+                self.env.cr.execute(
+                    "SELECT id FROM ir_cron WHERE id = %s FOR UPDATE NOWAIT",
+                    (cron.id,),
+                )
+                cron.sudo().write({"nextcall": fields.Datetime.now()})
+        except psycopg2.OperationalError:
+            # The scheduled action is running, its next run processes them
+            _logger.info("Avatax backfill scheduled action already running")
+        return True
+
+    def action_retry_failed(self):
+        """ Process the failed invoices again, before the remaining ones """
+        backfills = self.filtered(
+            lambda x: x.failed_move_ids and x.state in ("running", "done")
+        )
+        for backfill in backfills:
+            backfill.write(
+                {
+                    "retry_move_ids": [(6, 0, backfill.failed_move_ids.ids)],
+                    "state": "running",
+                }
+            )
+        return True
+
+    def action_cancel(self):
+        self.write({"state": "cancel"})
+        return True
+
+    def action_draft(self):
+        self.write({"state": "draft"})
+        return True
+
+    @api.model
+    def _cron_process_backfills(self):
+        self.search([("state", "=", "running")])._process()
@@ -0,0 +1,129 @@
+import time
+from contextlib import contextmanager
+
+from odoo import api, fields, models
+
+PROFILE_PHASES = [
+    ("prepare", "Line Preparation"),
+    ("request", "Avatax Request"),
+    ("tax_lookup", "Tax Lookup"),
+    ("apply", "Result Application"),
+    ("recompute", "Dynamic Lines Recompute"),
+    ("check_balanced", "Balance Check"),
+    ("form", "Form Replay"),
+]
+
+
+class AvataxProfiler:
+    """
+    Time the phases of an Avatax tax computation, and count their SQL queries.
+
+    When disabled, ``phase()`` is a no-op, so instrumented code
+    costs nothing unless profiling was requested.
+    """
+
+    def __init__(self, record, enabled=False):
+        self.record = record
+        self.enabled = enabled
+        self.phases = []
+
+    @contextmanager
+    def phase(self, name):
+        if not self.enabled:
+            yield
+            return
+        cr = self.record.env.cr
+        queries = cr.sql_log_count
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases.append(
+                (
+                    name,
+                    (time.perf_counter() - start) * 1000.0,
+                    cr.sql_log_count - queries,
+                )
+            )
+
+    def save(self, doc_type=None, line_count=0):
+        """ Store the timing record, if profiling was enabled """
+        if not self.enabled or not self.phases:
+            return False
+        record = self.record
+        return (
+            record.env["avalara.salestax.profile"]
+            .sudo()
+            .create(
+                {
+                    "name": record.display_name,
+                    "res_model": record._name,
+                    "res_id": record.id,
+                    "company_id": record.company_id.id,
+                    "doc_type": doc_type,
+                    "line_count": line_count,
+                    "phase_ids": [
+                        (0, 0, {"phase": name, "duration": duration, "query_count": n})
+                        for name, duration, n in self.phases
+                    ],
+                }
+            )
+        )
+
+
+class AvalaraSalestaxProfile(models.Model):
+    _name = "avalara.salestax.profile"
+    _description = "AvaTax Tax Computation Profile"
+    _order = "id desc"
+
+    name = fields.Char("Document", readonly=True)
+    res_model = fields.Char("Model", readonly=True, index=True)
+    res_id = fields.Integer("Record ID", readonly=True)
+    company_id = fields.Many2one("res.company", "Company", readonly=True)
+    doc_type = fields.Char("Document Type", readonly=True)
+    line_count = fields.Integer("Lines", readonly=True)
+    phase_ids = fields.One2many(
+        "avalara.salestax.profile.phase", "profile_id", "Phases", readonly=True
+    )
+    duration = fields.Float(
+        "Duration (ms)", compute="_compute_totals", store=True, digits=(16, 1)
+    )
+    query_count = fields.Integer("SQL Queries", compute="_compute_totals", store=True)
+
+    @api.depends("phase_ids.duration", "phase_ids.query_count")
+    def _compute_totals(self):
+        for profile in self:
+            profile.duration = sum(profile.phase_ids.mapped("duration"))
+            profile.query_count = sum(profile.phase_ids.mapped("query_count"))
+
+    @api.model
+    def _get_profiler(self, record, avatax_config=None):
+        """
+        Return a profiler for the tax computation of a document.
+        Profiling is enabled by the ``avatax_profile`` context key,
+        or by the Avatax configuration.
+        """
+        enabled = bool(
+            self.env.context.get("avatax_profile")
+            or avatax_config
+            and avatax_config.profile_tax_computation
+        )
+        return AvataxProfiler(record, enabled=enabled)
+
+
+class AvalaraSalestaxProfilePhase(models.Model):
+    _name = "avalara.salestax.profile.phase"
+    _description = "AvaTax Tax Computation Profile Phase"
+    _order = "profile_id desc, id"
+
+    profile_id = fields.Many2one(
+        "avalara.salestax.profile",
+        "Profile",
+        required=True,
+        ondelete="cascade",
+        index=True,
+    )
+    res_model = fields.Char(related="profile_id.res_model", store=True)
+    phase = fields.Selection(PROFILE_PHASES, required=True)
+    duration = fields.Float("Duration (ms)", digits=(16, 1))
+    query_count = fields.Integer("SQL Queries")
@@ -3,6 +3,9 @@
 import logging
 import pprint
 import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 
 from odoo import _, fields, tools
 from odoo.exceptions import UserError
@@ -15,6 +18,28 @@ except Exception:
 
 _logger = logging.getLogger(__name__)
 
+# Lookup cache namespace of the validated addresses
+ADDRESS_CACHE = "avalara.salestax.address"
+
+
+class _RateLimiter:
+    """ Spread calls evenly so that at most ``max_rate`` start per second """
+
+    def __init__(self, max_rate=None):
+        self.interval = 1.0 / max_rate if max_rate else 0.0
+        self.next_call = 0.0
+        self.lock = threading.Lock()
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self.lock:
+            now = time.monotonic()
+            delay = self.next_call - now
+            self.next_call = max(now, self.next_call) + self.interval
+        if delay > 0:
+            time.sleep(delay)
+
 
 class AvaTaxRESTService:
     def __init__(
@@ -134,9 +159,10 @@ class AvaTaxRESTService:
             raise UserError(_("The user or account could not be authenticated"))
         return res
 
-    def validate_rest_address(
+    def _prepare_address_data(
         self, street, street2, city, zip_code, state_code, country_code
     ):
+        """ Check the address can be validated, and build the ResolveAddress data """
         if self.config.disable_address_validation:
             raise UserError(
                 _(
@@ -155,7 +181,7 @@ class AvaTaxRESTService:
                 )
             )
         textcase = "Upper" if self.config.result_in_uppercase else "Mixed"
-        partner_data = {
+        return {
             "line1": street or "",
             "line2": street2 or "",
             "city": city or "",
@@ -164,7 +190,82 @@ class AvaTaxRESTService:
             "country": country_code or "",
             "textcase": textcase,
         }
-        response_partner = self.client.resolve_address(partner_data)
+
+    def _get_address_cache_key(self, partner_data):
+        return (self.config.id,) + tuple(sorted(partner_data.items()))
+
+    def validate_rest_address(
+        self, street, street2, city, zip_code, state_code, country_code
+    ):
+        partner_data = self._prepare_address_data(
+            street, street2, city, zip_code, state_code, country_code
+        )
+        lookup_cache = self.config.env["account.lookup.cache"]
+        key = self._get_address_cache_key(partner_data)
+        address_vals = lookup_cache.get(ADDRESS_CACHE, key)
+        if address_vals is None:
+            address_vals = self._resolve_rest_address(partner_data)
+            lookup_cache.set(ADDRESS_CACHE, key, address_vals)
+        return dict(address_vals, date_validation=fields.Date.today())
+
+    def validate_rest_addresses(self, addresses, max_workers=4, max_rate=None):
+        """
+        Validate several addresses concurrently.
+
+        ``addresses`` are tuples of the ``validate_rest_address`` arguments.
+        Cached addresses are not sent again, and only the HTTP calls run
+        in the worker threads, so no ORM access happens outside of the
+        calling thread.
+        Returns a list, in the same order as the addresses, holding either
+        the validated address values or the exception raised for it.
+
+        @max_rate : maximum number of requests per second, unlimited if empty
+        """
+        lookup_cache = self.config.env["account.lookup.cache"]
+        results = [None] * len(addresses)
+        pending = []
+        for index, address in enumerate(addresses):
+            try:
+                partner_data = self._prepare_address_data(*address)
+            except UserError as e:
+                results[index] = e
+                continue
+            key = self._get_address_cache_key(partner_data)
+            results[index] = lookup_cache.get(ADDRESS_CACHE, key)
+            if results[index] is None:
+                pending.append((index, key, partner_data))
+        if pending:
+            limiter = _RateLimiter(max_rate)
+
+            def resolve(partner_data):
+                limiter.wait()
+                try:
+                    return self.client.resolve_address(partner_data)
+                except Exception as e:
+                    return e
+
+            workers = max(1, min(max_workers or 1, len(pending)))
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                responses = list(executor.map(resolve, [x[2] for x in pending]))
+            for (index, key, __), response in zip(pending, responses):
+                try:
+                    if isinstance(response, Exception):
+                        raise response
+                    results[index] = self._parse_address_result(response)
+                except Exception as e:
+                    results[index] = e
+                    continue
+                lookup_cache.set(ADDRESS_CACHE, key, results[index])
+        today = fields.Date.today()
+        for index, result in enumerate(results):
+            if not isinstance(result, Exception):
+                results[index] = dict(result, date_validation=today)
+        return results
+
+    def _resolve_rest_address(self, partner_data):
+        return self._parse_address_result(self.client.resolve_address(partner_data))
+
+    def _parse_address_result(self, response_partner):
         partner_dict = self.get_result(response_partner)
         valid_address = partner_dict.get("validatedAddresses")[0]
         Partner = self.config.env["res.partner"]
@@ -172,21 +273,19 @@ class AvaTaxRESTService:
         state = Partner.get_state_from_code(
             valid_address.get("region"), valid_address.get("country"),
         )
-        address_vals = {
+        return {
             "street": valid_address.get("line1", ""),
             "street2": valid_address.get("line2", ""),
             "city": valid_address.get("city", ""),
             "zip": valid_address.get("postalCode", ""),
             "country_id": country.id,
             "state_id": state.id,
-            "date_validation": fields.Date.today(),
             "validation_method": "avatax",
             "partner_latitude": valid_address.get("latitude"),
             "partner_longitude": valid_address.get("longitude"),
         }
-        return address_vals
 
-    def get_tax(
+    def _prepare_tax_document(
         self,
         company_code,
         doc_date,
@@ -206,13 +305,10 @@ class AvaTaxRESTService:
         currency_code="USD",
         vat=None,
         is_override=False,
-        ignore_error=None,
     ):
-        """ Create tax request and get tax amount by customer address
+        """ Build the CreateTransaction request document, without sending it
             @currency_code : 'USD' is the default currency code for avalara,
             if user not specify in the own company
-            return information about how the tax was calculated.  Intended
-            for use only while the SDK is in a development environment.
         """
         if not origin.street:
             raise UserError(
@@ -295,18 +391,10 @@ class AvaTaxRESTService:
                     }
                 }
             )
-        if self.config and self.config.logging or self.is_log_enabled:
-            _logger.info(
-                "Request CreateTransaction %s %s (commit %s)\n%s",
-                doc_type,
-                doc_code,
-                commit,
-                pprint.pformat(tax_document, indent=1),
-            )
+        return tax_document
 
-        response = self.client.create_transaction(tax_document)
-        result = self.get_result(response, ignore_error=ignore_error)
-        # Enrich Avatax result with Odoo tax computation
+    def _enrich_tax_result(self, result):
+        """ Enrich Avatax result with Odoo tax computation """
         for line in result.get("lines", []):
             line["rate"] = (
                 round(sum(x["rate"] for x in line["details"]) * 100, 4)
@@ -315,6 +403,97 @@ class AvaTaxRESTService:
             )
         return result
 
+    def create_transaction_document(self, tax_document, ignore_error=None):
+        """ Send a prepared CreateTransaction document and return its result """
+        if self.config and self.config.logging or self.is_log_enabled:
+            _logger.info(
+                "Request CreateTransaction %s %s (commit %s)\n%s",
+                tax_document.get("type"),
+                tax_document.get("code"),
+                tax_document.get("commit"),
+                pprint.pformat(tax_document, indent=1),
+            )
+        response = self.client.create_transaction(tax_document)
+        result = self.get_result(response, ignore_error=ignore_error)
+        return self._enrich_tax_result(result)
+
+    def submit_transactions(self, tax_documents, max_workers=4, max_rate=None):
+        """
+        Send several prepared CreateTransaction documents concurrently.
+
+        Only the HTTP calls run in the worker threads, so no ORM access
+        happens outside of the calling thread.
+        Returns a list, in the same order as the documents, holding
+        either the HTTP response or the exception raised for it.
+        Use ``get_result`` and ``_enrich_tax_result`` to process them.
+
+        @max_rate : maximum number of requests per second, unlimited if empty
+        """
+        limiter = _RateLimiter(max_rate)
+
+        def submit(tax_document):
+            limiter.wait()
+            try:
+                return self.client.create_transaction(tax_document)
+            except Exception as e:
+                return e
+
+        workers = max(1, min(max_workers or 1, len(tax_documents)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(submit, tax_documents))
+
+    def get_tax(
+        self,
+        company_code,
+        doc_date,
+        doc_type,
+        partner_code,
+        doc_code,
+        origin,
+        destination,
+        received_lines,
+        exemption_no=None,
+        customer_usage_type=None,
+        salesman_code=None,
+        commit=False,
+        invoice_date=None,
+        reference_code=None,
+        location_code=None,
+        currency_code="USD",
+        vat=None,
+        is_override=False,
+        ignore_error=None,
+    ):
+        """ Create tax request and get tax amount by customer address
+            @currency_code : 'USD' is the default currency code for avalara,
+            if user not specify in the own company
+            return information about how the tax was calculated.  Intended
+            for use only while the SDK is in a development environment.
+        """
+        tax_document = self._prepare_tax_document(
+            company_code,
+            doc_date,
+            doc_type,
+            partner_code,
+            doc_code,
+            origin,
+            destination,
+            received_lines,
+            exemption_no,
+            customer_usage_type,
+            salesman_code,
+            commit,
+            invoice_date,
+            reference_code,
+            location_code,
+            currency_code,
+            vat,
+            is_override,
+        )
+        return self.create_transaction_document(
+            tax_document, ignore_error=ignore_error
+        )
+
     def call(self, endpoint, company_code, doc_code, model=None, params=None):
         if self.config and self.config.logging or self.is_log_enabled:
             _logger.info(
@@ -1,14 +1,36 @@
+import hashlib
 import logging
-import time
-from random import random
+from collections import defaultdict
 
-from odoo import _, api, fields, models
+from odoo import _, api, fields, models, tools
 from odoo.exceptions import UserError
 
 from .avatax_rest_api import AvaTaxRESTService
 
 _LOGGER = logging.getLogger(__name__)
 
+# Exemption property fields, migrated from the deprecated fields
+EXEMPTION_PROPERTY_FIELDS = [
+    "property_tax_exempt",
+    "property_exemption_code_id",
+    "property_exemption_number",
+]
+
+# Number of partners migrated at once by _migrate_exemption_data
+EXEMPTION_MIGRATION_CHUNK = 10000
+
+# Partner fields validated by Avatax
+ADDRESS_FIELDS = {"street", "street2", "city", "zip", "state_id", "country_id"}
+
+# Number of addresses validated at once by the deferred validation
+DEFERRED_VALIDATION_CHUNK = 500
+
+# Number of partners saved together above which their validation is deferred
+DEFERRED_VALIDATION_THRESHOLD = 20
+
+# Number of address validation requests sent to Avatax in parallel
+ADDRESS_VALIDATION_WORKERS = 4
+
 
 class ResPartner(models.Model):
     """
@@ -19,34 +41,153 @@ class ResPartner(models.Model):
     _inherit = "res.partner"
 
     @api.model
-    def _migrate_exemption_data(self):
+    def _migrate_exemption_data(
+        self, chunk_size=EXEMPTION_MIGRATION_CHUNK, commit=False
+    ):
         """
         Migrate values from old exemption fields
         into the new per company property fields
+
+        The properties are written with plain SQL, by chunks of partners.
+        Values equal to the default, False, are not stored, as the ORM does.
+        Partners with a company specific exemption code are migrated, so
+        an interrupted migration resumes where it stopped. With ``commit``,
+        each chunk is committed. Returns the number of migrated partners.
         """
         companies = self.env["res.company"].search([])
+        migrated = 0
+        self.flush(["exemption_code_id", "exemption_number", "tax_exempt"])
+        self.env["ir.property"].flush()
+        fields_by_name = {
+            name: self.env["ir.model.fields"]._get(self._name, name)
+            for name in EXEMPTION_PROPERTY_FIELDS
+        }
         for company in companies:
-            Partner = self.env["res.partner"].with_context(force_company=company.id)
-            pending_exempt_partners = Partner.search(
-                [
-                    ("exemption_code_id", "!=", False),
-                    ("property_exemption_code_id", "=", False),
-                ]
+            total = self._count_pending_exemption_data(company, fields_by_name)
+            if not total:
+                continue
+            _LOGGER.info(
+                "Migrating exemption data on %d partners for company %s",
+                total,
+                company.display_name,
             )
-            if pending_exempt_partners:
+            done = last_id = 0
+            while True:
+                partner_ids = self._get_pending_exemption_data(
+                    company, fields_by_name, last_id, chunk_size
+                )
+                if not partner_ids:
+                    break
+                self._migrate_exemption_data_chunk(company, fields_by_name, partner_ids)
+                if commit:
+                    self.env.cr.commit()  # pylint: disable=invalid-commit
+                done += len(partner_ids)
+                last_id = partner_ids[-1]
+                migrated += len(partner_ids)
                 _LOGGER.info(
-                    "Migrating exemption data on %d partners for company %s",
-                    len(pending_exempt_partners),
+                    "Migrated exemption data on %d/%d partners for company %s",
+                    done,
+                    total,
                     company.display_name,
                 )
-            for partner in pending_exempt_partners:
-                partner.write(
-                    {
-                        "property_tax_exempt": partner.tax_exempt,
-                        "property_exemption_code_id": partner.exemption_code_id.id,
-                        "property_exemption_number": partner.exemption_number,
-                    }
-                )
+        self.env["ir.property"].invalidate_cache()
+        self.invalidate_cache(EXEMPTION_PROPERTY_FIELDS)
+        return migrated
+
+    @api.model
+    def _get_pending_exemption_where(self):
+        return """
+            partner.exemption_code_id IS NOT NULL
+            AND NOT EXISTS (
+                SELECT 1 FROM ir_property prop
+                WHERE prop.fields_id = %(code_field)s
+                    AND prop.company_id = %(company)s
+                    AND prop.res_id = 'res.partner,' || partner.id
+                    AND prop.value_reference IS NOT NULL
+            )
+        """
+
+    @api.model
+    def _count_pending_exemption_data(self, company, fields_by_name):
+        self.env.cr.execute(
+            "SELECT count(*) FROM res_partner partner WHERE "
+            + self._get_pending_exemption_where(),
+            {
+                "code_field": fields_by_name["property_exemption_code_id"].id,
+                "company": company.id,
+            },
+        )
+        return self.env.cr.fetchone()[0]
+
+    @api.model
+    def _get_pending_exemption_data(self, company, fields_by_name, last_id, limit):
+        self.env.cr.execute(
+            "SELECT id FROM res_partner partner WHERE id > %(last_id)s AND "
+            + self._get_pending_exemption_where()
+            + " ORDER BY id LIMIT %(limit)s",
+            {
+                "code_field": fields_by_name["property_exemption_code_id"].id,
+                "company": company.id,
+                "last_id": last_id,
+                "limit": limit,
+            },
+        )
+        return [row[0] for row in self.env.cr.fetchall()]
+
+    @api.model
+    def _migrate_exemption_data_chunk(self, company, fields_by_name, partner_ids):
+        """ Replace the exemption properties of the partners for the company """
+        cr = self.env.cr
+        params = {
+            "company": company.id,
+            "field_ids": tuple(field.id for field in fields_by_name.values()),
+            "res_ids": tuple("res.partner,%d" % pid for pid in partner_ids),
+            "partner_ids": tuple(partner_ids),
+            "uid": self.env.uid,
+        }
+        cr.execute(
+            """
+            DELETE FROM ir_property
+            WHERE company_id = %(company)s
+                AND fields_id IN %(field_ids)s
+                AND res_id IN %(res_ids)s
+            """,
+            params,
+        )
+        for name, column, value, condition in [
+            ("property_tax_exempt", "value_integer", "1", "partner.tax_exempt"),
+            (
+                "property_exemption_code_id",
+                "value_reference",
+                "'exemption.code,' || partner.exemption_code_id",
+                "partner.exemption_code_id IS NOT NULL",
+            ),
+            (
+                "property_exemption_number",
+                "value_text",
+                "partner.exemption_number",
+                "COALESCE(partner.exemption_number, '') <> ''",
+            ),
+        ]:
+            cr.execute(
+                """
+                INSERT INTO ir_property
+                    (name, res_id, company_id, fields_id, type, {column},
+                     create_uid, create_date, write_uid, write_date)
+                SELECT %(name)s, 'res.partner,' || partner.id, %(company)s,
+                    %(field)s, %(type)s, {value},
+                    %(uid)s, now() at time zone 'UTC',
+                    %(uid)s, now() at time zone 'UTC'
+                FROM res_partner partner
+                WHERE partner.id IN %(partner_ids)s AND {condition}
+                """.format(column=column, value=value, condition=condition),
+                dict(
+                    params,
+                    name=name,
+                    field=fields_by_name[name].id,
+                    type=fields_by_name[name].ttype,
+                ),
+            )
 
     date_validation = fields.Date(
         "Last Validation Date",
@@ -67,6 +208,18 @@ class ResPartner(models.Model):
         " before calling the wizard",
     )
     customer_code = fields.Char("Customer Code", copy=False)
+    avatax_address_hash = fields.Char(
+        "Validated Address Fingerprint",
+        readonly=True,
+        copy=False,
+        help="Fingerprint of the address when it was last validated by AvaTax",
+    )
+    avatax_validation_pending = fields.Boolean(
+        "Address Validation Pending",
+        readonly=True,
+        copy=False,
+        help="The address will be validated by a scheduled action",
+    )
     tax_exempt = fields.Boolean("Is Tax Exempt (Deprecated))", deprecated=True,)
     exemption_number = fields.Char("Exemption Number (Deprecated)", deprecated=True,)
     exemption_code_id = fields.Many2one(
@@ -112,14 +265,48 @@ class ResPartner(models.Model):
                     )
                 )
 
-    def _get_avatax_customer_code(self):
-        self.ensure_one()
-        return "%d-%d-Cust-%d" % (int(time.time()), int(random() * 10), self.id,)
+    def init(self):
+        super().init()
+        self.env.cr.execute(
+            "CREATE SEQUENCE IF NOT EXISTS res_partner_avatax_customer_code_seq"
+        )
+        self.env.cr.execute(
+            """
+            CREATE INDEX IF NOT EXISTS res_partner_avatax_validation_pending_index
+            ON res_partner (id) WHERE avatax_validation_pending
+            """
+        )
+        # Fingerprint the addresses validated before it was recorded
+        self._set_avatax_address_hash(
+            "partner.date_validation IS NOT NULL"
+            " AND partner.avatax_address_hash IS NULL"
+        )
+
+    @api.model
+    def _get_avatax_customer_code_expression(self):
+        """
+        SQL expression of the customer code of a partner. The number taken
+        from a sequence, and the id, make it unique even across concurrent
+        transactions.
+        """
+        return (
+            "floor(extract(epoch FROM now()))::bigint"
+            " || '-' || nextval('res_partner_avatax_customer_code_seq')"
+            " || '-Cust-' || id"
+        )
 
     def generate_cust_code(self):
         "Auto populate customer code"
-        for partner in self:
-            partner.customer_code = partner._get_avatax_customer_code()
+        if not self:
+            return True
+        self.flush(["customer_code"])
+        self.env.cr.execute(
+            "UPDATE res_partner SET customer_code = {} WHERE id IN %s".format(
+                self._get_avatax_customer_code_expression()
+            ),
+            (tuple(self.ids),),
+        )
+        self.invalidate_cache(["customer_code"], self.ids)
         return True
 
     @api.onchange("tax_exempt")
@@ -128,19 +315,36 @@ class ResPartner(models.Model):
             self.property_exemption_number = ""
             self.property_exemption_code_id = None
 
+    @tools.ormcache()
+    def _get_country_ids_by_code(self):
+        countries = self.env["res.country"].sudo().search_read([], ["code"])
+        return {country["code"]: country["id"] for country in countries}
+
+    @tools.ormcache()
+    def _get_state_ids_by_code(self):
+        self.env.cr.execute(
+            """
+            SELECT country.code, state.code, state.id
+            FROM res_country_state state
+            JOIN res_country country ON country.id = state.country_id
+            """
+        )
+        return {
+            (country_code, state_code): state_id
+            for country_code, state_code, state_id in self.env.cr.fetchall()
+        }
+
     def get_state_from_code(self, state_code, country_code):
         """ Returns the state from the code. """
-        state = self.env["res.country.state"].search(
-            [("code", "=", state_code), ("country_id.code", "=", country_code)],
-        )
-        return state
+        state_id = self._get_state_ids_by_code().get((country_code, state_code))
+        return self.env["res.country.state"].browse(state_id)
 
     def get_country_from_code(self, code):
         """ Returns the country from the code. """
-        country = self.env["res.country"].search([("code", "=", code)])
-        return country
+        country_id = self._get_country_ids_by_code().get(code)
+        return self.env["res.country"].browse(country_id)
 
-    def get_valid_address_vals(self, validation_on_save=False):
+    def get_valid_address_vals(self, validation_on_save=False, avatax_config=None):
         self.ensure_one()
         partner = self
         # For automatic validation on save, skip
@@ -154,7 +358,8 @@ class ResPartner(models.Model):
                 partner.name,
             )
             return False
-        avatax_config = self.env.company.get_avatax_config_company()
+        if avatax_config is None:
+            avatax_config = self.env.company.get_avatax_config_company()
         avatax_restpoint = AvaTaxRESTService(config=avatax_config)
         valid_address = avatax_restpoint.validate_rest_address(
             partner.street,
@@ -166,16 +371,105 @@ class ResPartner(models.Model):
         )
         return valid_address
 
-    def multi_address_validation(self, validation_on_save=False):
-        for partner in self:
-            if not (partner.parent_id and partner.type == "contact"):
-                valid_address = self.get_valid_address_vals(
-                    validation_on_save=validation_on_save
-                )
-                if valid_address:
-                    partner.write(valid_address)
+    def _filter_avatax_addresses(self, validation_on_save=False):
+        """
+        The partners with an address of their own to validate. For automatic
+        validation on save, skip those without relevant address details.
+        """
+        partners = self.filtered(lambda p: not (p.parent_id and p.type == "contact"))
+        if not validation_on_save:
+            return partners
+        skipped = partners.filtered(lambda p: not (p.city or p.zip or p.country_id))
+        for partner in skipped:
+            _LOGGER.info(
+                "Skipping address validation for %d %s, not enough details.",
+                partner.id,
+                partner.name,
+            )
+        return partners - skipped
+
+    def multi_address_validation(self, validation_on_save=False, avatax_config=None):
+        """ Validate the addresses, sending the requests concurrently """
+        partners = self._filter_avatax_addresses(validation_on_save)
+        if avatax_config is None:
+            avatax_config = self.env.company.get_avatax_config_company()
+        results = partners._avatax_validate_addresses(avatax_config)
+        for partner in partners:
+            if isinstance(results[partner], Exception):
+                raise results[partner]
+        partners._avatax_write_validated_addresses(results)
         return True
 
+    def _avatax_write_validated_addresses(self, results):
+        """
+        Write the address values returned by ``_avatax_validate_addresses``,
+        the partners sharing the same values at once. The partners whose
+        validation failed are left untouched, and their exceptions returned.
+        """
+        errors = {}
+        partner_ids_by_vals = defaultdict(list)
+        for partner in self:
+            if isinstance(results[partner], Exception):
+                errors[partner] = results[partner]
+                continue
+            partner_ids_by_vals[tuple(sorted(results[partner].items()))].append(
+                partner.id
+            )
+        # The validated addresses must not be validated again on write
+        Partner = self.with_context(avatax_writing=True)
+        for vals, partner_ids in partner_ids_by_vals.items():
+            Partner.browse(partner_ids).write(dict(vals))
+        return errors
+
+    @api.model
+    def _get_avatax_address_hash_expression(self):
+        """
+        SQL expression of the fingerprint of an address, from the ``address``,
+        ``state`` and ``country`` tables. It matches ``_get_avatax_address_hash``.
+        """
+        return (
+            "md5(concat_ws('|', COALESCE(address.street, ''),"
+            " COALESCE(address.street2, ''), COALESCE(address.city, ''),"
+            " COALESCE(address.zip, ''), COALESCE(state.code, ''),"
+            " COALESCE(country.code, '')))"
+        )
+
+    def _get_avatax_address_hash(self):
+        """ Fingerprint of the current address of the partner """
+        self.ensure_one()
+        address = "|".join(x or "" for x in self._get_avatax_address())
+        return hashlib.md5(address.encode("utf-8")).hexdigest()
+
+    @api.model
+    def _set_avatax_address_hash(self, where, params=None):
+        """ Fingerprint the current address of the partners matching ``where`` """
+        self.env.cr.execute(
+            """
+            UPDATE res_partner partner SET avatax_address_hash = {}
+            FROM res_partner address
+            LEFT JOIN res_country_state state ON state.id = address.state_id
+            LEFT JOIN res_country country ON country.id = address.country_id
+            WHERE address.id = partner.id AND {}
+            """.format(self._get_avatax_address_hash_expression(), where),
+            params,
+        )
+
+    def _update_avatax_address_hash(self):
+        """ Record the fingerprint of the addresses, as they were validated """
+        if not self:
+            return
+        self.flush(list(ADDRESS_FIELDS))
+        self._set_avatax_address_hash("partner.id IN %s", (tuple(self.ids),))
+        self.invalidate_cache(["avatax_address_hash"], self.ids)
+
+    def _is_avatax_address_validated(self):
+        """ The address was validated, and did not change since """
+        self.ensure_one()
+        return bool(
+            self.date_validation
+            and self.avatax_address_hash == self._get_avatax_address_hash()
+        )
+
     def button_avatax_validate_address(self):
         """Method is used to verify of state and country """
         view_ref = self.env.ref("account_avatax.view_avalara_salestax_address_validate")
@@ -194,27 +488,154 @@ class ResPartner(models.Model):
             "context": ctx,
         }
 
+    def _group_by_avatax_config(self):
+        """
+        Group the partners by the Avatax configuration of their company,
+        or of the current company. Returns a list of (configuration, partners).
+        """
+        configs = {}
+        groups = defaultdict(list)
+        for partner in self:
+            company = partner.company_id or self.env.company
+            if company not in configs:
+                configs[company] = company.get_avatax_config_company()
+            groups[configs[company]].append(partner.id)
+        return [(config, self.browse(ids)) for config, ids in groups.items()]
+
+    def _get_avatax_validation_groups(self):
+        """
+        Group the partners by the Avatax configuration validating their
+        address on save. Returns a list of (configuration, partners).
+        """
+        return [
+            (avatax_config, partners)
+            for avatax_config, partners in self._group_by_avatax_config()
+            if avatax_config.validation_on_save
+        ]
+
+    def _get_avatax_address(self):
+        """ The ``validate_rest_address`` arguments for the partner address """
+        self.ensure_one()
+        return (
+            self.street,
+            self.street2,
+            self.city,
+            self.zip,
+            self.state_id.code,
+            self.country_id.code,
+        )
+
+    def _avatax_validate_addresses(
+        self, avatax_config=None, max_workers=ADDRESS_VALIDATION_WORKERS
+    ):
+        """
+        Validate the addresses of the partners concurrently, with the given
+        Avatax configuration, or the one of their company.
+        Returns the validated address values, or the exception raised for
+        the address, by partner.
+        """
+        if avatax_config is None:
+            groups = self._group_by_avatax_config()
+        else:
+            groups = [(avatax_config, self)]
+        results = {}
+        for config, partners in groups:
+            if not config:
+                error = UserError(_("No Avatax configuration applies to this address."))
+                results.update(dict.fromkeys(partners, error))
+                continue
+            avatax_restpoint = AvaTaxRESTService(config=config)
+            addresses = [partner._get_avatax_address() for partner in partners]
+            results.update(
+                zip(
+                    partners,
+                    avatax_restpoint.validate_rest_addresses(
+                        addresses, max_workers=max_workers
+                    ),
+                )
+            )
+        return results
+
+    def _avatax_validate_on_save(self):
+        """
+        Validate the addresses of the partners, when enabled.
+        For large batches, imports, or with the ``avatax_defer_validation``
+        context key, they are only flagged, and validated later by a
+        scheduled action, so that no network call slows the batch down.
+        """
+        partners = self.with_context(avatax_writing=True)
+        defer = (
+            len(self) > DEFERRED_VALIDATION_THRESHOLD
+            or self.env.context.get("import_file")
+            or self.env.context.get("avatax_defer_validation")
+        )
+        for avatax_config, group in partners._get_avatax_validation_groups():
+            if defer:
+                group.write({"avatax_validation_pending": True})
+                continue
+            group.multi_address_validation(
+                validation_on_save=True, avatax_config=avatax_config
+            )
+            group.write({"validated_on_save": True, "avatax_validation_pending": False})
+
     @api.model
-    def create(self, vals):
-        partner = super(ResPartner, self).create(vals)
+    def _cron_validate_pending_addresses(self, limit=DEFERRED_VALIDATION_CHUNK):
+        """
+        Validate the addresses flagged by ``_avatax_validate_on_save``,
+        sending the requests concurrently. The addresses that failed stay
+        flagged, and are tried again after the other pending ones.
+        """
+        partners = self.search(
+            [("avatax_validation_pending", "=", True)],
+            limit=limit,
+            order="write_date, id",
+        ).with_context(avatax_writing=True)
+        validated = self.browse()
+        skipped = self.browse()
+        for avatax_config, group in partners._get_avatax_validation_groups():
+            to_validate = group._filter_avatax_addresses(validation_on_save=True)
+            skipped |= group - to_validate
+            results = to_validate._avatax_validate_addresses(avatax_config)
+            for partner, result in results.items():
+                try:
+                    if isinstance(result, Exception):
+                        raise result
+                    with self.env.cr.savepoint():
+                        partner.write(result)
+                    validated |= partner
+                except Exception as e:
+                    _LOGGER.warning(
+                        "Address validation failed for partner %d: %s",
+                        partner.id,
+                        getattr(e, "name", e),
+                    )
+        validated.write({"validated_on_save": True})
+        (validated | skipped).write({"avatax_validation_pending": False})
+        # Touch the failed partners, so that they do not hold the next chunk
+        failed = partners - validated - skipped
+        failed.write({"avatax_validation_pending": True})
+        _LOGGER.info(
+            "Validated %d of %d pending partner addresses, %d failed",
+            len(validated),
+            len(partners),
+            len(failed),
+        )
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        partners = super(ResPartner, self).create(vals_list)
         # Auto populate customer code
-        partner.generate_cust_code()
+        partners.generate_cust_code()
+        partners.filtered("date_validation")._update_avatax_address_hash()
         # Auto validate address, if enabled
-        avatax_config = self.env.company.get_avatax_config_company()
-        if avatax_config.validation_on_save:
-            partner.multi_address_validation(validation_on_save=True)
-            partner.validated_on_save = True
-        return partner
+        partners._avatax_validate_on_save()
+        return partners
 
     def write(self, vals):
         res = super(ResPartner, self).write(vals)
-        address_fields = ["street", "street2", "city", "zip", "state_id", "country_id"]
-        if not self.env.context.get("avatax_writing") and any(
-            x in vals for x in address_fields
-        ):
-            partner = self.with_context(avatax_writing=True)
-            avatax_config = self.env.company.get_avatax_config_company()
-            if avatax_config.validation_on_save:
-                partner.multi_address_validation(validation_on_save=True)
-                partner.validated_on_save = True
+        if vals.get("date_validation"):
+            self._update_avatax_address_hash()
+        avatax_writing = self.env.context.get("avatax_writing")
+        if not avatax_writing and ADDRESS_FIELDS.intersection(vals):
+            self._avatax_validate_on_save()
         return res
@@ -4,6 +4,9 @@ from odoo import _, models
 
 _LOGGER = logging.getLogger(__name__)
 
+# Lookup cache namespace of the AvaTax configuration of the companies
+CONFIG_CACHE = "avalara.salestax"
+
 
 class Company(models.Model):
     _inherit = "res.company"
@@ -13,16 +16,26 @@ class Company(models.Model):
         if self:
             self.ensure_one()
             AvataxConfig = self.env["avalara.salestax"]
-            res = AvataxConfig.search(
-                [("company_id", "=", self.id), ("disable_tax_calculation", "=", False)]
+            AvataxConfig.check_access_rights("read")
+            # The configurations visible depend on the allowed companies
+            key = (self.id, tuple(sorted(self.env.companies.ids)))
+            config_id = self.env["account.lookup.cache"].get_or_compute(
+                CONFIG_CACHE, key, lambda: self._search_avatax_config().id
+            )
+            return AvataxConfig.browse(config_id)
+
+    def _search_avatax_config(self):
+        AvataxConfig = self.env["avalara.salestax"]
+        res = AvataxConfig.search(
+            [("company_id", "=", self.id), ("disable_tax_calculation", "=", False)]
+        )
+        if len(res) > 1:
+            _LOGGER.warn(
+                _("Company %s has too many Avatax configurations!"),
+                self.display_name,
+            )
+        if len(res) < 1:
+            _LOGGER.warn(
+                _("Company %s has no Avatax configuration."), self.display_name
             )
-            if len(res) > 1:
-                _LOGGER.warn(
-                    _("Company %s has too many Avatax configurations!"),
-                    self.display_name,
-                )
-            if len(res) < 1:
-                _LOGGER.warn(
-                    _("Company %s has no Avatax configuration."), self.display_name
-                )
-            return res and res[0]
+        return res and res[0]
@@ -0,0 +1,44 @@
+from odoo import api, models
+
+
+class ResCountry(models.Model):
+    _inherit = "res.country"
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        countries = super().create(vals_list)
+        # Drop the countries and states by code, see res.partner
+        self.clear_caches()
+        return countries
+
+    def write(self, vals):
+        result = super().write(vals)
+        if "code" in vals:
+            self.clear_caches()
+        return result
+
+    def unlink(self):
+        result = super().unlink()
+        self.clear_caches()
+        return result
+
+
+class ResCountryState(models.Model):
+    _inherit = "res.country.state"
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        states = super().create(vals_list)
+        self.clear_caches()
+        return states
+
+    def write(self, vals):
+        result = super().write(vals)
+        if "code" in vals or "country_id" in vals:
+            self.clear_caches()
+        return result
+
+    def unlink(self):
+        result = super().unlink()
+        self.clear_caches()
+        return result
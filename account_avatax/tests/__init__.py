@@ -0,0 +1,6 @@
+from . import test_avatax_benchmark
+from . import test_avatax_exemption_migration
+from . import test_avatax_customer_code
+from . import test_avatax_partner_validation
+from . import test_avatax_backfill
+from . import test_avatax_profile
@@ -0,0 +1,156 @@
+from unittest import mock
+
+from odoo.tests.common import SavepointCase
+
+from odoo.addons.account_avatax.models import avatax_rest_api
+from odoo.addons.account_lookup_cache.tests.common import (
+    LookupCacheCaseMixin,
+    QueryBudgetMixin,
+)
+
+
+class AvataxResponseStandIn(object):
+    def __init__(self, result):
+        self.result = result
+
+    def json(self):
+        return self.result
+
+
+class AvataxClientStandIn(object):
+    """
+    Local replacement for ``avalara.AvataxClient``, answering without network.
+    Every taxable line gets the same ``tax_rate``, and addresses validate
+    as they were given, in upper case when requested.
+    """
+
+    tax_rate = 0.1
+
+    def __init__(self, appname=None, version=None, machine=None, environment=None):
+        self.requests = []
+
+    def add_credentials(self, username=None, password=None):
+        return self
+
+    def ping(self):
+        return AvataxResponseStandIn({"authenticated": True})
+
+    def create_transaction(self, model, include=None):
+        self.requests.append(model)
+        lines = []
+        for line in model["lines"]:
+            tax = round(line["amount"] * self.tax_rate, 2)
+            lines.append(
+                {
+                    "lineNumber": str(line["number"]),
+                    "tax": tax,
+                    "taxCalculated": tax,
+                    "details": [{"rate": self.tax_rate}] if tax else [],
+                }
+            )
+        return AvataxResponseStandIn(
+            {
+                "code": model["code"],
+                "lines": lines,
+                "totalTax": sum(x["tax"] for x in lines),
+            }
+        )
+
+    def resolve_address(self, model):
+        self.requests.append(model)
+        upper = model.get("textcase") == "Upper"
+        return AvataxResponseStandIn(
+            {
+                "validatedAddresses": [
+                    {
+                        "line1": upper and model["line1"].upper() or model["line1"],
+                        "line2": upper and model["line2"].upper() or model["line2"],
+                        "city": upper and model["city"].upper() or model["city"],
+                        "postalCode": model["postalCode"],
+                        "region": model["region"],
+                        "country": model["country"],
+                        "latitude": 0.0,
+                        "longitude": 0.0,
+                    }
+                ]
+            }
+        )
+
+    def commit_transaction(self, company_code, doc_code, model=None, include=None):
+        return AvataxResponseStandIn({"code": doc_code, "status": "Committed"})
+
+    def void_transaction(self, company_code, doc_code, model=None, include=None):
+        return AvataxResponseStandIn({"code": doc_code, "status": "Cancelled"})
+
+    def unvoid_transaction(self, company_code, doc_code, model=None, include=None):
+        return AvataxResponseStandIn({"code": doc_code, "status": "Saved"})
+
+
+class AvataxStandInCase(LookupCacheCaseMixin, QueryBudgetMixin, SavepointCase):
+    """
+    Test case with an active Avatax configuration for the main company,
+    talking to the local ``AvataxClientStandIn``.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super(AvataxStandInCase, cls).setUpClass()
+        cls.client_patcher = mock.patch.object(
+            avatax_rest_api, "AvataxClient", AvataxClientStandIn, create=True
+        )
+        cls.client_patcher.start()
+        cls.company = cls.env.ref("base.main_company")
+        cls.country_us = cls.env.ref("base.us")
+        cls.state_ca = cls.env.ref("base.state_us_5")
+        cls.company.partner_id.write(
+            {
+                "street": "2000 Main Street",
+                "city": "Irvine",
+                "zip": "92614",
+                "state_id": cls.state_ca.id,
+                "country_id": cls.country_us.id,
+            }
+        )
+        cls.avatax_config = cls.env["avalara.salestax"].create(
+            {
+                "account_number": "BENCHMARK",
+                "license_key": "BENCHMARK",
+                "company_code": "BENCHMARK",
+                "service_url": "https://sandbox-rest.avatax.com/api/v2",
+                "company_id": cls.company.id,
+                "disable_tax_calculation": False,
+            }
+        )
+        cls.fiscal_position_avatax = cls.env.ref(
+            "account_avatax.avatax_fiscal_position_us"
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.client_patcher.stop()
+        super(AvataxStandInCase, cls).tearDownClass()
+
+    @classmethod
+    def _create_customers(cls, count):
+        return cls.env["res.partner"].create(
+            [
+                {
+                    "name": "Avatax Customer %d" % i,
+                    "street": "%d Elm Street" % (100 + i),
+                    "city": "Irvine",
+                    "zip": "92614",
+                    "state_id": cls.state_ca.id,
+                    "country_id": cls.country_us.id,
+                }
+                for i in range(count)
+            ]
+        )
+
+    @classmethod
+    def _create_products(cls, count):
+        return cls.env["product.product"].create(
+            [
+                {"name": "Avatax Product %d" % i, "list_price": 10.0 + i}
+                for i in range(count)
+            ]
+        )
@@ -0,0 +1,121 @@
+from unittest import mock
+
+from odoo import fields
+from odoo.tests.common import Form
+
+from .common import AvataxClientStandIn, AvataxStandInCase
+
+
+class TestAvataxBackfill(AvataxStandInCase):
+    @classmethod
+    def setUpClass(cls):
+        super(TestAvataxBackfill, cls).setUpClass()
+        cls.customer = cls._create_customers(1)
+        cls.product = cls._create_products(1)
+        cls.invoices = cls._create_invoice() | cls._create_invoice()
+        cls.invoices |= cls._create_invoice()
+
+    @classmethod
+    def _create_invoice(cls):
+        move_form = Form(
+            cls.env["account.move"].with_context(default_type="out_invoice")
+        )
+        move_form.partner_id = cls.customer
+        move_form.fiscal_position_id = cls.fiscal_position_avatax
+        with move_form.invoice_line_ids.new() as line_form:
+            line_form.product_id = cls.product
+        invoice = move_form.save()
+        invoice.post()
+        return invoice
+
+    def _create_backfill(self):
+        return self.env["avalara.salestax.backfill"].create(
+            {
+                "name": "Backfill",
+                "company_id": self.company.id,
+                "chunk_size": 2,
+                # Only the invoices of the test
+                "last_move_id": self.invoices[0].id - 1,
+                "state": "running",
+            }
+        )
+
+    def _patch_create_transaction(self, failing=()):
+        def create_transaction(client, model, include=None):
+            if model["code"] in failing:
+                raise Exception("Service unavailable")
+            return AvataxClientStandIn.create_transaction(client, model, include)
+
+        return mock.patch.object(
+            AvataxClientStandIn,
+            "create_transaction",
+            autospec=True,
+            side_effect=create_transaction,
+        )
+
+    def test_process_now(self):
+        cron = self.env.ref("account_avatax.ir_cron_avalara_salestax_backfill")
+        cron.nextcall = fields.Datetime.add(fields.Datetime.now(), days=1)
+        backfill = self.env["avalara.salestax.backfill"].create(
+            {"name": "Backfill", "company_id": self.company.id}
+        )
+        backfill.action_process()
+        # The scheduled action processes it, not the request
+        self.assertEqual(backfill.state, "running")
+        self.assertLessEqual(cron.nextcall, fields.Datetime.now())
+
+    def test_record_invoices(self):
+        backfill = self._create_backfill()
+        with self._patch_create_transaction() as create_transaction:
+            backfill._process()
+        self.assertEqual(backfill.state, "done")
+        self.assertEqual(backfill.move_done_count, 3)
+        self.assertEqual(backfill.move_error_count, 0)
+        self.assertEqual(backfill.last_move_id, self.invoices[-1].id)
+        codes = [call[0][1]["code"] for call in create_transaction.call_args_list]
+        self.assertEqual(codes, self.invoices.mapped("name"))
+
+    def test_resume(self):
+        backfill = self._create_backfill()
+        with self._patch_create_transaction():
+            self.assertTrue(backfill._process_chunk())
+        self.assertEqual(backfill.last_move_id, self.invoices[1].id)
+        # The next run only sends the invoices after the committed chunk
+        with self._patch_create_transaction() as create_transaction:
+            backfill._process()
+        codes = [call[0][1]["code"] for call in create_transaction.call_args_list]
+        self.assertEqual(codes, [self.invoices[2].name])
+        self.assertEqual(backfill.state, "done")
+        self.assertEqual(backfill.move_done_count, 3)
+
+    def test_error_log_and_retry(self):
+        backfill = self._create_backfill()
+        failing = self.invoices[1]
+        with self._patch_create_transaction(failing=[failing.name]):
+            backfill._process()
+        self.assertEqual(backfill.state, "done")
+        self.assertEqual(backfill.move_done_count, 2)
+        self.assertEqual(backfill.move_error_count, 1)
+        self.assertEqual(backfill.failed_move_ids, failing)
+        self.assertIn("%s: Service unavailable" % failing.name, backfill.error_log)
+        # Only the failed invoice is sent again
+        backfill.action_retry_failed()
+        self.assertEqual(backfill.state, "running")
+        with self._patch_create_transaction() as create_transaction:
+            backfill._process()
+        codes = [call[0][1]["code"] for call in create_transaction.call_args_list]
+        self.assertEqual(codes, [failing.name])
+        self.assertEqual(backfill.state, "done")
+        self.assertEqual(backfill.move_done_count, 3)
+        self.assertEqual(backfill.move_error_count, 0)
+        self.assertFalse(backfill.failed_move_ids)
+        self.assertFalse(backfill.retry_move_ids)
+
+    def test_missing_configuration(self):
+        backfill = self._create_backfill()
+        self.avatax_config.disable_tax_calculation = True
+        backfill._process()
+        # The backfill stops, without failing the scheduled action
+        self.assertEqual(backfill.state, "error")
+        self.assertIn("no Avatax configuration", backfill.error_log)
+        self.assertEqual(backfill.last_move_id, self.invoices[0].id - 1)
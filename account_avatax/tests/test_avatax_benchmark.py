@@ -0,0 +1,63 @@
+from odoo.tests.common import Form, tagged
+
+from .common import AvataxStandInCase
+
+
+@tagged("post_install", "-at_install")
+class TestAvataxBenchmark(AvataxStandInCase):
+    query_budgets = {"account_move_post": (200, 8), "address_validation": 20}
+    line_count_small = 2
+    line_count_large = 20
+
+    @classmethod
+    def setUpClass(cls):
+        super(TestAvataxBenchmark, cls).setUpClass()
+        cls.customers = cls._create_customers(2)
+        cls.products = cls._create_products(cls.line_count_large)
+
+    def _create_invoice(self, line_count):
+        move_form = Form(
+            self.env["account.move"].with_context(default_type="out_invoice")
+        )
+        move_form.partner_id = self.customers[0]
+        move_form.fiscal_position_id = self.fiscal_position_avatax
+        for product in self.products[:line_count]:
+            with move_form.invoice_line_ids.new() as line_form:
+                line_form.product_id = product
+                line_form.quantity = 2
+        return move_form.save()
+
+    def test_account_move_post(self):
+        """
+        Data:
+            - Draft customer invoices, with few and with many lines
+        Test case:
+            - Post the invoices, computing and committing taxes with Avatax
+        Expected result:
+            - Posting stays within the query budget for its line count
+        """
+        for line_count in (self.line_count_small, self.line_count_large):
+            invoice = self._create_invoice(line_count)
+            with self.assertQueryBudget(
+                "account.move post %d lines" % line_count,
+                self._budget("account_move_post", line_count),
+            ):
+                invoice.post()
+            self.assertEqual(invoice.state, "posted")
+            self.assertTrue(invoice.avatax_amount)
+
+    def test_address_validation(self):
+        """
+        Data:
+            - A customer with a complete address
+        Test case:
+            - Validate the address with Avatax
+        Expected result:
+            - The validation stays within its query budget
+        """
+        partner = self.customers[1]
+        with self.assertQueryBudget(
+            "address validation", self._budget("address_validation")
+        ):
+            partner.multi_address_validation()
+        self.assertTrue(partner.date_validation)
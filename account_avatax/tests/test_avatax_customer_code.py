@@ -0,0 +1,20 @@
+import re
+
+from odoo.tests.common import SavepointCase
+
+
+class TestAvataxCustomerCode(SavepointCase):
+    def test_customer_code(self):
+        partners = self.env["res.partner"].create(
+            [{"name": "Customer Code %d" % i} for i in range(3)]
+        )
+        codes = partners.mapped("customer_code")
+        self.assertEqual(len(set(codes)), 3)
+        for partner in partners:
+            self.assertTrue(
+                re.match(r"^\d+-\d+-Cust-%d$" % partner.id, partner.customer_code),
+                partner.customer_code,
+            )
+        # New codes are generated from the sequence
+        partners.generate_cust_code()
+        self.assertFalse(set(codes) & set(partners.mapped("customer_code")))
@@ -0,0 +1,36 @@
+from odoo.tests.common import SavepointCase
+
+
+class TestAvataxExemptionMigration(SavepointCase):
+    @classmethod
+    def setUpClass(cls):
+        super(TestAvataxExemptionMigration, cls).setUpClass()
+        cls.company_2 = cls.env["res.company"].create({"name": "Exemption Company"})
+        cls.exemption_code = cls.env.ref("account_avatax.federal_government_type")
+        cls.partners = cls.env["res.partner"].create(
+            [
+                {
+                    "name": "Exempt Customer %d" % i,
+                    "tax_exempt": bool(i % 2),
+                    "exemption_code_id": cls.exemption_code.id,
+                    "exemption_number": i % 3 and "EX-%d" % i or False,
+                }
+                for i in range(5)
+            ]
+        )
+
+    def test_migrate_exemption_data(self):
+        Partner = self.env["res.partner"]
+        migrated = Partner._migrate_exemption_data(chunk_size=2)
+        self.assertGreaterEqual(migrated, 2 * len(self.partners))
+        for company in self.env.user.company_id | self.company_2:
+            for partner in self.partners.with_context(force_company=company.id):
+                self.assertEqual(partner.property_tax_exempt, partner.tax_exempt)
+                self.assertEqual(
+                    partner.property_exemption_code_id, self.exemption_code
+                )
+                self.assertEqual(
+                    partner.property_exemption_number, partner.exemption_number
+                )
+        # Everything is migrated, running it again does nothing
+        self.assertEqual(Partner._migrate_exemption_data(), 0)
@@ -0,0 +1,141 @@
+from unittest import mock
+
+from odoo import fields
+from odoo.exceptions import UserError
+
+from odoo.addons.account_avatax.models.partner import DEFERRED_VALIDATION_THRESHOLD
+from .common import AvataxClientStandIn, AvataxStandInCase
+
+
+class TestAvataxPartnerValidation(AvataxStandInCase):
+    @classmethod
+    def setUpClass(cls):
+        super(TestAvataxPartnerValidation, cls).setUpClass()
+        cls.avatax_config.validation_on_save = True
+
+    def test_create_single(self):
+        partner = self._create_customers(1)
+        self.assertTrue(partner.date_validation)
+        self.assertTrue(partner.validated_on_save)
+        self.assertFalse(partner.avatax_validation_pending)
+
+    def test_create_small_batch(self):
+        partners = self._create_customers(3)
+        for partner in partners:
+            self.assertTrue(partner.date_validation)
+            self.assertFalse(partner.avatax_validation_pending)
+
+    def test_create_batch_deferred(self):
+        partners = self._create_customers(DEFERRED_VALIDATION_THRESHOLD + 1)
+        for partner in partners:
+            self.assertFalse(partner.date_validation)
+            self.assertTrue(partner.avatax_validation_pending)
+        self.env["res.partner"]._cron_validate_pending_addresses()
+        for partner in partners:
+            self.assertTrue(partner.date_validation)
+            self.assertTrue(partner.validated_on_save)
+            self.assertFalse(partner.avatax_validation_pending)
+
+    def test_deferred_validation_failure(self):
+        partners = self._create_customers(3).with_context(avatax_writing=True)
+        partners.write({"date_validation": False, "avatax_validation_pending": True})
+        partners[1].street = "200 Failing Street"
+
+        def resolve_address(client, model):
+            if model["line1"] == "200 Failing Street":
+                raise UserError("Address not found")
+            return AvataxClientStandIn.resolve_address(client, model)
+
+        with mock.patch.object(
+            AvataxClientStandIn,
+            "resolve_address",
+            autospec=True,
+            side_effect=resolve_address,
+        ):
+            self.env["res.partner"]._cron_validate_pending_addresses()
+        # The failed address is still pending, to be tried again
+        self.assertTrue(partners[1].avatax_validation_pending)
+        self.assertFalse(partners[1].date_validation)
+        for partner in partners[0] | partners[2]:
+            self.assertTrue(partner.date_validation)
+            self.assertFalse(partner.avatax_validation_pending)
+
+    def test_address_fingerprint(self):
+        partner = self._create_customers(1)
+        self.assertTrue(partner._is_avatax_address_validated())
+        # Changes without validation are detected
+        partner.with_context(avatax_writing=True).write({"zip": "92618"})
+        self.assertFalse(partner._is_avatax_address_validated())
+        partner.multi_address_validation()
+        self.assertTrue(partner._is_avatax_address_validated())
+        # Only changed addresses are sent again before computing taxes
+        with mock.patch.object(
+            type(self.env["res.partner"]), "multi_address_validation", autospec=True
+        ) as validation:
+            self.avatax_config.create_transaction(
+                fields.Date.today(),
+                "TEST",
+                "SalesOrder",
+                partner,
+                self.company.partner_id,
+                partner,
+                [],
+            )
+        # The company address was never validated
+        validation.assert_called_once()
+        self.assertEqual(validation.call_args[0][0], self.company.partner_id)
+
+    def test_validation_requests(self):
+        self.avatax_config.result_in_uppercase = True
+        partners = self.env["res.partner"].create(
+            [
+                {
+                    "name": "Avatax Requests Customer %d" % i,
+                    "street": "%d Requests Avenue" % i,
+                    "city": "Irvine",
+                    "zip": "92614",
+                    "state_id": self.state_ca.id,
+                    "country_id": self.country_us.id,
+                }
+                for i in range(3)
+            ]
+        )
+        with mock.patch.object(
+            AvataxClientStandIn,
+            "resolve_address",
+            autospec=True,
+            side_effect=AvataxClientStandIn.resolve_address,
+        ) as resolve_address:
+            partners.multi_address_validation(validation_on_save=True)
+        # Writing the validated addresses does not validate them again
+        self.assertEqual(resolve_address.call_count, len(partners))
+        self.assertEqual(partners.mapped("street")[0], "0 REQUESTS AVENUE")
+        for partner in partners:
+            self.assertTrue(partner._is_avatax_address_validated())
+
+    def test_validate_selection(self):
+        self.avatax_config.write(
+            {"validation_on_save": False, "result_in_uppercase": True}
+        )
+        partners = self._create_customers(3)
+        partners[1].country_id = self.env.ref("base.fr")
+        wizard = (
+            self.env["avalara.salestax.address.validate.multi"]
+            .with_context(active_model="res.partner", active_ids=partners.ids)
+            .create({})
+        )
+        self.assertEqual(wizard.partner_ids, partners)
+        wizard.action_validate()
+        self.assertEqual(wizard.changed_count, 2)
+        self.assertEqual(wizard.failed_count, 1)
+        lines = {line.partner_id: line for line in wizard.line_ids}
+        self.assertEqual(lines[partners[0]].result, "changed")
+        self.assertEqual(lines[partners[1]].result, "failed")
+        self.assertTrue(lines[partners[2]].accept)
+        lines[partners[2]].accept = False
+        wizard.action_apply()
+        self.assertEqual(partners[0].street, "100 ELM STREET")
+        self.assertTrue(partners[0].date_validation)
+        self.assertFalse(partners[1].date_validation)
+        self.assertEqual(partners[2].street, "102 Elm Street")
+        self.assertFalse(partners[2].date_validation)
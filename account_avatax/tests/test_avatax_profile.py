@@ -0,0 +1,65 @@
+from odoo.tests.common import Form
+
+from .common import AvataxStandInCase
+
+
+class TestAvataxProfile(AvataxStandInCase):
+    @classmethod
+    def setUpClass(cls):
+        super(TestAvataxProfile, cls).setUpClass()
+        cls.customer = cls._create_customers(1)
+        cls.products = cls._create_products(3)
+
+    def _create_invoice(self):
+        move_form = Form(
+            self.env["account.move"].with_context(default_type="out_invoice")
+        )
+        move_form.partner_id = self.customer
+        move_form.fiscal_position_id = self.fiscal_position_avatax
+        for product in self.products:
+            with move_form.invoice_line_ids.new() as line_form:
+                line_form.product_id = product
+        return move_form.save()
+
+    def _get_profiles(self, invoice):
+        return self.env["avalara.salestax.profile"].search(
+            [("res_model", "=", "account.move"), ("res_id", "=", invoice.id)]
+        )
+
+    def test_disabled(self):
+        invoice = self._create_invoice()
+        invoice._avatax_compute_tax()
+        self.assertTrue(invoice.avatax_amount)
+        self.assertFalse(self._get_profiles(invoice))
+
+    def test_phases(self):
+        invoice = self._create_invoice()
+        invoice.with_context(avatax_profile=True)._avatax_compute_tax()
+        profile = self._get_profiles(invoice)
+        self.assertEqual(len(profile), 1)
+        self.assertEqual(profile.doc_type, "SalesOrder")
+        self.assertEqual(profile.line_count, 3)
+        # The line amounts are written in their own phase
+        self.assertEqual(
+            profile.phase_ids.mapped("phase"),
+            [
+                "prepare",
+                "request",
+                "tax_lookup",
+                "apply",
+                "recompute",
+                "check_balanced",
+                "form",
+            ],
+        )
+        self.assertTrue(profile.query_count)
+        self.assertEqual(
+            profile.query_count, sum(profile.phase_ids.mapped("query_count"))
+        )
+        self.assertTrue(invoice.avatax_amount)
+
+    def test_enabled_by_configuration(self):
+        self.avatax_config.profile_tax_computation = True
+        invoice = self._create_invoice()
+        invoice._avatax_compute_tax()
+        self.assertTrue(self._get_profiles(invoice))
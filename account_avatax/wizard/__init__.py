@@ -1,2 +1,3 @@
 from . import avalara_salestax_ping
 from . import avalara_salestax_address_validate
+from . import avalara_salestax_address_validate_multi
@@ -0,0 +1,157 @@
+from collections import defaultdict
+
+from odoo import api, fields, models
+
+from ..models.partner import ADDRESS_FIELDS, ADDRESS_VALIDATION_WORKERS
+
+# Validated address fields proposed by the lines
+LINE_ADDRESS_FIELDS = [
+    "street",
+    "street2",
+    "city",
+    "zip",
+    "state_id",
+    "country_id",
+    "partner_latitude",
+    "partner_longitude",
+]
+
+
+class AvalaraSalestaxAddressValidateMulti(models.TransientModel):
+    """
+    Address Validation of several partners using Avalara API.
+
+    The addresses are sent to Avatax concurrently, the changed ones are
+    proposed for review, and the accepted ones written back together.
+    """
+
+    _name = "avalara.salestax.address.validate.multi"
+    _description = "Address Validation of several Partners using AvaTax"
+
+    partner_ids = fields.Many2many("res.partner", string="Partners")
+    max_workers = fields.Integer(
+        "Concurrent Requests",
+        default=ADDRESS_VALIDATION_WORKERS,
+        help="Maximum number of requests sent to Avatax in parallel",
+    )
+    state = fields.Selection(
+        [("draft", "Draft"), ("review", "Review")], default="draft", readonly=True
+    )
+    line_ids = fields.One2many(
+        "avalara.salestax.address.validate.multi.line", "wizard_id", "Addresses"
+    )
+    changed_count = fields.Integer("Changed", compute="_compute_counts")
+    unchanged_count = fields.Integer("Unchanged", compute="_compute_counts")
+    failed_count = fields.Integer("Failed", compute="_compute_counts")
+
+    @api.model
+    def default_get(self, fields):
+        """  Returns the default values for the fields. """
+        res = super(AvalaraSalestaxAddressValidateMulti, self).default_get(fields)
+        context = self.env.context
+        if context.get("active_model") == "res.partner" and context.get("active_ids"):
+            res["partner_ids"] = [(6, 0, context["active_ids"])]
+        return res
+
+    @api.depends("line_ids.result")
+    def _compute_counts(self):
+        for wizard in self:
+            results = wizard.line_ids.mapped("result")
+            wizard.changed_count = results.count("changed")
+            wizard.unchanged_count = results.count("unchanged")
+            wizard.failed_count = results.count("failed")
+
+    def _reopen(self):
+        return {
+            "type": "ir.actions.act_window",
+            "name": "Address Validation",
+            "view_mode": "form",
+            "res_model": self._name,
+            "res_id": self.id,
+            "target": "new",
+            "context": self.env.context,
+        }
+
+    def _prepare_line(self, partner, result):
+        vals = {
+            "partner_id": partner.id,
+            "original_address": ", ".join(
+                x for x in partner._display_address(True).splitlines() if x.strip()
+            ),
+        }
+        if isinstance(result, Exception):
+            vals.update(result="failed", message=getattr(result, "name", str(result)))
+            return vals
+        vals.update({name: result.get(name) for name in LINE_ADDRESS_FIELDS})
+        original_vals = partner._convert_to_write(
+            {name: partner[name] for name in ADDRESS_FIELDS}
+        )
+        changed = any(
+            (original_vals[name] or "") != (result.get(name) or "")
+            for name in ADDRESS_FIELDS
+        )
+        vals.update(result=changed and "changed" or "unchanged", accept=changed)
+        return vals
+
+    def action_validate(self):
+        """ Validate the addresses of the partners, and show the results """
+        self.ensure_one()
+        partners = self.partner_ids._filter_avatax_addresses()
+        results = partners._avatax_validate_addresses(max_workers=self.max_workers)
+        lines = [(0, 0, self._prepare_line(p, results[p])) for p in partners]
+        self.write({"line_ids": [(5, 0, 0)] + lines, "state": "review"})
+        return self._reopen()
+
+    def action_apply(self):
+        """
+        Update the partners with the accepted addresses. Partners sharing
+        the same values, such as the unchanged ones, are written at once.
+        """
+        self.ensure_one()
+        validation_vals = {
+            "date_validation": fields.Date.today(),
+            "validation_method": "avatax",
+        }
+        groups = defaultdict(list)
+        for line in self.line_ids:
+            if line.result == "unchanged":
+                groups[()].append(line.partner_id.id)
+            elif line.result == "changed" and line.accept:
+                groups[tuple(line._get_address_vals().items())].append(
+                    line.partner_id.id
+                )
+        Partner = self.env["res.partner"].with_context(avatax_writing=True)
+        for address_vals, partner_ids in groups.items():
+            Partner.browse(partner_ids).write(dict(address_vals, **validation_vals))
+        return {"type": "ir.actions.act_window_close"}
+
+
+class AvalaraSalestaxAddressValidateMultiLine(models.TransientModel):
+    _name = "avalara.salestax.address.validate.multi.line"
+    _description = "Address Validated using AvaTax"
+
+    wizard_id = fields.Many2one(
+        "avalara.salestax.address.validate.multi", required=True, ondelete="cascade"
+    )
+    partner_id = fields.Many2one("res.partner", "Partner", readonly=True)
+    original_address = fields.Char("Original Address", readonly=True)
+    result = fields.Selection(
+        [("changed", "Changed"), ("unchanged", "Unchanged"), ("failed", "Failed")],
+        readonly=True,
+    )
+    message = fields.Char(readonly=True)
+    accept = fields.Boolean()
+    street = fields.Char("Street", readonly=True)
+    street2 = fields.Char("Street2", readonly=True)
+    city = fields.Char("City", readonly=True)
+    zip = fields.Char("Zip", readonly=True)
+    state_id = fields.Many2one("res.country.state", "State", readonly=True)
+    country_id = fields.Many2one("res.country", "Country", readonly=True)
+    partner_latitude = fields.Float("Latitude", readonly=True)
+    partner_longitude = fields.Float("Longitude", readonly=True)
+
+    def _get_address_vals(self):
+        self.ensure_one()
+        vals = {name: self[name] for name in LINE_ADDRESS_FIELDS}
+        vals.update(state_id=self.state_id.id, country_id=self.country_id.id)
+        return vals
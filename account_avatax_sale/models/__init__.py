@@ -1,3 +1,4 @@
 from . import account_move
 from . import partner
+from . import res_partner_exemption_address
 from . import sale_order
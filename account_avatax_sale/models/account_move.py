@@ -1,9 +1,24 @@
-from odoo import api, models
+import json
+import logging
+
+from odoo import api, fields, models
+
+_logger = logging.getLogger(__name__)
 
 
 class AccountMove(models.Model):
     _inherit = "account.move"
 
+    avatax_order_result = fields.Text(
+        "AvaTax Sales Order Result",
+        readonly=True,
+        copy=False,
+        help="AvaTax tax result of the sales order the invoice was created from",
+    )
+    avatax_order_fingerprint = fields.Char(
+        "AvaTax Sales Order Fingerprint", readonly=True, copy=False
+    )
+
     @api.onchange("partner_id")
     def _onchange_partner_id(self):
         res = super(AccountMove, self)._onchange_partner_id()
@@ -15,26 +30,55 @@ class AccountMove(models.Model):
         res = super(AccountMove, self)._onchange_partner_shipping_id()
         if not self.exemption_locked:
             invoice_partner = self.partner_id.commercial_partner_id
-            ship_to_address = self.shipping_add_id
             # Find an exemption address matching the Country + State
             # of the Delivery address
-            exemption_addresses = (
-                invoice_partner | invoice_partner.child_ids
-            ).filtered("property_tax_exempt")
-            exemption_address_naive = exemption_addresses.filtered(
-                lambda a: a.country_id == ship_to_address.country_id
-                and (
-                    a.state_id == ship_to_address.state_id
-                    or invoice_partner.property_exemption_country_wide
-                )
-            )[:1]
-            # Force Company to get the correct values form the Property fields
-            exemption_address = exemption_address_naive.with_context(
-                force_company=self.company_id.id
+            ExemptionAddress = self.env["res.partner.exemption.address"]
+            exemption_number, exemption_code = ExemptionAddress._lookup(
+                invoice_partner, self.shipping_add_id, self.company_id
             )
-            self.exemption_code = exemption_address.property_exemption_number
-            self.exemption_code_id = exemption_address.property_exemption_code_id
+            self.exemption_code = exemption_number
+            self.exemption_code_id = exemption_code
 
         self.tax_on_shipping_address = bool(self.partner_shipping_id)
         self.is_add_validate = bool(self.partner_shipping_id.validation_method)
         return res
+
+    def _avatax_document_fingerprint(self, transaction):
+        """
+        Fingerprint of the transaction, identifying lines by their sales
+        order line, so it matches the one of an identical sales order.
+        """
+
+        def line_key(line):
+            return len(line.sale_line_ids) == 1 and line.sale_line_ids.id
+
+        return self.env["avalara.salestax"]._get_transaction_fingerprint(
+            transaction, line_key
+        )
+
+    def _avatax_get_reusable_result(self, transaction):
+        """
+        Reuse the tax result of the sales order, when the invoice has the
+        same lines, prices and addresses. Its lines are mapped to the
+        invoice lines.
+        """
+        result = super()._avatax_get_reusable_result(transaction)
+        if result or not self.avatax_order_result:
+            return result
+        if self.avatax_order_fingerprint != self._avatax_document_fingerprint(
+            transaction
+        ):
+            return None
+        order_result = json.loads(self.avatax_order_result)
+        line_ids = {
+            line["id"].sale_line_ids.id: line["id"].id for line in transaction["lines"]
+        }
+        _logger.info("Reusing the sales order Avatax result for %s", self.name)
+        return dict(
+            order_result,
+            lines=[
+                dict(x, lineNumber=str(line_ids[int(x["lineNumber"])]))
+                for x in order_result["lines"]
+                if int(x["lineNumber"]) in line_ids
+            ],
+        )
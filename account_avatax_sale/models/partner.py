@@ -1,5 +1,9 @@
 from odoo import _, api, fields, models
 
+from odoo.addons.account_avatax.models.partner import EXEMPTION_MIGRATION_CHUNK
+
+from .res_partner_exemption_address import EXEMPTION_FIELDS
+
 
 class ResPartner(models.Model):
     _inherit = "res.partner"
@@ -25,3 +29,31 @@ class ResPartner(models.Model):
         " when looking up the exemption status, meaning that the exemption"
         " is considered applicable for all states",
     )
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        partners = super().create(vals_list)
+        exempt_partners = self.browse(
+            [
+                partner.id
+                for partner, vals in zip(partners, vals_list)
+                if vals.get("property_tax_exempt")
+            ]
+        )
+        self.env["res.partner.exemption.address"]._update_addresses(exempt_partners)
+        return partners
+
+    def write(self, vals):
+        result = super().write(vals)
+        if EXEMPTION_FIELDS.intersection(vals):
+            self.env["res.partner.exemption.address"]._update_addresses(self)
+        return result
+
+    @api.model
+    def _migrate_exemption_data(
+        self, chunk_size=EXEMPTION_MIGRATION_CHUNK, commit=False
+    ):
+        migrated = super()._migrate_exemption_data(chunk_size=chunk_size, commit=commit)
+        if migrated:
+            self.env["res.partner.exemption.address"]._rebuild()
+        return migrated
@@ -0,0 +1,162 @@
+from odoo import api, fields, models
+from odoo.tools import split_every
+
+# Partner fields the exemption addresses depend on
+EXEMPTION_FIELDS = {
+    "parent_id",
+    "country_id",
+    "state_id",
+    "property_tax_exempt",
+    "property_exemption_number",
+    "property_exemption_code_id",
+}
+
+# Number of partners indexed at once by _rebuild
+REBUILD_CHUNK = 1000
+
+# Number of rows inserted by a single query
+INSERT_CHUNK = 1000
+
+
+class ResPartnerExemptionAddress(models.Model):
+    """
+    Index of the tax exempt addresses of the partners, per company.
+
+    An exempt address is indexed under itself and under its parent, as
+    the exemption of a Delivery address is looked up among the invoicing
+    partner and its addresses. Rows are written with plain SQL when the
+    partners change, so the exemption of a Delivery address is found with
+    a single indexed query, whatever the number of addresses.
+
+    Only the partners written through the ORM are indexed. After changing
+    the exemption properties with SQL queries, or by importing ``ir.property``
+    records, call ``_rebuild`` to index them again.
+    """
+
+    _name = "res.partner.exemption.address"
+    _description = "Partner Tax Exempt Address"
+    _log_access = False
+
+    partner_id = fields.Many2one(
+        "res.partner", "Invoicing Partner", required=True, ondelete="cascade"
+    )
+    company_id = fields.Many2one(
+        "res.company", "Company", required=True, ondelete="cascade"
+    )
+    address_id = fields.Many2one(
+        "res.partner", "Address", required=True, ondelete="cascade", index=True
+    )
+    country_id = fields.Many2one("res.country", "Country")
+    state_id = fields.Many2one("res.country.state", "State")
+    exemption_number = fields.Char("Exemption Number")
+    exemption_code_id = fields.Many2one("exemption.code", "Exemption Code")
+
+    _sql_constraints = [
+        (
+            "partner_company_address_uniq",
+            "unique(partner_id, company_id, address_id)",
+            "An address is indexed once per partner and company.",
+        )
+    ]
+
+    def init(self):
+        self.env.cr.execute(
+            """
+            CREATE INDEX IF NOT EXISTS res_partner_exemption_address_lookup_index
+            ON res_partner_exemption_address (partner_id, company_id, country_id)
+            """
+        )
+        # Updates keep the index, only an empty one is built
+        self.env.cr.execute("SELECT 1 FROM res_partner_exemption_address LIMIT 1")
+        if not self.env.cr.fetchone():
+            self._rebuild()
+
+    @api.model
+    def _rebuild(self):
+        """ Index the exempt addresses of all the companies, from scratch """
+        self.env.cr.execute("DELETE FROM res_partner_exemption_address")
+        Partner = self.env["res.partner"].sudo().with_context(active_test=False)
+        partner_ids = set()
+        for company in self.env["res.company"].sudo().search([]):
+            partner_ids.update(
+                Partner.with_context(force_company=company.id)
+                .search([("property_tax_exempt", "=", True)])
+                .ids
+            )
+        for ids in split_every(REBUILD_CHUNK, sorted(partner_ids)):
+            self._update_addresses(Partner.browse(ids))
+            Partner.invalidate_cache(ids=ids)
+
+    @api.model
+    def _update_addresses(self, partners):
+        """ Replace the rows of the addresses, for all the companies """
+        if not partners:
+            return
+        self.env.cr.execute(
+            "DELETE FROM res_partner_exemption_address WHERE address_id IN %s",
+            (tuple(partners.ids),),
+        )
+        rows = []
+        for company in self.env["res.company"].sudo().search([]):
+            addresses = partners.sudo().with_context(force_company=company.id)
+            for address in addresses.filtered("property_tax_exempt"):
+                for partner_id in {address.id, address.parent_id.id} - {False}:
+                    rows.append(
+                        (
+                            partner_id,
+                            company.id,
+                            address.id,
+                            address.country_id.id or None,
+                            address.state_id.id or None,
+                            address.property_exemption_number or None,
+                            address.property_exemption_code_id.id or None,
+                        )
+                    )
+        for chunk in split_every(INSERT_CHUNK, rows):
+            self.env.cr.execute(
+                """
+                INSERT INTO res_partner_exemption_address
+                    (partner_id, company_id, address_id, country_id, state_id,
+                     exemption_number, exemption_code_id)
+                VALUES {}
+                """.format(", ".join(["%s"] * len(chunk))),
+                chunk,
+            )
+
+    @api.model
+    def _lookup(self, invoice_partner, ship_to_address, company):
+        """
+        Return the exemption number and code applying to the Delivery
+        address: the ones of the invoicing partner, or of its first address,
+        exempt for the Country and State of the Delivery address.
+        """
+        ExemptionCode = self.env["exemption.code"]
+        if not invoice_partner:
+            return False, ExemptionCode
+        self.env["res.partner"].flush(["active", "display_name"])
+        self.env.cr.execute(
+            """
+            SELECT exemption.exemption_number, exemption.exemption_code_id
+            FROM res_partner_exemption_address exemption
+            JOIN res_partner address ON address.id = exemption.address_id
+            WHERE exemption.partner_id = %s
+                AND exemption.company_id = %s
+                AND exemption.country_id IS NOT DISTINCT FROM %s
+                AND (%s OR exemption.state_id IS NOT DISTINCT FROM %s)
+                AND (address.active OR address.id = exemption.partner_id)
+            ORDER BY address.id = exemption.partner_id DESC,
+                address.display_name, address.id
+            LIMIT 1
+            """,
+            (
+                invoice_partner.id,
+                company.id,
+                ship_to_address.country_id.id or None,
+                bool(invoice_partner.property_exemption_country_wide),
+                ship_to_address.state_id.id or None,
+            ),
+        )
+        row = self.env.cr.fetchone()
+        if not row:
+            return False, ExemptionCode
+        return row[0] or False, ExemptionCode.browse(row[1])
@@ -1,10 +1,33 @@
-from odoo import api, fields, models
+import json
+import logging
+from collections import defaultdict
+
+from odoo import _, api, fields, models
+from odoo.exceptions import UserError
+
+_logger = logging.getLogger(__name__)
 
 
 class SaleOrder(models.Model):
     _inherit = "sale.order"
 
     tax_amount = fields.Monetary(string="AvaTax")
+    avatax_stale = fields.Boolean(
+        "AvaTax Outdated",
+        copy=False,
+        help="The order changed since its taxes were computed by AvaTax."
+        " The changed lines show the taxes computed by Odoo until they are"
+        " computed again.",
+    )
+    avatax_result = fields.Text(
+        "AvaTax Result", readonly=True, copy=False, help="Last AvaTax tax result"
+    )
+    avatax_fingerprint = fields.Char(
+        "AvaTax Document Fingerprint",
+        readonly=True,
+        copy=False,
+        help="Fingerprint of the order data the last AvaTax result was computed on",
+    )
 
     @api.onchange("partner_shipping_id", "partner_id")
     def onchange_partner_shipping_id(self):
@@ -19,25 +42,14 @@ class SaleOrder(models.Model):
         res = super(SaleOrder, self).onchange_partner_shipping_id()
 
         invoice_partner = self.partner_invoice_id.commercial_partner_id
-        ship_to_address = self.tax_address_id
         # Find an exemption address matching the Country + State
         # of the Delivery address
-        exemption_addresses = (invoice_partner | invoice_partner.child_ids).filtered(
-            "property_tax_exempt"
+        ExemptionAddress = self.env["res.partner.exemption.address"]
+        exemption_number, exemption_code = ExemptionAddress._lookup(
+            invoice_partner, self.tax_address_id, self.company_id
         )
-        exemption_address_naive = exemption_addresses.filtered(
-            lambda a: a.country_id == ship_to_address.country_id
-            and (
-                a.state_id == ship_to_address.state_id
-                or invoice_partner.property_exemption_country_wide
-            )
-        )[:1]
-        # Force Company to get the correct values form the Property fields
-        exemption_address = exemption_address_naive.with_context(
-            force_company=self.company_id.id
-        )
-        self.exemption_code = exemption_address.property_exemption_number
-        self.exemption_code_id = exemption_address.property_exemption_code_id
+        self.exemption_code = exemption_number
+        self.exemption_code_id = exemption_code
 
         self.tax_on_shipping_address = bool(self.partner_shipping_id)
         return res
@@ -54,20 +66,36 @@ class SaleOrder(models.Model):
                 "tax_on_shipping_address": self.tax_on_shipping_address,
             }
         )
+        # The invoice can reuse the tax result, if it has the same lines
+        if self.avatax_result and not self.avatax_stale:
+            invoice_vals.update(
+                {
+                    "avatax_order_result": self.avatax_result,
+                    "avatax_order_fingerprint": self.avatax_fingerprint,
+                }
+            )
         return invoice_vals
 
     @api.onchange("order_line", "fiscal_position_id")
     def onchange_reset_avatax_amount(self):
         """
-        When changing quantities or prices, reset the Avatax computed amount.
-        The Odoo computed tax amount will then be shown, as a reference.
+        When changing quantities or prices, mark the Avatax computed amounts
+        as outdated, without touching the lines.
+        The changed lines then show the Odoo computed tax amount, as a
+        reference, and the order total sums the lines.
         The Avatax amount will be recomputed upon document validation.
         """
         for order in self:
-            order.tax_amount = 0
-            order.order_line.write({"tax_amt": 0})
+            # Only the transition triggers the amounts recomputation
+            if not order.avatax_stale:
+                order.avatax_stale = True
 
-    @api.depends("order_line.price_total", "order_line.product_uom_qty", "tax_amount")
+    @api.depends(
+        "order_line.price_total",
+        "order_line.product_uom_qty",
+        "tax_amount",
+        "avatax_stale",
+    )
     def _amount_all(self):
         """
         Compute fields amount_untaxed, amount_tax, amount_total
@@ -76,7 +104,9 @@ class SaleOrder(models.Model):
         """
         super()._amount_all()
         for order in self:
-            if order.tax_amount:
+            # While outdated, the lines are summed: the unchanged ones still
+            # hold their Avatax amount, the changed ones the Odoo one
+            if order.tax_amount and not order.avatax_stale:
                 order.update(
                     {
                         "amount_tax": order.tax_amount,
@@ -126,64 +156,210 @@ class SaleOrder(models.Model):
         ]
         return [x for x in lines if x]
 
+    def _avatax_prepare_transaction(self):
+        """
+        Prepare the arguments to use for an Avatax transaction.
+        Returns a dict of keyword arguments for ``create_transaction``
+        """
+        self.ensure_one()
+        doc_type = self._get_avatax_doc_type()
+        return {
+            "doc_date": self.date_order,
+            "doc_code": self.name,
+            "doc_type": doc_type,
+            "partner": self.partner_id,
+            "ship_from_address": (
+                self.warehouse_id.partner_id or self.company_id.partner_id
+            ),
+            "shipping_address": self.tax_address_id or self.partner_id,
+            "lines": self._avatax_prepare_lines(doc_type),
+            "user": self.user_id,
+            "exemption_number": self.exemption_code or None,
+            "exemption_code_name": self.exemption_code_id.code or None,
+            "currency_id": self.currency_id,
+        }
+
     def _avatax_compute_tax(self):
         """ Contact REST API and recompute taxes for a Sale Order """
         self and self.ensure_one()
         doc_type = self._get_avatax_doc_type()
-        Tax = self.env["account.tax"]
         avatax_config = self.company_id.get_avatax_config_company()
-        taxable_lines = self._avatax_prepare_lines(self.order_line)
-        tax_result = avatax_config.create_transaction(
-            self.date_order,
-            self.name,
-            doc_type,
-            self.partner_id,
-            self.warehouse_id.partner_id or self.company_id.partner_id,
-            self.tax_address_id or self.partner_id,
-            taxable_lines,
-            self.user_id,
-            self.exemption_code or None,
-            self.exemption_code_id.code or None,
-            currency_id=self.currency_id,
+        profiler = self.env["avalara.salestax.profile"]._get_profiler(
+            self, avatax_config
         )
-        tax_result_lines = {int(x["lineNumber"]): x for x in tax_result["lines"]}
-        for line in self.order_line:
-            tax_result_line = tax_result_lines.get(line.id)
-            if tax_result_line:
-                # Should we check the rate with the tax amount?
-                # tax_amount = tax_result_line["taxCalculated"]
-                # rate = round(tax_amount / line.price_subtotal * 100, 2)
-                rate = tax_result_line["rate"]
-                tax = Tax.get_avalara_tax(rate, doc_type)
-                if tax not in line.tax_id:
-                    line_taxes = line.tax_id.filtered(lambda x: not x.is_avatax)
-                    line.tax_id = line_taxes | tax
-                line.tax_amt = tax_result_line["tax"]
-        self.tax_amount = tax_result.get("totalTax")
+        with profiler.phase("prepare"):
+            transaction = self._avatax_prepare_transaction()
+        with profiler.phase("request"):
+            tax_result = avatax_config.create_transaction(**transaction)
+        self._avatax_apply_tax_result(tax_result, transaction, profiler=profiler)
+        profiler.save(doc_type, len(transaction["lines"]))
         return True
 
+    def _avatax_document_fingerprint(self, transaction):
+        """ Fingerprint of the transaction, identifying lines by their id """
+        return self.env["avalara.salestax"]._get_transaction_fingerprint(
+            transaction, lambda line: line.id
+        )
+
+    def _avatax_apply_tax_result(self, tax_result, transaction, profiler=None):
+        """
+        Set the taxes and amounts of an Avatax result on the order, and keep
+        the result, with the fingerprint of the transaction it was computed on.
+        """
+        self.ensure_one()
+        doc_type = self._get_avatax_doc_type()
+        Tax = self.env["account.tax"]
+        if profiler is None:
+            profiler = self.env["avalara.salestax.profile"]._get_profiler(self)
+        tax_result_lines = {int(x["lineNumber"]): x for x in tax_result["lines"]}
+        line_results = []
+        with profiler.phase("tax_lookup"):
+            for line in self.order_line:
+                tax_result_line = tax_result_lines.get(line.id)
+                if tax_result_line:
+                    # Should we check the rate with the tax amount?
+                    # tax_amount = tax_result_line["taxCalculated"]
+                    # rate = round(tax_amount / line.price_subtotal * 100, 2)
+                    rate = tax_result_line["rate"]
+                    tax = Tax.get_avalara_tax(rate, doc_type)
+                    line_results.append((line, tax, tax_result_line["tax"]))
+        with profiler.phase("apply"):
+            self._avatax_apply_line_results(line_results)
+            result = {
+                "totalTax": tax_result.get("totalTax"),
+                "lines": [
+                    {
+                        "lineNumber": x["lineNumber"],
+                        "tax": x["tax"],
+                        "rate": x.get("rate", 0.0),
+                    }
+                    for x in tax_result["lines"]
+                ],
+            }
+            self.write(
+                {
+                    "tax_amount": tax_result.get("totalTax"),
+                    "avatax_stale": False,
+                    "avatax_result": json.dumps(result),
+                    "avatax_fingerprint": self._avatax_document_fingerprint(
+                        transaction
+                    ),
+                }
+            )
+
+    def _avatax_apply_line_results(self, line_results):
+        """
+        Set the Avatax tax and amount of the lines, from (line, tax, amount)
+        results. The lines are written together, grouped by their new taxes
+        and by their tax amount, so the line and order amounts are
+        recomputed once for all of them.
+        """
+        line_ids_by_taxes = defaultdict(list)
+        line_ids_by_amount = defaultdict(list)
+        for line, tax, tax_amt in line_results:
+            if tax not in line.tax_id:
+                line_taxes = line.tax_id.filtered(lambda x: not x.is_avatax)
+                line_ids_by_taxes[frozenset((line_taxes | tax).ids)].append(line.id)
+            if line.tax_amt != tax_amt:
+                line_ids_by_amount[tax_amt].append(line.id)
+        Line = self.env["sale.order.line"]
+        for tax_ids, line_ids in line_ids_by_taxes.items():
+            Line.browse(line_ids).write({"tax_id": [(6, 0, list(tax_ids))]})
+        for tax_amt, line_ids in line_ids_by_amount.items():
+            Line.browse(line_ids).write({"tax_amt": tax_amt})
+
+    def _group_by_avatax_config(self):
+        """
+        Group the orders by the Avatax configuration of their company.
+        Returns a list of (configuration, orders).
+        """
+        configs = {}
+        groups = defaultdict(list)
+        for order in self:
+            company = order.company_id
+            if company not in configs:
+                configs[company] = company.get_avatax_config_company()
+            groups[configs[company]].append(order.id)
+        return [(config, self.browse(ids)) for config, ids in groups.items()]
+
+    def _avatax_compute_taxes_batch(self):
+        """
+        Compute the taxes of several orders, sending the requests of each
+        Avatax configuration concurrently. An order failing does not fail
+        the others: it is marked as outdated, with the error posted on it.
+        Returns the orders that failed.
+        """
+        failed = self.browse()
+        for avatax_config, orders in self._group_by_avatax_config():
+            if not avatax_config:
+                continue
+            transactions = [order._avatax_prepare_transaction() for order in orders]
+            for order, transaction, result in zip(
+                orders, transactions, avatax_config.create_transactions(transactions)
+            ):
+                if isinstance(result, Exception):
+                    failed |= order
+                    order._avatax_flag_error(getattr(result, "name", None) or result)
+                elif result:
+                    order._avatax_apply_tax_result(result, transaction)
+        return failed
+
+    def _avatax_flag_error(self, error):
+        """ Mark the order as outdated, and post the Avatax error on it """
+        self.ensure_one()
+        _logger.warning(
+            "AvaTax could not compute the taxes of %s: %s", self.name, error
+        )
+        self.avatax_stale = True
+        self.message_post(
+            body=_("AvaTax could not compute the taxes of this order: %s") % error
+        )
+
     def avalara_compute_taxes(self):
         """
         Use Avatax API to compute taxes.
         Sets the Taxes on each line, and lets odoo perfomr teh calculations.
+        Several orders are computed together, with concurrent requests, and
+        the orders that failed are returned.
         """
-        for order in self:
-            if order.fiscal_position_id.is_avatax:
-                order._avatax_compute_tax()
-        return True
+        orders = self.filtered(lambda x: x.fiscal_position_id.is_avatax)
+        if len(orders) > 1:
+            return orders._avatax_compute_taxes_batch()
+        elif orders:
+            orders._avatax_compute_tax()
+        return self.browse()
 
     def action_confirm(self):
-        avatax_config = self.company_id.get_avatax_config_company()
-        if avatax_config and avatax_config.force_address_validation:
-            for addr in [self.partner_id, self.partner_shipping_id]:
-                if not addr.date_validation:
-                    # The Confirm action will be interrupted
-                    # if the address is not validated
-                    return addr.button_avatax_validate_address()
-        res = super(SaleOrder, self).action_confirm()
-        if avatax_config:
-            self.avalara_compute_taxes()
-        return res
+        avatax_orders = self.browse()
+        for avatax_config, orders in self._group_by_avatax_config():
+            if not avatax_config:
+                continue
+            avatax_orders |= orders
+            if not avatax_config.force_address_validation:
+                continue
+            addresses = (
+                orders.mapped("partner_id") | orders.mapped("partner_shipping_id")
+            ).filtered(lambda a: not a._is_avatax_address_validated())
+            if addresses and len(self) == 1:
+                # The Confirm action will be interrupted
+                # if the address is not validated
+                return addresses[0].button_avatax_validate_address()
+            elif addresses:
+                raise UserError(
+                    _("Please validate these addresses first:\n%s")
+                    % "\n".join(addresses.mapped("display_name"))
+                )
+        if len(self) == 1:
+            res = super(SaleOrder, self).action_confirm()
+            avatax_orders.avalara_compute_taxes()
+            return res
+        # Several orders: the ones AvaTax failed on are left unconfirmed,
+        # with the error posted on them, and the others are confirmed
+        failed = avatax_orders.avalara_compute_taxes()
+        orders = self - failed
+        if not orders:
+            return True
+        return super(SaleOrder, orders).action_confirm()
 
 
 class SaleOrderLine(models.Model):
@@ -239,7 +415,8 @@ class SaleOrderLine(models.Model):
         """
         for line in self:
             line.tax_amt = 0
-            line.order_id.tax_amount = 0
+            if not line.order_id.avatax_stale:
+                line.order_id.avatax_stale = True
 
     @api.depends("product_uom_qty", "discount", "price_unit", "tax_id", "tax_amt")
     def _compute_amount(self):
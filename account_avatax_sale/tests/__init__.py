@@ -0,0 +1,3 @@
+from . import test_avatax_sale_benchmark
+from . import test_avatax_sale_order
+from . import test_res_partner_exemption_address
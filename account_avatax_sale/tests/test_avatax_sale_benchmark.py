@@ -0,0 +1,124 @@
+from odoo.tests.common import tagged
+
+from odoo.addons.account_avatax.tests.common import AvataxStandInCase
+
+
+@tagged("post_install", "-at_install")
+class TestAvataxSaleBenchmark(AvataxStandInCase):
+    query_budgets = {
+        "sale_order_compute_tax": (100, 3),
+        "sale_order_apply_results": (30, 1),
+    }
+    line_count_small = 2
+    line_count_large = 100
+
+    @classmethod
+    def setUpClass(cls):
+        super(TestAvataxSaleBenchmark, cls).setUpClass()
+        cls.customer = cls._create_customers(1)
+        cls.products = cls._create_products(10)
+        cls.tax = cls.env["account.tax"].get_avalara_tax(10.0, "SalesOrder")
+
+    def _create_order(self, line_count):
+        return self.env["sale.order"].create(
+            {
+                "partner_id": self.customer.id,
+                "fiscal_position_id": self.fiscal_position_avatax.id,
+                "order_line": [
+                    (
+                        0,
+                        0,
+                        {
+                            "product_id": self.products[i % 10].id,
+                            "product_uom_qty": 1 + i % 3,
+                        },
+                    )
+                    for i in range(line_count)
+                ],
+            }
+        )
+
+    def _get_line_results(self, order):
+        return [
+            (line, self.tax, round(line.price_subtotal * 0.1, 2))
+            for line in order.order_line
+        ]
+
+    def _apply_per_line(self, order, line_results):
+        """ The former way of applying the results, one line at a time """
+        for line, tax, tax_amt in line_results:
+            if tax not in line.tax_id:
+                line_taxes = line.tax_id.filtered(lambda x: not x.is_avatax)
+                line.tax_id = line_taxes | tax
+            line.tax_amt = tax_amt
+
+    def test_sale_order_compute_tax(self):
+        """
+        Data:
+            - Draft sales orders, with few and with many lines
+        Test case:
+            - Compute their taxes with Avatax
+        Expected result:
+            - The computation stays within the query budget for its line count
+        """
+        for line_count in (self.line_count_small, self.line_count_large):
+            order = self._create_order(line_count)
+            with self.assertQueryBudget(
+                "sale.order compute tax %d lines" % line_count,
+                self._budget("sale_order_compute_tax", line_count),
+            ):
+                order._avatax_compute_tax()
+            self.assertTrue(order.tax_amount)
+            self.assertEqual(order.amount_tax, order.tax_amount)
+
+    def test_sale_order_apply_results(self):
+        """
+        Data:
+            - Two identical sales orders with many lines
+        Test case:
+            - Apply the same Avatax results, grouped and line per line
+        Expected result:
+            - The grouped writes stay within their budget, use fewer queries
+              than the former line per line path, and give the same taxes
+        """
+        grouped_order = self._create_order(self.line_count_large)
+        per_line_order = self._create_order(self.line_count_large)
+        unlimited = 10 ** 6
+        with self.assertQueryBudget(
+            "sale.order apply results per line", unlimited
+        ) as per_line:
+            self._apply_per_line(per_line_order, self._get_line_results(per_line_order))
+        with self.assertQueryBudget(
+            "sale.order apply results grouped",
+            self._budget("sale_order_apply_results", self.line_count_large),
+        ) as grouped:
+            grouped_order._avatax_apply_line_results(
+                self._get_line_results(grouped_order)
+            )
+        self.assertLess(grouped["count"], per_line["count"])
+        self.assertEqual(grouped_order.amount_tax, per_line_order.amount_tax)
+        self.assertEqual(
+            grouped_order.order_line.mapped("tax_id"),
+            per_line_order.order_line.mapped("tax_id"),
+        )
+
+    def test_sale_order_apply_results_line_count(self):
+        """
+        Data:
+            - Sales orders with few and with many lines
+        Test case:
+            - Apply Avatax results giving all the lines the same taxes and
+              amount, before the line and order amounts are recomputed
+        Expected result:
+            - The same number of queries is run, whatever the line count:
+              the lines are written once per distinct taxes and amount
+        """
+        counts = []
+        for line_count in (self.line_count_small, self.line_count_large):
+            order = self._create_order(line_count)
+            line_results = [(line, self.tax, 1.0) for line in order.order_line]
+            self.env["base"].flush()
+            queries = self.cr.sql_log_count
+            order._avatax_apply_line_results(line_results)
+            counts.append(self.cr.sql_log_count - queries)
+        self.assertEqual(counts[0], counts[1])
@@ -0,0 +1,182 @@
+from unittest import mock
+
+from odoo.exceptions import UserError
+from odoo.tests.common import Form
+
+from odoo.addons.account_avatax.tests.common import (
+    AvataxClientStandIn,
+    AvataxStandInCase,
+)
+
+
+class TestAvataxSaleOrder(AvataxStandInCase):
+    @classmethod
+    def setUpClass(cls):
+        super(TestAvataxSaleOrder, cls).setUpClass()
+        cls.customer = cls._create_customers(1)
+        cls.products = cls._create_products(3)
+
+    def _create_order(self, products=None):
+        return self.env["sale.order"].create(
+            {
+                "partner_id": self.customer.id,
+                "fiscal_position_id": self.fiscal_position_avatax.id,
+                "order_line": [
+                    (0, 0, {"product_id": product.id, "product_uom_qty": 1})
+                    for product in products or self.products
+                ],
+            }
+        )
+
+    def test_edit_marks_stale(self):
+        order = self._create_order()
+        order._avatax_compute_tax()
+        self.assertFalse(order.avatax_stale)
+        self.assertEqual(order.amount_tax, order.tax_amount)
+        line_amounts = order.order_line.mapped("tax_amt")
+        with Form(order) as order_form:
+            with order_form.order_line.edit(0) as line_form:
+                line_form.product_uom_qty = 5
+        self.assertTrue(order.avatax_stale)
+        # The unchanged lines keep their Avatax amount, and the order sums
+        # them with the Odoo computed taxes of the changed line
+        self.assertFalse(order.order_line[0].tax_amt)
+        self.assertEqual(order.order_line[1:].mapped("tax_amt"), line_amounts[1:])
+        self.assertEqual(order.order_line[1:].mapped("price_tax"), line_amounts[1:])
+        self.assertAlmostEqual(
+            order.amount_tax, sum(order.order_line.mapped("price_tax"))
+        )
+        order._avatax_compute_tax()
+        self.assertFalse(order.avatax_stale)
+        self.assertEqual(order.amount_tax, order.tax_amount)
+
+    def test_edit_large_order(self):
+        order = self._create_order(self._create_products(50))
+        order._avatax_compute_tax()
+        edited_line = order.order_line[0]
+        SaleOrderLine = type(self.env["sale.order.line"])
+        with mock.patch.object(
+            SaleOrderLine,
+            "_compute_amount",
+            autospec=True,
+            side_effect=SaleOrderLine._compute_amount,
+        ) as compute_amount:
+            with Form(order) as order_form:
+                with order_form.order_line.edit(0) as line_form:
+                    line_form.product_uom_qty = 5
+                with order_form.order_line.edit(0) as line_form:
+                    line_form.product_uom_qty = 6
+        self.assertTrue(order.avatax_stale)
+        # Marking the order as outdated does not recompute its other lines
+        recomputed_ids = {
+            line._origin.id or line.id
+            for call in compute_amount.call_args_list
+            for line in call[0][0]
+        }
+        self.assertEqual(recomputed_ids, {edited_line.id})
+
+    def _patch_resolve_address(self, side_effect=AvataxClientStandIn.resolve_address):
+        return mock.patch.object(
+            AvataxClientStandIn,
+            "resolve_address",
+            autospec=True,
+            side_effect=side_effect,
+        )
+
+    def test_confirm_batch(self):
+        self.avatax_config.validation_on_save = True
+        self.customer.with_context(avatax_writing=True).write(
+            {"street": "300 Batch Confirm Street"}
+        )
+        orders = self._create_order() | self._create_order() | self._create_order()
+        with mock.patch.object(
+            type(self.env["sale.order"]), "_avatax_compute_tax", autospec=True
+        ) as compute_tax, self._patch_resolve_address() as resolve_address:
+            orders.action_confirm()
+        compute_tax.assert_not_called()
+        # The address shared by the orders is validated once
+        streets = [call[0][1]["line1"] for call in resolve_address.call_args_list]
+        self.assertEqual(streets.count("300 Batch Confirm Street"), 1)
+        self.assertEqual(len(streets), len(set(streets)))
+        self.assertTrue(self.customer._is_avatax_address_validated())
+        for order in orders:
+            self.assertEqual(order.state, "sale")
+            self.assertTrue(order.tax_amount)
+            self.assertFalse(order.avatax_stale)
+            self.assertEqual(order.amount_tax, order.tax_amount)
+
+    def test_confirm_batch_unvalidated_addresses(self):
+        self.avatax_config.force_address_validation = True
+        orders = self._create_order() | self._create_order()
+        with self.assertRaises(UserError):
+            orders.action_confirm()
+
+    def test_batch_address_error(self):
+        self.avatax_config.validation_on_save = True
+        customer = self._create_customers(1)
+        customer.with_context(avatax_writing=True).write(
+            {"street": "400 Failing Address Street"}
+        )
+        self.customer.with_context(avatax_writing=True).write(
+            {"street": "500 Valid Address Street"}
+        )
+        orders = self._create_order() | self._create_order()
+        orders[0].partner_id = customer
+
+        def resolve_address(client, model):
+            if model["line1"] == "400 Failing Address Street":
+                raise UserError("Address not found")
+            return AvataxClientStandIn.resolve_address(client, model)
+
+        transactions = [order._avatax_prepare_transaction() for order in orders]
+        with self._patch_resolve_address(side_effect=resolve_address):
+            results = self.avatax_config.create_transactions(transactions)
+        # Only the order using the failed address fails
+        self.assertIsInstance(results[0], Exception)
+        self.assertNotIsInstance(results[1], Exception)
+        self.assertTrue(results[1])
+        self.assertFalse(customer._is_avatax_address_validated())
+        self.assertTrue(self.customer._is_avatax_address_validated())
+
+    def test_confirm_batch_failure(self):
+        self.avatax_config.validation_on_save = True
+        customer = self._create_customers(1)
+        customer.with_context(avatax_writing=True).write(
+            {"street": "600 Failing Address Street"}
+        )
+        orders = self._create_order() | self._create_order()
+        orders[0].partner_id = customer
+
+        def resolve_address(client, model):
+            if model["line1"] == "600 Failing Address Street":
+                raise UserError("Address not found")
+            return AvataxClientStandIn.resolve_address(client, model)
+
+        with self._patch_resolve_address(side_effect=resolve_address):
+            orders.action_confirm()
+        # The failed order is left unconfirmed, with the error posted on it
+        self.assertEqual(orders[0].state, "draft")
+        self.assertTrue(orders[0].avatax_stale)
+        self.assertIn("Address not found", orders[0].message_ids[0].body)
+        self.assertEqual(orders[1].state, "sale")
+        self.assertFalse(orders[1].avatax_stale)
+        self.assertEqual(orders[1].amount_tax, orders[1].tax_amount)
+
+    def test_invoice_reuses_order_result(self):
+        order = self._create_order()
+        order.action_confirm()
+        self.assertTrue(order.avatax_fingerprint)
+        invoice = order._create_invoices()
+        self.assertEqual(invoice.avatax_order_fingerprint, order.avatax_fingerprint)
+        AvalaraSalestax = type(self.env["avalara.salestax"])
+        with mock.patch.object(
+            AvalaraSalestax,
+            "create_transaction",
+            autospec=True,
+            side_effect=AvalaraSalestax.create_transaction,
+        ) as create_transaction:
+            invoice.post()
+        # Only the commit call is sent to Avatax
+        create_transaction.assert_called_once()
+        self.assertTrue(create_transaction.call_args[1]["commit"])
+        self.assertEqual(invoice.avatax_amount, order.tax_amount)
@@ -0,0 +1,72 @@
+from odoo.addons.account_avatax.tests.common import AvataxStandInCase
+
+
+class TestPartnerExemptionAddress(AvataxStandInCase):
+    @classmethod
+    def setUpClass(cls):
+        super(TestPartnerExemptionAddress, cls).setUpClass()
+        cls.customer = cls._create_customers(1)
+        cls.state_ny = cls.env["res.country.state"].search(
+            [("country_id", "=", cls.country_us.id), ("code", "=", "NY")]
+        )
+        cls.exemption_code = cls.env.ref("account_avatax.federal_government_type")
+        cls.exemption_model = cls.env["res.partner.exemption.address"]
+
+    def _lookup(self, ship_to_address):
+        return self.exemption_model._lookup(
+            self.customer, ship_to_address, self.company
+        )
+
+    def _create_delivery(self, state, **vals):
+        return self.env["res.partner"].create(
+            dict(
+                {
+                    "name": "Avatax Delivery %s" % state.code,
+                    "parent_id": self.customer.id,
+                    "type": "delivery",
+                    "street": "10 Exemption Street",
+                    "city": "Somewhere",
+                    "state_id": state.id,
+                    "country_id": self.country_us.id,
+                },
+                **vals
+            )
+        )
+
+    def test_create(self):
+        delivery = self._create_delivery(
+            self.state_ny,
+            property_tax_exempt=True,
+            property_exemption_number="NY-123",
+            property_exemption_code_id=self.exemption_code.id,
+        )
+        self.assertEqual(self._lookup(delivery), ("NY-123", self.exemption_code))
+        # The exemption only applies in the state of the exempt address
+        self.assertEqual(self._lookup(self.customer)[0], False)
+
+    def test_write(self):
+        delivery = self._create_delivery(self.state_ny)
+        self.assertEqual(self._lookup(delivery)[0], False)
+        delivery.write(
+            {"property_tax_exempt": True, "property_exemption_number": "NY-456"}
+        )
+        self.assertEqual(self._lookup(delivery)[0], "NY-456")
+        delivery.state_id = self.state_ca
+        self.assertEqual(self._lookup(self.customer)[0], "NY-456")
+        # The invoicing partner's own exemption comes first
+        self.customer.write(
+            {"property_tax_exempt": True, "property_exemption_number": "CA-789"}
+        )
+        self.assertEqual(self._lookup(delivery)[0], "CA-789")
+        self.customer.property_tax_exempt = False
+        delivery.property_tax_exempt = False
+        self.assertEqual(self._lookup(delivery)[0], False)
+
+    def test_rebuild(self):
+        delivery = self._create_delivery(
+            self.state_ny, property_tax_exempt=True, property_exemption_number="NY-1"
+        )
+        self.env.cr.execute("DELETE FROM res_partner_exemption_address")
+        self.assertEqual(self._lookup(delivery)[0], False)
+        self.exemption_model._rebuild()
+        self.assertEqual(self._lookup(delivery)[0], "NY-1")
@@ -13,13 +13,15 @@
     "author": "Akretion, Odoo Community Association (OCA)",
     "license": "AGPL-3",
     "website": "http://www.akretion.com",
-    "depends": ["account", "l10n_generic_coa"],
+    "depends": ["account", "l10n_generic_coa", "account_lookup_cache"],
     "data": [
         "security/ir.model.access.csv",
         "security/account_fiscal_position_rule_security.xml",
+        "data/ir_cron.xml",
         "views/account_fiscal_position_rule_view.xml",
         "views/account_fiscal_position_rule_template_view.xml",
         "wizard/wizard_account_fiscal_position_rule_view.xml",
+        "wizard/wizard_account_fiscal_position_rule_analyse_view.xml",
     ],
     "installable": True,
 }
@@ -0,0 +1,61 @@
+# License AGPL-3 - See http://www.gnu.org/licenses/agpl-3.0.html
+
+import argparse
+import logging
+import time
+
+import odoo
+from odoo.cli import Command
+from odoo.tools import config
+
+_logger = logging.getLogger(__name__)
+
+
+class GenerateFiscalPositionRules(Command):
+    """Generate synthetic fiscal position rules and partners for benchmarks"""
+
+    def run(self, cmdargs):
+        parser = argparse.ArgumentParser(
+            prog="odoo-bin generatefiscalpositionrules",
+            description=self.__doc__,
+            epilog="Other arguments are passed to the Odoo configuration,"
+            " for instance -c odoo.conf -d database",
+        )
+        parser.add_argument(
+            "--company", type=int, help="Company ID, defaults to the main company"
+        )
+        parser.add_argument("--rules", type=int, default=10000)
+        parser.add_argument("--partners", type=int, default=1000)
+        parser.add_argument("--fiscal-positions", type=int, default=20)
+        parser.add_argument("--seed", type=int)
+        args, odoo_args = parser.parse_known_args(cmdargs)
+        config.parse_config(odoo_args)
+        dbname = config["db_name"]
+        if not dbname:
+            parser.error("a database is required, use -d")
+
+        start = time.time()
+        with odoo.api.Environment.manage():
+            registry = odoo.registry(dbname)
+            with registry.cursor() as cr:
+                env = odoo.api.Environment(cr, odoo.SUPERUSER_ID, {})
+                if args.company:
+                    company = env["res.company"].browse(args.company)
+                else:
+                    company = env.ref("base.main_company")
+                result = env["account.fiscal.position.rule.generator"].generate(
+                    company,
+                    rule_count=args.rules,
+                    partner_count=args.partners,
+                    fiscal_position_count=args.fiscal_positions,
+                    seed=args.seed,
+                )
+                # The cursor is closed once committed
+                company_name = company.name
+        _logger.info(
+            "Generated %d rules and %d partners for %s in %.1fs",
+            len(result["rules"]),
+            len(result["partners"]),
+            company_name,
+            time.time() - start,
+        )
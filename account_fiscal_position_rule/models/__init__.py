@@ -6,3 +6,7 @@ from . import account_fiscal_position_rule
 from . import account_fiscal_position_rule_template
 from . import account_fiscal_position
 from . import account_move
+from . import account_fiscal_position_rule_generator
+from . import res_partner_fiscal_position
+from . import res_partner
+from . import account_fiscal_position_rule_mixin
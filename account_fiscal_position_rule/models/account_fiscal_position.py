@@ -25,3 +25,9 @@ class AccountFiscalPosition(models.Model):
             }
             fp = fiscal_rule.apply_fiscal_mapping(**kwargs)
         return fp and fp.id or False
+
+    def unlink(self):
+        result = super().unlink()
+        # The rules of the fiscal positions are deleted by the database
+        self.env["account.fiscal.position.rule"]._invalidate_mapping_caches()
+        return result
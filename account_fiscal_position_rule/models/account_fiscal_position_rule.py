@@ -5,9 +5,69 @@
 #   @author: Guewen Baconnier
 # License AGPL-3 - See http://www.gnu.org/licenses/agpl-3.0.html
 
+import logging
 import time
+from bisect import bisect_right
+from collections import defaultdict
+from datetime import timedelta
 
-from odoo import api, fields, models
+from odoo import api, fields, models, tools
+
+from .res_partner_fiscal_position import USAGES
+
+_logger = logging.getLogger(__name__)
+
+# Mapping arguments taken into account by the resolved partner fiscal positions
+MAP_KWARGS = {"partner_id", "company_id", "partner_invoice_id", "partner_shipping_id"}
+
+# Lookup cache namespace of the mapping results
+MAP_CACHE = "account.fiscal.position.rule"
+
+# Rule fields the interval index depends on, besides the usages
+INTERVAL_FIELDS = {"company_id", "active", "date_start", "date_end"}
+
+
+class RuleIntervalIndex(object):
+    """
+    Validity windows of the dated rules of a company, for one usage.
+
+    The dates where a rule starts, or ends, split time into segments
+    during which the same rules are valid. The boundaries are sorted,
+    so the rules valid on a date, and the segment around it, are found
+    by bisection.
+    """
+
+    def __init__(self, intervals):
+        starts, ends = defaultdict(list), defaultdict(list)
+        valid = set()
+        for rule_id, date_start, date_end in intervals:
+            if date_start and date_end and date_end < date_start:
+                continue
+            if date_start:
+                starts[date_start].append(rule_id)
+            else:
+                valid.add(rule_id)
+            if date_end:
+                ends[date_end + timedelta(days=1)].append(rule_id)
+        self.boundaries = sorted(set(starts) | set(ends))
+        self.segments = [frozenset(valid)]
+        for boundary in self.boundaries:
+            valid.update(starts.get(boundary, ()))
+            valid.difference_update(ends.get(boundary, ()))
+            self.segments.append(frozenset(valid))
+
+    def lookup(self, date):
+        """ Ids of the dated rules valid on the date """
+        return self.segments[bisect_right(self.boundaries, date)]
+
+    def window(self, date):
+        """ First and last days of the segment of the date, False if unbounded """
+        index = bisect_right(self.boundaries, date)
+        date_from = index and self.boundaries[index - 1] or False
+        date_to = False
+        if index < len(self.boundaries):
+            date_to = self.boundaries[index] - timedelta(days=1)
+        return date_from, date_to
 
 
 class AccountFiscalPositionRule(models.Model):
@@ -19,6 +79,8 @@ class AccountFiscalPositionRule(models.Model):
 
     description = fields.Char(string="Description")
 
+    active = fields.Boolean(default=True)
+
     from_country = fields.Many2one(comodel_name="res.country", string="Country From")
 
     from_state = fields.Many2one(
@@ -59,6 +121,15 @@ class AccountFiscalPositionRule(models.Model):
         index=True,
     )
 
+    template_id = fields.Many2one(
+        comodel_name="account.fiscal.position.rule.template",
+        string="Template",
+        ondelete="cascade",
+        index=True,
+        readonly=True,
+        help="The template this rule is generated from, and kept in line with.",
+    )
+
     use_sale = fields.Boolean(string="Use in sales order")
 
     use_invoice = fields.Boolean(string="Use in Invoices")
@@ -95,6 +166,64 @@ class AccountFiscalPositionRule(models.Model):
         ),
     )
 
+    def _get_search_indexes(self):
+        """
+        Indexes matching the mapping search: for each usage, the active
+        rules of a company in priority order, which the search scans until
+        the first match. The dated rules are indexed for the interval index.
+        """
+        indexes = [
+            (
+                "%s_%s_sequence_index" % (self._table, usage),
+                "(company_id, sequence, id) WHERE %s = true AND active = true" % usage,
+            )
+            for usage, _label in USAGES
+        ]
+        indexes.append(
+            (
+                "%s_dated_index" % self._table,
+                "(company_id) WHERE date_start IS NOT NULL OR date_end IS NOT NULL",
+            )
+        )
+        return indexes
+
+    def _auto_init(self):
+        res = super()._auto_init()
+        cr = self.env.cr
+        for index_name, definition in self._get_search_indexes():
+            if tools.index_exists(cr, index_name):
+                continue
+            cr.execute(
+                "CREATE INDEX {} ON {} {}".format(index_name, self._table, definition)
+            )
+            _logger.info("Index %s created on %s", index_name, self._table)
+        return res
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        rules = super().create(vals_list)
+        self._invalidate_mapping_caches()
+        self.env["res.partner.fiscal.position"]._invalidate_companies(
+            rules.mapped("company_id")
+        )
+        return rules
+
+    def write(self, vals):
+        companies = self.mapped("company_id")
+        result = super().write(vals)
+        self._invalidate_mapping_caches()
+        self.env["res.partner.fiscal.position"]._invalidate_companies(
+            companies | self.mapped("company_id")
+        )
+        return result
+
+    def unlink(self):
+        companies = self.mapped("company_id")
+        result = super().unlink()
+        self._invalidate_mapping_caches()
+        self.env["res.partner.fiscal.position"]._invalidate_companies(companies)
+        return result
+
     @api.onchange("company_id")
     def onchange_company(self):
         self.from_country = self.company_id.country_id
@@ -117,13 +246,26 @@ class AccountFiscalPositionRule(models.Model):
             "|",
             ("from_state", "=", from_state),
             ("from_state", "=", False),
-            "|",
-            ("date_start", "=", False),
-            ("date_start", "<=", document_date),
-            "|",
-            ("date_end", "=", False),
-            ("date_end", ">=", document_date),
         ]
+        usage = self.env["res.partner.fiscal.position"]._get_usage()
+        if usage:
+            index = self._get_interval_index(company.id, usage)
+            domain += [
+                "|",
+                "&",
+                ("date_start", "=", False),
+                ("date_end", "=", False),
+                ("id", "in", list(index.lookup(fields.Date.to_date(document_date)))),
+            ]
+        else:
+            domain += [
+                "|",
+                ("date_start", "=", False),
+                ("date_start", "<=", document_date),
+                "|",
+                ("date_end", "=", False),
+                ("date_end", ">=", document_date),
+            ]
         if partner.vat:
             domain += [("vat_rule", "in", ["with", "both"])]
         else:
@@ -143,6 +285,150 @@ class AccountFiscalPositionRule(models.Model):
 
         return domain
 
+    @tools.ormcache("company_id", "usage")
+    def _get_interval_index(self, company_id, usage):
+        """
+        Return the interval index of the dated rules of the company, for
+        the usage. It is cached until a rule changes.
+        """
+        self.flush(list(INTERVAL_FIELDS) + [usage])
+        self.env.cr.execute(
+            """
+            SELECT id, date_start, date_end
+            FROM account_fiscal_position_rule
+            WHERE company_id = %s AND active AND {usage}
+                AND (date_start IS NOT NULL OR date_end IS NOT NULL)
+            """.format(usage=usage),
+            (company_id,),
+        )
+        return RuleIntervalIndex(self.env.cr.fetchall())
+
+    @api.model
+    def _get_validity_window(self, company, usage, date):
+        """
+        Return the first and last days around the date during which no rule
+        of the company, for the usage, starts or ends. False means unbounded.
+        """
+        return self._get_interval_index(company.id, usage).window(date)
+
+    @api.model
+    def _invalidate_mapping_caches(self):
+        """
+        Drop the cached mapping results, and the interval indexes with the
+        registry caches, in every worker.
+        """
+        self.env["account.lookup.cache"].invalidate(MAP_CACHE)
+        self.clear_caches()
+
+    def _register_hook(self):
+        super()._register_hook()
+        self.env["account.lookup.cache"]._warm_up_on_load(
+            "Fiscal position rules", self._get_warm_up_loaders()
+        )
+
+    @api.model
+    def _get_warm_up_loaders(self):
+        """
+        Lookups preloaded when the registry is loaded, see
+        ``account.lookup.cache``: the interval indexes of the companies,
+        then the mapping results of the resolved partner fiscal positions.
+        """
+        return [
+            ("interval indexes", self._warm_up_interval_indexes()),
+            ("mapping results", self._warm_up_mapping_results()),
+        ]
+
+    @api.model
+    def _warm_up_interval_indexes(self):
+        self.env.cr.execute(
+            "SELECT DISTINCT company_id FROM account_fiscal_position_rule WHERE active"
+        )
+        for (company_id,) in self.env.cr.fetchall():
+            for usage, _label in USAGES:
+                yield self._get_interval_index(company_id, usage)
+
+    @api.model
+    def _warm_up_mapping_results(self):
+        """
+        Cache the mapping results of the partner fiscal positions valid
+        today, the most recently resolved first. They were resolved with
+        the same inputs, and are deleted when these inputs change.
+        """
+        today = fields.Date.context_today(self)
+        limit = self.env["account.lookup.cache"]._get_warm_up_limits()[1]
+        self.env.cr.execute(
+            """
+            SELECT partner_id, company_id, usage, invoice_address_id,
+                   shipping_address_id, fiscal_position_id
+            FROM res_partner_fiscal_position
+            WHERE (date_from IS NULL OR date_from <= %s)
+                AND (date_to IS NULL OR date_to >= %s)
+            ORDER BY id DESC
+            LIMIT %s
+            """,
+            (today, today, limit),
+        )
+        rows = self.env.cr.fetchall()
+        partner_ids = set()
+        for row in rows:
+            partner_ids.update([row[0], row[3], row[4]])
+        # Browse the partners together, so their addresses are prefetched
+        partners = {
+            partner.id: partner
+            for partner in self.env["res.partner"].browse(partner_ids)
+        }
+        lookup_cache = self.env["account.lookup.cache"]
+        for partner_id, company_id, usage, invoice_id, shipping_id, fp_id in rows:
+            addrs = {"invoice": partners[invoice_id], "shipping": partners[shipping_id]}
+            fingerprint = self._get_map_fingerprint(
+                partners[partner_id],
+                addrs,
+                self.env["res.company"].browse(company_id),
+                usage,
+                today,
+            )
+            lookup_cache.set(MAP_CACHE, fingerprint, fp_id or False)
+            yield fingerprint
+
+    def _get_map_fingerprint(self, partner, addrs, company, usage, date):
+        """
+        The inputs of the mapping domain: two mappings with the same
+        fingerprint return the same fiscal position. The date is replaced
+        by the window during which the dated rules do not change.
+        """
+        company_address = company.partner_id
+        return (
+            company.id,
+            company_address.country_id.id,
+            company_address.state_id.id,
+            usage,
+            bool(partner.vat),
+            self._get_validity_window(company, usage, date),
+            tuple(
+                (address_type, address.country_id.id, address.state_id.id)
+                for address_type, address in sorted(addrs.items())
+            ),
+        )
+
+    def _map_fingerprints(self, company, groups):
+        """
+        Map the fiscal position of each fingerprint, from the partner and
+        addresses of one of the mappings having it, given by fingerprint.
+        The rules are searched once per fingerprint, unless its result is
+        cached. Returns the fiscal positions by fingerprint.
+        """
+        lookup_cache = self.env["account.lookup.cache"]
+        fiscal_position_model = self.env["account.fiscal.position"]
+        result = {}
+        for fingerprint, (partner, addrs) in groups.items():
+            fp_id = lookup_cache.get(MAP_CACHE, fingerprint)
+            if fp_id is None:
+                domain = self._map_domain(partner, addrs, company)
+                fp_id = self.search(domain, limit=1).fiscal_position_id.id
+                lookup_cache.set(MAP_CACHE, fingerprint, fp_id)
+            result[fingerprint] = fiscal_position_model.browse(fp_id)
+        return result
+
     def fiscal_position_map(self, **kwargs):
         result = self.env["account.fiscal.position"]
 
@@ -166,21 +452,72 @@ class AccountFiscalPositionRule(models.Model):
             # In picking case the invoice_id can be empty but we need a
             # value I only see this case, maybe we can move this code in
             # fiscal_stock_rule
-            else:
-                partner_addr = obj_partner_id.address_get(["invoice"])
-                if partner_addr["invoice"]:
-                    addr_id = partner_addr["invoice"]
-                    addrs["invoice"] = self.env["res.partner"].browse(addr_id)
+            elif obj_partner_id.fiscal_position_invoice_address_id:
+                addrs["invoice"] = obj_partner_id.fiscal_position_invoice_address_id
             if obj_partner_shipping_id:
                 addrs["shipping"] = obj_partner_shipping_id
 
+            # Resolved fiscal position of the partner's default addresses
+            partner_fp = self.env["res.partner.fiscal.position"]
+            usage = partner_fp._get_usage()
+            cacheable = usage and set(kwargs) <= MAP_KWARGS
+            if cacheable:
+                document_date = fields.Date.to_date(
+                    self.env.context.get("date", time.strftime("%Y-%m-%d"))
+                )
+                fingerprint = self._get_map_fingerprint(
+                    obj_partner_id, addrs, obj_company_id, usage, document_date
+                )
+                lookup_cache = self.env["account.lookup.cache"]
+                fp_id = lookup_cache.get(MAP_CACHE, fingerprint)
+                if fp_id is not None:
+                    return result.browse(fp_id)
+                cached = partner_fp._lookup(
+                    obj_partner_id, obj_company_id, usage, addrs, document_date
+                )
+                if cached is not None:
+                    return cached
+
             # Case 3: Rule based determination
             domain = self._map_domain(obj_partner_id, addrs, obj_company_id, **kwargs)
             fsc_pos = self.search(domain, limit=1)
             if fsc_pos:
                 result = fsc_pos[0].fiscal_position_id
+            if cacheable:
+                lookup_cache.set(MAP_CACHE, fingerprint, result.id)
 
         return result
 
+    def fiscal_position_map_multi(self, kwargs_list):
+        """
+        Map the fiscal positions of many documents, given as a list of
+        ``fiscal_position_map`` arguments. The invoice addresses of all
+        the partners are resolved at once, and so are, and stored, the
+        fiscal positions of the partners with their default addresses.
+        """
+        partners = self.env["res.partner"]
+        partners_by_company = defaultdict(lambda: self.env["res.partner"])
+        for kwargs in kwargs_list:
+            if kwargs.get("partner_id") and not kwargs.get("partner_invoice_id"):
+                partners |= kwargs["partner_id"]
+            if (
+                kwargs.get("partner_id")
+                and kwargs.get("company_id")
+                and set(kwargs) <= MAP_KWARGS
+            ):
+                partners_by_company[kwargs["company_id"]] |= kwargs["partner_id"]
+        partners.mapped("fiscal_position_invoice_address_id")
+        partner_fp = self.env["res.partner.fiscal.position"]
+        usage = partner_fp._get_usage()
+        if usage:
+            for company, company_partners in partners_by_company.items():
+                partner_fp.resolve(
+                    company_partners,
+                    company,
+                    usage=usage,
+                    date=self.env.context.get("date"),
+                )
+        return [self.fiscal_position_map(**kwargs) for kwargs in kwargs_list]
+
     def apply_fiscal_mapping(self, **kwargs):
         return self.fiscal_position_map(**kwargs)
@@ -0,0 +1,178 @@
+# License AGPL-3 - See http://www.gnu.org/licenses/agpl-3.0.html
+
+import logging
+import random
+from datetime import date, timedelta
+
+from odoo import api, models
+
+_logger = logging.getLogger(__name__)
+
+USE_FIELDS = ["use_sale", "use_invoice", "use_purchase", "use_picking"]
+
+VAT_RULES = ["with", "both", "without", False]
+
+
+class AccountFiscalPositionRuleGenerator(models.AbstractModel):
+    """
+    Generate large, realistic fiscal position rule sets, with matching
+    partners and addresses, to benchmark the mapping at production size.
+
+    Everything is created with batched ``create`` calls, and the output
+    only depends on the given ``seed``.
+    """
+
+    _name = "account.fiscal.position.rule.generator"
+    _description = "Fiscal Position Rule Synthetic Data Generator"
+
+    def _get_generator_countries(self, company, country_count):
+        countries = self.env["res.country"].search(
+            [("state_ids", "!=", False)], limit=country_count, order="id"
+        )
+        return countries | company.country_id
+
+    def _create_in_batches(self, model, vals_list, batch_size):
+        records = self.env[model]
+        for index in range(0, len(vals_list), batch_size):
+            records |= records.create(vals_list[index : index + batch_size])
+        return records
+
+    def _random_address(self, rng, countries, states_by_country):
+        country = rng.choice(countries)
+        states = states_by_country.get(country.id)
+        return country, states and rng.choice(states)
+
+    def _prepare_rule_vals(self, rng, company, fiscal_positions, countries, states):
+        from_state = company.state_id if rng.random() < 0.3 else None
+        vals = {
+            "company_id": company.id,
+            "fiscal_position_id": rng.choice(fiscal_positions).id,
+            "from_country": company.country_id.id if rng.random() < 0.8 else False,
+            "from_state": from_state and from_state.id or False,
+            "vat_rule": rng.choice(VAT_RULES),
+            "sequence": rng.randint(1, 1000),
+        }
+        for address_type in ("invoice", "shipping"):
+            if rng.random() < 0.7:
+                country, state = self._random_address(rng, countries, states)
+                vals["to_%s_country" % address_type] = country.id
+                if state and rng.random() < 0.6:
+                    vals["to_%s_state" % address_type] = state.id
+        uses = [use for use in USE_FIELDS if rng.random() < 0.5]
+        for use in uses or [rng.choice(USE_FIELDS)]:
+            vals[use] = True
+        if rng.random() < 0.2:
+            date_start = date.today() - timedelta(days=rng.randint(0, 5 * 365))
+            vals["date_start"] = date_start
+            if rng.random() < 0.7:
+                vals["date_end"] = date_start + timedelta(days=rng.randint(30, 720))
+        return vals
+
+    def _prepare_partner_vals(self, rng, index, countries, states):
+        country, state = self._random_address(rng, countries, states)
+        return {
+            "name": "Synthetic Partner %d" % index,
+            "is_company": True,
+            "street": "%d Synthetic Street" % index,
+            "city": "Synthetic City",
+            "zip": "%05d" % (index % 100000),
+            "country_id": country.id,
+            "state_id": state and state.id or False,
+            "vat": "SYN%08d" % index if rng.random() < 0.5 else False,
+        }
+
+    def _prepare_address_vals(self, rng, parent, address_type, countries, states):
+        country, state = self._random_address(rng, countries, states)
+        return {
+            "name": "%s (%s)" % (parent.name, address_type),
+            "parent_id": parent.id,
+            "type": address_type,
+            "street": "%d Address Street" % parent.id,
+            "city": "Address City",
+            "country_id": country.id,
+            "state_id": state and state.id or False,
+        }
+
+    @api.model
+    def generate(
+        self,
+        company,
+        rule_count=10000,
+        partner_count=1000,
+        fiscal_position_count=20,
+        country_count=30,
+        seed=None,
+        batch_size=1000,
+    ):
+        """
+        Create ``rule_count`` rules for the company, spread over countries,
+        states, date windows, VAT rules and usages, and ``partner_count``
+        partners, some of them with invoice and delivery addresses.
+        Returns a dict with the created records.
+        """
+        if not self.env.context.get("tracking_disable"):
+            return self.with_context(tracking_disable=True).generate(
+                company,
+                rule_count=rule_count,
+                partner_count=partner_count,
+                fiscal_position_count=fiscal_position_count,
+                country_count=country_count,
+                seed=seed,
+                batch_size=batch_size,
+            )
+        rng = random.Random(seed)
+        countries = self._get_generator_countries(company, country_count)
+        states = {
+            country.id: country.state_ids.sorted("id")
+            for country in countries
+            if country.state_ids
+        }
+        countries = countries.sorted("id")
+
+        fiscal_positions = self.env["account.fiscal.position"].create(
+            [
+                {"name": "Synthetic Fiscal Position %d" % i, "company_id": company.id}
+                for i in range(fiscal_position_count)
+            ]
+        )
+        rule_vals = []
+        for index in range(rule_count):
+            vals = self._prepare_rule_vals(
+                rng, company, fiscal_positions, countries, states
+            )
+            vals["name"] = "Synthetic Rule %d" % index
+            rule_vals.append(vals)
+        rules = self._create_in_batches(
+            "account.fiscal.position.rule", rule_vals, batch_size
+        )
+        _logger.info("Created %d synthetic fiscal position rules", len(rules))
+
+        partners = self._create_in_batches(
+            "res.partner",
+            [
+                self._prepare_partner_vals(rng, index, countries, states)
+                for index in range(partner_count)
+            ],
+            batch_size,
+        )
+        address_vals = []
+        for partner in partners:
+            for address_type, probability in (("invoice", 0.3), ("delivery", 0.5)):
+                if rng.random() < probability:
+                    address_vals.append(
+                        self._prepare_address_vals(
+                            rng, partner, address_type, countries, states
+                        )
+                    )
+        addresses = self._create_in_batches("res.partner", address_vals, batch_size)
+        _logger.info(
+            "Created %d synthetic partners, with %d addresses",
+            len(partners),
+            len(addresses),
+        )
+        return {
+            "fiscal_positions": fiscal_positions,
+            "rules": rules,
+            "partners": partners,
+            "addresses": addresses,
+        }
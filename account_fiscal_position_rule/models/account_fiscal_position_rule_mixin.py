@@ -0,0 +1,55 @@
+# License AGPL-3 - See http://www.gnu.org/licenses/agpl-3.0.html
+
+from collections import defaultdict
+
+from odoo import models
+
+
+class AccountFiscalPositionRuleMixin(models.AbstractModel):
+    """
+    Fiscal position mapping for documents with a ``fiscal_position_id``.
+
+    Inheriting models set ``_fiscal_position_rule_usage`` to the rule
+    usage flag they match, and return the mapping arguments of a document
+    from ``_prepare_fiscal_position_map_kwargs``. They then share the
+    rule engine, its caches, and the bulk mapping of many documents.
+    """
+
+    _name = "account.fiscal.position.rule.mixin"
+    _description = "Fiscal Position Rule Mapping Mixin"
+
+    _fiscal_position_rule_usage = None
+
+    def _prepare_fiscal_position_map_kwargs(self):
+        raise NotImplementedError()
+
+    def _get_fiscal_position_rule_model(self):
+        return self.env["account.fiscal.position.rule"].with_context(
+            use_domain=(self._fiscal_position_rule_usage, "=", True)
+        )
+
+    def _fiscal_position_map(self, **kwargs):
+        return self._get_fiscal_position_rule_model().apply_fiscal_mapping(**kwargs)
+
+    def _fiscal_position_map_multi(self):
+        """ Return the fiscal positions mapped for the documents, in order """
+        kwargs_list = [record._prepare_fiscal_position_map_kwargs() for record in self]
+        return self._get_fiscal_position_rule_model().fiscal_position_map_multi(
+            kwargs_list
+        )
+
+    def _apply_fiscal_position_map(self):
+        """
+        Map the fiscal position of the documents, and write it with one
+        write per fiscal position. Documents without a match are untouched.
+        """
+        to_write = defaultdict(lambda: self.browse())
+        for record, fiscal_position in zip(self, self._fiscal_position_map_multi()):
+            if fiscal_position and record.fiscal_position_id != fiscal_position:
+                to_write[fiscal_position] |= record
+        for fiscal_position, records in to_write.items():
+            records.write({"fiscal_position_id": fiscal_position.id})
+        return True
+
+    def action_fiscal_position_map(self):
+        return self._apply_fiscal_position_map()
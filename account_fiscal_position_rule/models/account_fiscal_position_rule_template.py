@@ -5,7 +5,32 @@
 #   @author: Guewen Baconnier
 # License AGPL-3 - See http://www.gnu.org/licenses/agpl-3.0.html
 
-from odoo import fields, models
+import logging
+from collections import defaultdict
+
+from odoo import api, fields, models
+
+_logger = logging.getLogger(__name__)
+
+# Fields copied from the templates to the generated rules
+SYNC_FIELDS = [
+    "name",
+    "description",
+    "from_country",
+    "from_state",
+    "to_invoice_country",
+    "to_invoice_state",
+    "to_shipping_country",
+    "to_shipping_state",
+    "use_sale",
+    "use_invoice",
+    "use_purchase",
+    "use_picking",
+    "date_start",
+    "date_end",
+    "sequence",
+    "vat_rule",
+]
 
 
 class AccountFiscalPositionRuleTemplate(models.Model):
@@ -15,6 +40,12 @@ class AccountFiscalPositionRuleTemplate(models.Model):
 
     name = fields.Char(string="Name", required=True)
 
+    active = fields.Boolean(
+        default=True,
+        help="The rules generated from an archived template are removed"
+        " by the next synchronisation.",
+    )
+
     description = fields.Char(string="Description")
 
     from_country = fields.Many2one(comodel_name="res.country", string="Country Form")
@@ -87,3 +118,172 @@ class AccountFiscalPositionRuleTemplate(models.Model):
             " field VAT fill for using this fiscal position"
         ),
     )
+
+    rule_ids = fields.One2many(
+        comodel_name="account.fiscal.position.rule",
+        inverse_name="template_id",
+        string="Generated Rules",
+    )
+
+    def _prepare_rule_vals(self, company_id, fiscal_position_id):
+        self.ensure_one()
+        vals = {}
+        for fname in SYNC_FIELDS:
+            value = self[fname]
+            if isinstance(value, models.BaseModel):
+                value = value.id
+            vals[fname] = value
+        vals.update(
+            {
+                "company_id": company_id,
+                "fiscal_position_id": fiscal_position_id,
+                "template_id": self.id,
+            }
+        )
+        return vals
+
+    @api.model
+    def _get_fiscal_position_map(self, templates, companies):
+        """ Fiscal positions of the companies, by (company id, name) """
+        fiscal_positions = self.env["account.fiscal.position"].search(
+            [
+                ("name", "in", templates.mapped("fiscal_position_id.name")),
+                ("company_id", "in", companies.ids),
+            ]
+        )
+        fp_map = {}
+        for fiscal_position in fiscal_positions:
+            key = (fiscal_position.company_id.id, fiscal_position.name)
+            fp_map.setdefault(key, fiscal_position)
+        return fp_map
+
+    @api.model
+    def _get_existing_rule_map(self, templates, companies):
+        """
+        Rules generated for the companies, by (company id, template id).
+        Rules generated before templates were linked are matched by name,
+        and linked to their template. Archived rules are included, so that
+        they are not generated again.
+        """
+        rule_model = self.env["account.fiscal.position.rule"].with_context(
+            active_test=False
+        )
+        rules = rule_model.search(
+            [
+                "|",
+                ("template_id", "in", templates.ids),
+                "&",
+                ("template_id", "=", False),
+                ("name", "in", templates.mapped("name")),
+                ("company_id", "in", companies.ids),
+            ]
+        )
+        templates_by_name = {}
+        for template in templates:
+            templates_by_name.setdefault(template.name, template)
+        rule_map = {}
+        to_link = defaultdict(lambda: rule_model)
+        for rule in rules:
+            template = rule.template_id or templates_by_name[rule.name]
+            key = (rule.company_id.id, template.id)
+            if key in rule_map:
+                continue
+            rule_map[key] = rule
+            if not rule.template_id:
+                to_link[template] |= rule
+        for template, legacy_rules in to_link.items():
+            legacy_rules.write({"template_id": template.id})
+        return rule_map
+
+    @api.model
+    def _get_rule_diff(self, rule, vals):
+        """ Values of ``vals`` which differ from the rule """
+        diff = {}
+        for fname, value in vals.items():
+            current = rule[fname]
+            if isinstance(current, models.BaseModel):
+                current = current.id
+            if current != value:
+                diff[fname] = value
+        return diff
+
+    def _sync_rules(self, companies, update_existing=True, remove_obsolete=True):
+        """
+        Bring the rules of the companies in line with the templates.
+
+        Rules are created for the active templates without a rule yet,
+        rules differing from their template are updated, and the rules
+        of archived templates, or whose fiscal position does not exist
+        in the company, are removed. Only the differences are written,
+        grouped by identical values, so that a run on an already
+        synchronised company costs a few queries.
+        Returns the number of created, updated and removed rules.
+        """
+        rule_model = self.env["account.fiscal.position.rule"]
+        templates = self.with_context(active_test=False)
+        active_templates = templates.filtered("active")
+        fp_map = self._get_fiscal_position_map(active_templates, companies)
+        rule_map = self._get_existing_rule_map(templates, companies)
+
+        vals_list = []
+        to_write = defaultdict(lambda: rule_model)
+        to_unlink = rule_model
+        for company in companies:
+            for template in templates:
+                rule = rule_map.get((company.id, template.id))
+                fiscal_position = template.active and fp_map.get(
+                    (company.id, template.fiscal_position_id.name)
+                )
+                if not fiscal_position:
+                    if rule and remove_obsolete:
+                        to_unlink |= rule
+                    continue
+                vals = template._prepare_rule_vals(company.id, fiscal_position.id)
+                if not rule:
+                    vals_list.append(vals)
+                elif update_existing:
+                    diff = self._get_rule_diff(rule, vals)
+                    if diff:
+                        to_write[tuple(sorted(diff.items()))] |= rule
+
+        to_unlink.unlink()
+        for diff, rules in to_write.items():
+            rules.write(dict(diff))
+        created = rule_model.create(vals_list)
+        result = {
+            "created": len(created),
+            "updated": sum(len(rules) for rules in to_write.values()),
+            "removed": len(to_unlink),
+        }
+        _logger.info(
+            "Fiscal position rules synchronised for %d companies: "
+            "%d created, %d updated, %d removed",
+            len(companies),
+            result["created"],
+            result["updated"],
+            result["removed"],
+        )
+        return result
+
+    @api.model
+    def sync_rules(self, companies=None):
+        """
+        Synchronise the rules generated from templates with all the
+        templates. By default, the companies which already have
+        generated rules are synchronised.
+        """
+        if companies is None:
+            groups = self.env["account.fiscal.position.rule"].read_group(
+                [("template_id", "!=", False)], ["company_id"], ["company_id"]
+            )
+            companies = self.env["res.company"].browse(
+                [group["company_id"][0] for group in groups]
+            )
+        if not companies:
+            return {"created": 0, "updated": 0, "removed": 0}
+        templates = self.with_context(active_test=False).search([])
+        return templates._sync_rules(companies)
+
+    @api.model
+    def _cron_sync_rules(self):
+        self.sync_rules()
@@ -0,0 +1,129 @@
+# License AGPL-3 - See http://www.gnu.org/licenses/agpl-3.0.html
+
+from collections import defaultdict
+
+from odoo import api, fields, models
+
+from .account_fiscal_position_rule import MAP_CACHE
+
+# Partner fields used by the fiscal position mapping
+FISCAL_POSITION_FIELDS = {
+    "vat",
+    "country_id",
+    "state_id",
+    "type",
+    "parent_id",
+    "active",
+    "is_company",
+    "property_account_position_id",
+}
+
+# Partner fields of a company address used by the fiscal position mapping
+COMPANY_ADDRESS_FIELDS = {"country_id", "state_id"}
+
+
+class ResPartner(models.Model):
+    _inherit = "res.partner"
+
+    fiscal_position_invoice_address_id = fields.Many2one(
+        comodel_name="res.partner",
+        string="Fiscal Position Invoice Address",
+        compute="_compute_fiscal_position_invoice_address",
+        help="The invoice address used by the fiscal position mapping"
+        " when the document has none.",
+    )
+
+    def _compute_fiscal_position_invoice_address(self):
+        addresses = self.filtered("id")._get_invoice_addresses()
+        for partner in self:
+            address_id = addresses.get(partner.id)
+            if address_id is None:
+                address_id = partner.address_get(["invoice"])["invoice"]
+            partner.fiscal_position_invoice_address_id = address_id
+
+    def _get_invoice_addresses(self):
+        """
+        Return the invoice address of the partners, by partner id, as
+        ``address_get(["invoice"])`` does, with one query loading the
+        families of all the partners.
+        """
+        if not self:
+            return {}
+        self.flush(
+            ["parent_id", "type", "is_company", "active", "commercial_partner_id"]
+        )
+        self.env.cr.execute(
+            """
+            SELECT id, parent_id, type, is_company, active
+            FROM res_partner
+            WHERE commercial_partner_id IN (
+                SELECT commercial_partner_id FROM res_partner WHERE id IN %s
+            )
+            ORDER BY display_name
+            """,
+            (tuple(self.ids),),
+        )
+        nodes = {}
+        children = defaultdict(list)
+        rows = self.env.cr.fetchall()
+        for partner_id, parent_id, partner_type, is_company, active in rows:
+            nodes[partner_id] = (parent_id, partner_type, is_company)
+            if parent_id and active and not is_company:
+                children[parent_id].append(partner_id)
+
+        adr_pref = {"invoice", "contact"}
+        result = {}
+        for partner_id in self.ids:
+            found = {}
+            visited = set()
+            current = partner_id
+            while current:
+                # Scan descendants, depth first
+                to_scan = [current]
+                while to_scan and len(found) < len(adr_pref):
+                    record = to_scan.pop(0)
+                    visited.add(record)
+                    record_type = nodes[record][1]
+                    if record_type in adr_pref and record_type not in found:
+                        found[record_type] = record
+                    to_scan = [
+                        child for child in children[record] if child not in visited
+                    ] + to_scan
+                # Continue at the ancestor, up to the commercial entity
+                parent_id, __, is_company = nodes[current]
+                if len(found) == len(adr_pref) or is_company or not parent_id:
+                    break
+                current = parent_id
+            result[partner_id] = (
+                found.get("invoice") or found.get("contact") or partner_id
+            )
+        return result
+
+    def _invalidate_fiscal_position_addresses(self):
+        # A change on an address can change the invoice address of its family
+        self.env["res.partner"].invalidate_cache(["fiscal_position_invoice_address_id"])
+        self.env["res.partner.fiscal.position"]._invalidate_partners(self)
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        partners = super().create(vals_list)
+        addresses = partners.filtered("parent_id")
+        if addresses:
+            addresses._invalidate_fiscal_position_addresses()
+        return partners
+
+    def write(self, vals):
+        if not FISCAL_POSITION_FIELDS.intersection(vals):
+            return super().write(vals)
+        # Before and after the write, as the families can change
+        self._invalidate_fiscal_position_addresses()
+        result = super().write(vals)
+        self._invalidate_fiscal_position_addresses()
+        if COMPANY_ADDRESS_FIELDS.intersection(vals):
+            # The rules of a company depend on the address it ships from
+            Company = self.env["res.company"].sudo()
+            companies = Company.search([("partner_id", "in", self.ids)])
+            if companies:
+                self.env["res.partner.fiscal.position"]._invalidate_companies(companies)
+                self.env["account.lookup.cache"].invalidate(MAP_CACHE)
+        return result
@@ -0,0 +1,262 @@
+# License AGPL-3 - See http://www.gnu.org/licenses/agpl-3.0.html
+
+import logging
+from collections import defaultdict
+
+import psycopg2
+
+from odoo import api, fields, models
+
+_logger = logging.getLogger(__name__)
+
+USAGES = [
+    ("use_sale", "Sales Orders"),
+    ("use_invoice", "Invoices"),
+    ("use_purchase", "Purchases"),
+    ("use_picking", "Pickings"),
+]
+
+
+class ResPartnerFiscalPosition(models.Model):
+    """
+    Fiscal position resolved by the rules for a partner, per company and
+    usage, with its default invoice and delivery addresses.
+
+    A row is valid for the document dates within its validity window,
+    during which no rule of the company starts or ends. Rows are written
+    with plain SQL when the partners are resolved in bulk, as the
+    documents are mapped in bulk, and deleted when the partner, its
+    addresses or the rules change. The mapping of a single document, on
+    onchanges, only reads them.
+    """
+
+    _name = "res.partner.fiscal.position"
+    _description = "Partner Resolved Fiscal Position"
+    _log_access = False
+
+    partner_id = fields.Many2one(
+        comodel_name="res.partner",
+        string="Partner",
+        required=True,
+        ondelete="cascade",
+        index=True,
+    )
+
+    company_id = fields.Many2one(
+        comodel_name="res.company", string="Company", required=True, ondelete="cascade"
+    )
+
+    usage = fields.Selection(selection=USAGES, required=True)
+
+    invoice_address_id = fields.Many2one(
+        comodel_name="res.partner", string="Invoice Address", ondelete="cascade"
+    )
+
+    shipping_address_id = fields.Many2one(
+        comodel_name="res.partner", string="Delivery Address", ondelete="cascade"
+    )
+
+    fiscal_position_id = fields.Many2one(
+        comodel_name="account.fiscal.position",
+        string="Fiscal Position",
+        ondelete="cascade",
+    )
+
+    date_from = fields.Date(string="Valid From")
+
+    date_to = fields.Date(string="Valid To")
+
+    _sql_constraints = [
+        (
+            "partner_company_usage_uniq",
+            "unique(partner_id, company_id, usage)",
+            "A partner has one resolved fiscal position per company and usage.",
+        )
+    ]
+
+    @api.model
+    def _get_usage(self):
+        """ The usage of the current mapping, from the ``use_domain`` context """
+        use_domain = self.env.context.get("use_domain", ("use_sale", "=", True))
+        field, operator, value = use_domain
+        if operator == "=" and value is True and field in dict(USAGES):
+            return field
+        return None
+
+    @api.model
+    def _lookup(self, partner, company, usage, addrs, date):
+        """
+        Return the resolved fiscal position of the partner, or None when
+        there is no valid row for these addresses and date.
+        """
+        if set(addrs) != {"invoice", "shipping"}:
+            return None
+        addresses = {partner.id: (addrs["invoice"].id, addrs["shipping"].id)}
+        return self._lookup_multi(partner, company, usage, addresses, date).get(
+            partner.id
+        )
+
+    @api.model
+    def _lookup_multi(self, partners, company, usage, addresses, date):
+        """
+        Return the resolved fiscal positions of the partners having a valid
+        row for their ``addresses``, (invoice id, delivery id) by partner id,
+        and the date. Returns them by partner id.
+        """
+        self.env.cr.execute(
+            """
+            SELECT partner_id, fiscal_position_id, invoice_address_id,
+                   shipping_address_id, date_from, date_to
+            FROM res_partner_fiscal_position
+            WHERE partner_id IN %s AND company_id = %s AND usage = %s
+            """,
+            (tuple(partners.ids), company.id, usage),
+        )
+        fiscal_position_model = self.env["account.fiscal.position"]
+        result = {}
+        for row in self.env.cr.fetchall():
+            partner_id, fp_id, invoice_id, shipping_id, date_from, date_to = row
+            if (
+                (invoice_id, shipping_id) != addresses[partner_id]
+                or date_from
+                and date < date_from
+                or date_to
+                and date > date_to
+            ):
+                continue
+            result[partner_id] = fiscal_position_model.browse(fp_id)
+        return result
+
+    @api.model
+    def _get_default_addresses(self, partner):
+        addresses = partner.address_get(["invoice", "delivery"])
+        return addresses["invoice"], addresses["delivery"]
+
+    @api.model
+    def _store(self, company, usage, date, rows):
+        """
+        Store the fiscal positions resolved for partners with their default
+        addresses, given as (partner id, invoice address id, delivery
+        address id, fiscal position id) rows.
+        """
+        if not rows:
+            return False
+        date_from, date_to = self.env[
+            "account.fiscal.position.rule"
+        ]._get_validity_window(company, usage, date)
+        values = []
+        for partner_id, invoice_id, shipping_id, fp_id in rows:
+            values += [
+                partner_id,
+                company.id,
+                usage,
+                invoice_id,
+                shipping_id,
+                fp_id or None,
+                date_from or None,
+                date_to or None,
+            ]
+        try:
+            with self.env.cr.savepoint():
+                self.env.cr.execute(
+                    """
+                    INSERT INTO res_partner_fiscal_position
+                        (partner_id, company_id, usage, invoice_address_id,
+                         shipping_address_id, fiscal_position_id,
+                         date_from, date_to)
+                    VALUES {}
+                    ON CONFLICT (partner_id, company_id, usage) DO UPDATE SET
+                        invoice_address_id = EXCLUDED.invoice_address_id,
+                        shipping_address_id = EXCLUDED.shipping_address_id,
+                        fiscal_position_id = EXCLUDED.fiscal_position_id,
+                        date_from = EXCLUDED.date_from,
+                        date_to = EXCLUDED.date_to
+                    """.format(
+                        ", ".join(["(%s, %s, %s, %s, %s, %s, %s, %s)"] * len(rows))
+                    ),
+                    values,
+                )
+        except psycopg2.Error as e:
+            # A concurrent transaction stored the same rows: keep them
+            _logger.debug("Partner fiscal positions not stored: %s", e)
+            return False
+        return True
+
+    @api.model
+    def resolve(self, partners, company, usage="use_sale", date=None):
+        """
+        Resolve and store the fiscal position of the partners, with their
+        default addresses. The rules are searched once for all the partners
+        sharing the same mapping inputs. Returns the fiscal positions by
+        partner id.
+        """
+        date = fields.Date.to_date(date or fields.Date.context_today(self))
+        rule_model = self.env["account.fiscal.position.rule"].with_context(
+            use_domain=(usage, "=", True), date=fields.Date.to_string(date)
+        )
+        result = {}
+        # As for the mapping, the fiscal position of the partner comes first
+        for partner in partners.filtered("property_account_position_id"):
+            result[partner.id] = partner.property_account_position_id
+        partners = partners.filtered(lambda p: p.id not in result)
+        if not partners:
+            return result
+        addresses = {
+            partner.id: self._get_default_addresses(partner) for partner in partners
+        }
+        result.update(self._lookup_multi(partners, company, usage, addresses, date))
+        groups = defaultdict(list)
+        for partner in partners.filtered(lambda p: p.id not in result):
+            invoice_id, shipping_id = addresses[partner.id]
+            addrs = {
+                "invoice": partner.browse(invoice_id),
+                "shipping": partner.browse(shipping_id),
+            }
+            fingerprint = rule_model._get_map_fingerprint(
+                partner, addrs, company, usage, date
+            )
+            groups[fingerprint].append((partner, addrs))
+        mapped = rule_model._map_fingerprints(
+            company, {fingerprint: group[0] for fingerprint, group in groups.items()}
+        )
+        rows = []
+        for fingerprint, group in groups.items():
+            fiscal_position = mapped[fingerprint]
+            for partner, addrs in group:
+                result[partner.id] = fiscal_position
+                rows.append(
+                    (
+                        partner.id,
+                        addrs["invoice"].id,
+                        addrs["shipping"].id,
+                        fiscal_position.id,
+                    )
+                )
+        self._store(company, usage, date, rows)
+        return result
+
+    @api.model
+    def _invalidate_partners(self, partners):
+        """ Drop the rows of the partners, and of their whole families """
+        commercial_ids = tuple(set(partners.mapped("commercial_partner_id").ids))
+        if not commercial_ids:
+            return
+        partners.flush(["commercial_partner_id"])
+        self.env.cr.execute(
+            """
+            DELETE FROM res_partner_fiscal_position
+            WHERE partner_id IN (
+                SELECT id FROM res_partner WHERE commercial_partner_id IN %s
+            ) OR partner_id IN %s
+            """,
+            (commercial_ids, tuple(partners.ids) or (0,)),
+        )
+
+    @api.model
+    def _invalidate_companies(self, companies):
+        if not companies:
+            return
+        self.env.cr.execute(
+            "DELETE FROM res_partner_fiscal_position WHERE company_id IN %s",
+            (tuple(companies.ids),),
+        )
@@ -1 +1,2 @@
 from . import test_account_fiscal_position_rule
+from . import test_fiscal_position_rule_benchmark
@@ -0,0 +1,101 @@
+# Copyright 2020 ACSONE SA/NV
+# License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl).
+
+from odoo.addons.account_lookup_cache.tests.common import QueryBudgetMixin
+
+
+class FiscalPositionRuleBenchmarkMixin(QueryBudgetMixin):
+    """
+    Helpers to build synthetic companies with fiscal position rule sets,
+    and to check the SQL queries spent on a code block against a budget.
+    """
+
+    @classmethod
+    def _create_benchmark_company(cls, name, country, state=None):
+        company = cls.env["res.company"].create(
+            {"name": name, "country_id": country.id, "state_id": state and state.id}
+        )
+        cls.env.user.company_ids |= company
+        return company
+
+    @classmethod
+    def _create_benchmark_rules(cls, company, rule_count, use="use_sale"):
+        """
+        Create ``rule_count`` rules for the company, spread over the
+        destination countries and states, VAT rules and date windows,
+        plus a catch-all rule with the lowest priority.
+        Returns the fiscal positions and the rules.
+        """
+        fiscal_positions = cls.env["account.fiscal.position"].create(
+            [
+                {"name": "Benchmark FP %d" % i, "company_id": company.id}
+                for i in range(5)
+            ]
+        )
+        countries = cls._get_benchmark_countries()
+        states = cls._get_benchmark_states()
+        vat_rules = ["with", "both", "without", False]
+        vals_list = []
+        for i in range(rule_count):
+            country = countries[i % len(countries)]
+            vals = {
+                "name": "Benchmark rule %d" % i,
+                "company_id": company.id,
+                "fiscal_position_id": fiscal_positions[i % 5].id,
+                "from_country": company.country_id.id,
+                "to_invoice_country": country.id,
+                "vat_rule": vat_rules[i % len(vat_rules)],
+                "sequence": 10 + i,
+                use: True,
+            }
+            if country == cls.env.ref("base.us"):
+                vals["to_invoice_state"] = states[i % len(states)].id
+            if i % 7 == 0:
+                vals["date_start"] = "2000-01-01"
+                vals["date_end"] = "2000-12-31"
+            vals_list.append(vals)
+        vals_list.append(
+            {
+                "name": "Benchmark catch-all rule",
+                "company_id": company.id,
+                "fiscal_position_id": fiscal_positions[0].id,
+                "sequence": 10 + rule_count,
+                use: True,
+            }
+        )
+        rules = cls.env["account.fiscal.position.rule"].create(vals_list)
+        return fiscal_positions, rules
+
+    @classmethod
+    def _create_benchmark_partners(cls, partner_count):
+        countries = cls._get_benchmark_countries()
+        states = cls._get_benchmark_states()
+        vals_list = []
+        for i in range(partner_count):
+            country = countries[i % len(countries)]
+            vals = {
+                "name": "Benchmark partner %d" % i,
+                "is_company": True,
+                "country_id": country.id,
+                "vat": "BENCH%d" % i if i % 2 else False,
+            }
+            if country == cls.env.ref("base.us"):
+                vals["state_id"] = states[i % len(states)].id
+            vals_list.append(vals)
+        return cls.env["res.partner"].create(vals_list)
+
+    @classmethod
+    def _get_benchmark_countries(cls):
+        return (
+            cls.env.ref("base.us")
+            | cls.env.ref("base.ca")
+            | cls.env.ref("base.fr")
+            | cls.env.ref("base.be")
+            | cls.env.ref("base.de")
+        )
+
+    @classmethod
+    def _get_benchmark_states(cls):
+        return cls.env["res.country.state"].search(
+            [("country_id", "=", cls.env.ref("base.us").id)], limit=10
+        )
@@ -1,10 +1,15 @@
 # Copyright 2020 ACSONE SA/NV
 # License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl).
 
+from unittest import mock
+
+from odoo import fields
 from odoo.tests.common import SavepointCase
 
+from odoo.addons.account_lookup_cache.tests.common import LookupCacheCaseMixin
+
 
-class TestAccountFiscalPositionRule(SavepointCase):
+class TestAccountFiscalPositionRule(LookupCacheCaseMixin, SavepointCase):
     @classmethod
     def setUpClass(cls):
         super(TestAccountFiscalPositionRule, cls).setUpClass()
@@ -148,3 +153,422 @@ class TestAccountFiscalPositionRule(SavepointCase):
         kw = {"company_id": self.company_main, "partner_id": self.partner_02}
         res = self.fp_rule_01.fiscal_position_map(**kw)
         self.assertEqual(res, self.fiscal_position_01)
+
+    def test_05(self):
+        """
+        Data:
+            - /
+        Test case:
+            - Generate a synthetic rule set
+        Expected result:
+            - The requested number of rules and partners are created,
+              every rule is used somewhere
+        """
+        result = self.env["account.fiscal.position.rule.generator"].generate(
+            self.company_main, rule_count=50, partner_count=10, seed=42
+        )
+        self.assertEqual(len(result["rules"]), 50)
+        self.assertEqual(len(result["partners"]), 10)
+        self.assertEqual(result["rules"].mapped("company_id"), self.company_main)
+        for rule in result["rules"]:
+            self.assertTrue(
+                rule.use_sale
+                or rule.use_invoice
+                or rule.use_purchase
+                or rule.use_picking
+            )
+
+    def test_06(self):
+        """
+        Data:
+            - Existing rule templates
+            - A second company, with only one of the fiscal positions
+        Test case:
+            - Generate rules for both companies, twice
+        Expected result:
+            - Rules are generated per company, with the company fiscal
+              positions, and are not duplicated by the second run
+        """
+        company_02 = self.env["res.company"].create({"name": "Company 02"})
+        fiscal_position_03 = self.fiscal_position_model.create(
+            {"name": "Tax Exempt", "company_id": company_02.id}
+        )
+        companies = self.company_main | company_02
+        for _run in range(2):
+            self.wizard_model.create(
+                {"company_ids": [(6, 0, companies.ids)]}
+            ).action_create()
+        rules = self.fiscal_position_rule_model.search(
+            [("name", "in", ["Rule 01", "Rule 02"])]
+        )
+        self.assertEqual(len(rules.filtered(lambda r: r.company_id == company_02)), 1)
+        self.assertEqual(
+            rules.filtered(lambda r: r.company_id == company_02).fiscal_position_id,
+            fiscal_position_03,
+        )
+        self.assertEqual(
+            len(rules.filtered(lambda r: r.company_id == self.company_main)), 2
+        )
+        # Existing rules are updated on request
+        self.fp_rule_template_01.sequence = 99
+        self.wizard_model.create(
+            {"company_ids": [(6, 0, companies.ids)], "update_existing": True}
+        ).action_create()
+        self.assertEqual(
+            rules.filtered(lambda r: r.name == "Rule 02").mapped("sequence"), [99]
+        )
+
+    def test_07(self):
+        """
+        Data:
+            - Rules generated from the templates
+        Test case:
+            - Change a template, archive another one, and synchronise
+        Expected result:
+            - Only the changed rule is updated, the rule of the archived
+              template is removed, and a second run changes nothing
+        """
+        template_model = self.fiscal_position_rule_template_model
+        self.wizard_model.create({"company_id": self.company_main.id}).action_create()
+        rules = self.fiscal_position_rule_model.search([("template_id", "!=", False)])
+        self.assertEqual(len(rules), 2)
+        template_01 = template_model.search([("name", "=", "Rule 01")])
+        template_02 = template_model.search([("name", "=", "Rule 02")])
+        template_02.write({"sequence": 42, "vat_rule": "with"})
+        template_01.active = False
+        result = template_model.sync_rules()
+        self.assertEqual(result, {"created": 0, "updated": 1, "removed": 1})
+        rule = self.fiscal_position_rule_model.search(
+            [("template_id", "=", template_02.id)]
+        )
+        self.assertEqual((rule.sequence, rule.vat_rule), (42, "with"))
+        self.assertFalse(
+            self.fiscal_position_rule_model.search(
+                [("template_id", "=", template_01.id)]
+            )
+        )
+        result = template_model.sync_rules()
+        self.assertEqual(result, {"created": 0, "updated": 0, "removed": 0})
+        # Restoring the template brings its rule back
+        template_01.active = True
+        result = template_model.sync_rules()
+        self.assertEqual(result, {"created": 1, "updated": 0, "removed": 0})
+
+    def test_08(self):
+        """
+        Data:
+            - A broad rule of high priority, and narrower rules after it
+        Test case:
+            - Analyse the rules of the company, and archive the listed ones
+        Expected result:
+            - Shadowed, duplicate, expired and unused rules are reported,
+              rules of higher priority are kept, and the listed rules
+              are archived
+        """
+        rule_model = self.fiscal_position_rule_model
+        values = {
+            "company_id": self.company_main.id,
+            "fiscal_position_id": self.fiscal_position_02.id,
+            "use_sale": True,
+            "vat_rule": "both",
+        }
+        broad = rule_model.create(dict(values, name="Broad", sequence=1))
+        narrow = rule_model.create(
+            dict(
+                values,
+                name="Narrow",
+                sequence=0,
+                to_invoice_country=self.country_fr.id,
+                vat_rule="with",
+            )
+        )
+        shadowed = rule_model.create(
+            dict(
+                values,
+                name="Shadowed",
+                sequence=5,
+                to_invoice_country=self.country_fr.id,
+                fiscal_position_id=self.fiscal_position_01.id,
+            )
+        )
+        duplicate = rule_model.create(dict(values, name="Duplicate", sequence=6))
+        expired = rule_model.create(
+            dict(values, name="Expired", sequence=7, date_end="2000-12-31")
+        )
+        unused = rule_model.create(dict(values, name="Unused", use_sale=False))
+        wizard = self.env["wizard.account.fiscal.position.rule.analyse"].create(
+            {"company_ids": [(6, 0, self.company_main.ids)]}
+        )
+        wizard.action_analyse()
+        reasons = {line.rule_id: line.reason for line in wizard.line_ids}
+        self.assertEqual(reasons[shadowed], "shadowed")
+        self.assertEqual(reasons[duplicate], "duplicate")
+        self.assertEqual(reasons[expired], "expired")
+        self.assertEqual(reasons[unused], "unused")
+        self.assertNotIn(broad, reasons)
+        self.assertNotIn(narrow, reasons)
+        line = wizard.line_ids.filtered(lambda x: x.rule_id == shadowed)
+        self.assertEqual(line.shadowing_rule_id, broad)
+        wizard.action_archive()
+        self.assertFalse(shadowed.active)
+        self.assertTrue(broad.active)
+
+    def test_09(self):
+        """
+        Data:
+            - A partner mapped with its default addresses
+        Test case:
+            - Resolve it, then change the partner and the rules
+        Expected result:
+            - The resolved fiscal position is stored, returned by the
+              mapping, and dropped when the partner or the rules change
+        """
+        partner_fp_model = self.env["res.partner.fiscal.position"]
+        domain = [
+            ("partner_id", "=", self.partner_02.id),
+            ("company_id", "=", self.company_main.id),
+            ("usage", "=", "use_sale"),
+        ]
+        self.partner_02.vat = False
+        result = partner_fp_model.resolve(self.partner_02, self.company_main)
+        self.assertEqual(result[self.partner_02.id], self.fiscal_position_01)
+        resolved = partner_fp_model.search(domain)
+        self.assertEqual(resolved.fiscal_position_id, self.fiscal_position_01)
+        self.assertFalse(resolved.date_from)
+        # The stored result is used, even if it was changed behind the rules
+        resolved.fiscal_position_id = self.fiscal_position_02
+        resolved.flush()
+        self.fiscal_position_rule_model._invalidate_mapping_caches()
+        result = partner_fp_model.resolve(self.partner_02, self.company_main)
+        self.assertEqual(result[self.partner_02.id], self.fiscal_position_02)
+        # Partner changes drop it
+        self.partner_02.vat = "BE0477472701"
+        self.assertFalse(partner_fp_model.search(domain))
+        partner_fp_model.resolve(self.partner_02, self.company_main)
+        self.assertTrue(partner_fp_model.search(domain))
+        # So do rule changes
+        self.fp_rule_01.date_end = "2100-12-31"
+        self.assertFalse(partner_fp_model.search(domain))
+        partner_fp_model.resolve(self.partner_02, self.company_main)
+        resolved = partner_fp_model.search(domain)
+        self.assertEqual(str(resolved.date_to), "2100-12-31")
+
+    def test_10(self):
+        """
+        Data:
+            - A dated rule of high priority, and the catch-all rule
+        Test case:
+            - Map the fiscal position on dates in and out of its window
+        Expected result:
+            - The dated rule applies within its window only, and the
+              interval index reports the window around each date
+        """
+        self.partner_01.vat = False
+        self.fiscal_position_rule_model.create(
+            {
+                "name": "Dated rule",
+                "company_id": self.company_main.id,
+                "fiscal_position_id": self.fiscal_position_02.id,
+                "use_invoice": True,
+                "sequence": 1,
+                "date_start": "2020-01-01",
+                "date_end": "2020-12-31",
+            }
+        )
+        self.fp_rule_01.use_invoice = True
+        kw = {"company_id": self.company_main, "partner_id": self.partner_01}
+        expected = [
+            ("2019-12-31", self.fiscal_position_01),
+            ("2020-01-01", self.fiscal_position_02),
+            ("2020-12-31", self.fiscal_position_02),
+            ("2021-01-01", self.fiscal_position_01),
+        ]
+        for date, fiscal_position in expected:
+            rule_model = self.fiscal_position_rule_model.with_context(
+                date=date, use_domain=("use_invoice", "=", True)
+            )
+            self.assertEqual(rule_model.fiscal_position_map(**kw), fiscal_position)
+        index = self.fiscal_position_rule_model._get_interval_index(
+            self.company_main.id, "use_invoice"
+        )
+        self.assertEqual(
+            index.window(fields.Date.to_date("2020-06-01")),
+            (fields.Date.to_date("2020-01-01"), fields.Date.to_date("2020-12-31")),
+        )
+        self.assertEqual(
+            index.window(fields.Date.to_date("2021-06-01")),
+            (fields.Date.to_date("2021-01-01"), False),
+        )
+
+    def test_11(self):
+        """
+        Data:
+            - /
+        Test case:
+            - Look for the indexes of the mapping search
+        Expected result:
+            - A partial index exists for each usage
+        """
+        rule_model = self.fiscal_position_rule_model
+        self.env.cr.execute(
+            "SELECT indexname, indexdef FROM pg_indexes WHERE tablename = %s",
+            (rule_model._table,),
+        )
+        indexes = dict(self.env.cr.fetchall())
+        for index_name, _definition in rule_model._get_search_indexes():
+            self.assertIn(index_name, indexes)
+        self.assertIn(
+            "WHERE ((use_sale = true) AND (active = true))",
+            indexes["account_fiscal_position_rule_use_sale_sequence_index"],
+        )
+
+    def test_12(self):
+        """
+        Data:
+            - Companies with contacts, and nested invoice addresses
+        Test case:
+            - Resolve the invoice addresses of all the partners at once,
+              and map the fiscal positions of many partners
+        Expected result:
+            - The invoice addresses are the ones of ``address_get``,
+              and the mappings are the ones done one by one
+        """
+        partner_model = self.env["res.partner"]
+        company = partner_model.create({"name": "Family", "is_company": True})
+        contact = partner_model.create({"name": "Contact", "parent_id": company.id})
+        partner_model.create(
+            {"name": "Invoicing", "parent_id": contact.id, "type": "invoice"}
+        )
+        partners = partner_model.search(
+            ["|", ("child_ids", "!=", False), ("parent_id", "!=", False)]
+        )
+        addresses = partners._get_invoice_addresses()
+        for partner in partners:
+            self.assertEqual(
+                addresses[partner.id],
+                partner.address_get(["invoice"])["invoice"],
+                partner.display_name,
+            )
+        kwargs_list = [
+            {"company_id": self.company_main, "partner_id": partner}
+            for partner in partners
+        ]
+        results = self.fp_rule_01.fiscal_position_map_multi(kwargs_list)
+        for kwargs, result in zip(kwargs_list, results):
+            self.assertEqual(result, self.fp_rule_01.fiscal_position_map(**kwargs))
+
+    def test_13(self):
+        """
+        Data:
+            - A partner mapped with its default addresses
+        Test case:
+            - Drop the cached mapping results, then warm up the caches
+        Expected result:
+            - The mapping result of the partner is cached again
+        """
+        lookup_cache = self.env["account.lookup.cache"]
+        rule_model = self.fiscal_position_rule_model
+        result = self.env["res.partner.fiscal.position"].resolve(
+            self.partner_02, self.company_main
+        )
+        addresses = self.partner_02.address_get(["invoice", "delivery"])
+        addrs = {
+            "invoice": self.partner_02.browse(addresses["invoice"]),
+            "shipping": self.partner_02.browse(addresses["delivery"]),
+        }
+        fingerprint = rule_model._get_map_fingerprint(
+            self.partner_02,
+            addrs,
+            self.company_main,
+            "use_sale",
+            fields.Date.context_today(rule_model),
+        )
+        rule_model._invalidate_mapping_caches()
+        self.assertIsNone(lookup_cache.get("account.fiscal.position.rule", fingerprint))
+        loaded = lookup_cache._warm_up("Test", rule_model._get_warm_up_loaders())
+        self.assertTrue(loaded["interval indexes"])
+        self.assertTrue(loaded["mapping results"])
+        self.assertEqual(
+            lookup_cache.get("account.fiscal.position.rule", fingerprint),
+            result[self.partner_02.id].id,
+        )
+
+    def test_14(self):
+        """
+        Data:
+            - Rules depending on the state the company ships from
+        Test case:
+            - Resolve the fiscal position of a partner, move the company
+              address to another state, then resolve it again
+        Expected result:
+            - The rule of the new company state is used
+        """
+        state_ca = self.env.ref("base.state_us_5")
+        state_ny = self.env["res.country.state"].search(
+            [("country_id", "=", self.country_us.id), ("code", "=", "NY")]
+        )
+        self.fp_rule_01.active = False
+        self.company_main.partner_id.write(
+            {"country_id": self.country_us.id, "state_id": state_ca.id}
+        )
+        for sequence, state, fiscal_position in (
+            (1, state_ca, self.fiscal_position_01),
+            (2, state_ny, self.fiscal_position_02),
+        ):
+            self.fiscal_position_rule_model.create(
+                {
+                    "name": "Rule from %s" % state.code,
+                    "company_id": self.company_main.id,
+                    "sequence": sequence,
+                    "from_country": self.country_us.id,
+                    "from_state": state.id,
+                    "fiscal_position_id": fiscal_position.id,
+                    "use_sale": True,
+                }
+            )
+        partner_fp = self.env["res.partner.fiscal.position"]
+        result = partner_fp.resolve(self.partner_02, self.company_main)
+        self.assertEqual(result[self.partner_02.id], self.fiscal_position_01)
+        self.company_main.partner_id.state_id = state_ny
+        result = partner_fp.resolve(self.partner_02, self.company_main)
+        self.assertEqual(result[self.partner_02.id], self.fiscal_position_02)
+
+    def test_15(self):
+        """
+        Data:
+            - Partners mapped with their default addresses
+        Test case:
+            - Map one partner, as onchanges do, then map documents of
+              several partners in bulk
+        Expected result:
+            - Only the bulk mapping stores the resolved fiscal positions,
+              with one rule search for the partners sharing the same inputs
+        """
+        partner_fp_model = self.env["res.partner.fiscal.position"]
+        partners = self.partner_02 | self.partner_02.copy() | self.partner_02.copy()
+        partners.write({"vat": False})
+        domain = [("partner_id", "in", partners.ids)]
+        kwargs_list = [
+            {
+                "partner_id": partner,
+                "company_id": self.company_main,
+                "partner_invoice_id": partner,
+                "partner_shipping_id": partner,
+            }
+            for partner in partners
+        ]
+        self.fiscal_position_rule_model.fiscal_position_map(**kwargs_list[0])
+        self.assertFalse(partner_fp_model.search(domain))
+        self.fiscal_position_rule_model._invalidate_mapping_caches()
+        rule_model = type(self.fiscal_position_rule_model)
+        with mock.patch.object(
+            rule_model, "search", autospec=True, side_effect=rule_model.search
+        ) as search:
+            results = self.fiscal_position_rule_model.fiscal_position_map_multi(
+                kwargs_list
+            )
+        self.assertEqual(search.call_count, 1)
+        self.assertEqual(results, [self.fiscal_position_01] * 3)
+        resolved = partner_fp_model.search(domain)
+        self.assertEqual(resolved.mapped("partner_id"), partners)
+        self.assertEqual(resolved.mapped("fiscal_position_id"), self.fiscal_position_01)
@@ -0,0 +1,165 @@
+# Copyright 2020 ACSONE SA/NV
+# License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl).
+
+import logging
+import time
+
+from odoo.tests.common import SavepointCase, tagged
+
+from .common import FiscalPositionRuleBenchmarkMixin
+
+_logger = logging.getLogger(__name__)
+
+
+@tagged("post_install", "-at_install")
+class TestFiscalPositionRuleBenchmark(FiscalPositionRuleBenchmarkMixin, SavepointCase):
+    query_budgets = {"fiscal_position_map": 8, "fiscal_position_map_first": 15}
+    rule_count_small = 10
+    rule_count_large = 500
+    partner_count = 20
+
+    @classmethod
+    def setUpClass(cls):
+        super(TestFiscalPositionRuleBenchmark, cls).setUpClass()
+        us = cls.env.ref("base.us")
+        state = cls.env["res.country.state"].search(
+            [("country_id", "=", us.id)], limit=1
+        )
+        cls.company_small = cls._create_benchmark_company("Bench Small", us, state)
+        cls.company_large = cls._create_benchmark_company("Bench Large", us, state)
+        cls._create_benchmark_rules(cls.company_small, cls.rule_count_small)
+        cls._create_benchmark_rules(cls.company_large, cls.rule_count_large)
+        cls.partners = cls._create_benchmark_partners(cls.partner_count)
+        cls.rule_model = cls.env["account.fiscal.position.rule"]
+
+    def _map(self, company, partner):
+        return self.rule_model.fiscal_position_map(
+            company_id=company,
+            partner_id=partner,
+            partner_invoice_id=partner,
+            partner_shipping_id=partner,
+        )
+
+    def test_fiscal_position_map_budget(self):
+        """
+        Data:
+            - A company with many rules, and partners in several countries
+        Test case:
+            - Map the fiscal position of each partner
+        Expected result:
+            - Every mapping stays within its query budget, the first one
+              of a partner included
+        """
+        # Warm up the registry caches
+        self._map(self.company_large, self.partners[0])
+        for partner in self.partners[1:]:
+            with self.assertQueryBudget(
+                "fiscal_position_map first %s" % partner.name,
+                self._budget("fiscal_position_map_first"),
+            ):
+                first = self._map(self.company_large, partner)
+            with self.assertQueryBudget(
+                "fiscal_position_map %s" % partner.name,
+                self._budget("fiscal_position_map"),
+            ):
+                self.assertEqual(self._map(self.company_large, partner), first)
+
+    def test_fiscal_position_map_scale(self):
+        """
+        Data:
+            - Two companies, with few and with many rules
+        Test case:
+            - Map the fiscal position of the same partner in both companies
+        Expected result:
+            - The query count does not depend on the number of rules
+        """
+        partner = self.partners[1]
+        self._map(self.company_small, partner)
+        self._map(self.company_large, partner)
+        with self.assertQueryBudget(
+            "fiscal_position_map small", self._budget("fiscal_position_map")
+        ) as small:
+            self._map(self.company_small, partner)
+        with self.assertQueryBudget(
+            "fiscal_position_map large", self._budget("fiscal_position_map")
+        ) as large:
+            self._map(self.company_large, partner)
+        self.assertLessEqual(large["count"], small["count"])
+
+
+@tagged("post_install", "-at_install", "-standard", "fiscal_position_rule_benchmark")
+class TestFiscalPositionRuleSearchPlan(FiscalPositionRuleBenchmarkMixin, SavepointCase):
+    """
+    Query plans and timings of the mapping search on a production sized
+    rule set. Slow, so only run when selected with
+    ``--test-tags fiscal_position_rule_benchmark``.
+    """
+
+    rule_count = 10000
+    partner_count = 200
+
+    @classmethod
+    def setUpClass(cls):
+        super(TestFiscalPositionRuleSearchPlan, cls).setUpClass()
+        cls.company = cls._create_benchmark_company(
+            "Bench Plan", cls.env.ref("base.us")
+        )
+        cls.data = cls.env["account.fiscal.position.rule.generator"].generate(
+            cls.company,
+            rule_count=cls.rule_count,
+            partner_count=cls.partner_count,
+            seed=42,
+        )
+        cls.env["base"].flush()
+        cls.env.cr.execute("ANALYZE account_fiscal_position_rule")
+        cls.rule_model = cls.env["account.fiscal.position.rule"].with_context(
+            use_domain=("use_sale", "=", True)
+        )
+
+    def _explain(self, partner):
+        rule_model = self.rule_model
+        addrs = {"invoice": partner, "shipping": partner}
+        query = rule_model._where_calc(
+            rule_model._map_domain(partner, addrs, self.company)
+        )
+        rule_model._apply_ir_rules(query, "read")
+        order_by = rule_model._generate_order_by(None, query)
+        from_clause, where_clause, params = query.get_sql()
+        self.env.cr.execute(
+            "EXPLAIN ANALYZE SELECT %s.id FROM %s WHERE %s%s LIMIT 1"
+            % (rule_model._table, from_clause, where_clause, order_by),
+            params,
+        )
+        return "\n".join(row[0] for row in self.env.cr.fetchall())
+
+    def test_search_plan(self):
+        """
+        Data:
+            - A company with 10000 generated rules, and generated partners
+        Test case:
+            - Explain the mapping search, and time the mapping of every partner
+        Expected result:
+            - The plans and timings are logged
+        """
+        partners = self.data["partners"]
+        for partner in partners[:3]:
+            _logger.info(
+                "Fiscal position rule search plan for %s:\n%s",
+                partner.name,
+                self._explain(partner),
+            )
+        start = time.perf_counter()
+        for partner in partners:
+            self.rule_model.fiscal_position_map(
+                company_id=self.company,
+                partner_id=partner,
+                partner_invoice_id=partner,
+            )
+        duration = (time.perf_counter() - start) * 1000.0
+        _logger.info(
+            "Mapped %d partners against %d rules in %.1f ms (%.2f ms per partner)",
+            len(partners),
+            self.rule_count,
+            duration,
+            duration / len(partners),
+        )
@@ -3,3 +3,4 @@
 # License AGPL-3 - See http://www.gnu.org/licenses/agpl-3.0.html
 
 from . import wizard_account_fiscal_position_rule
+from . import wizard_account_fiscal_position_rule_analyse
@@ -12,52 +12,34 @@ class WizardAccountFiscalPositionRule(models.TransientModel):
     _name = "wizard.account.fiscal.position.rule"
     _description = "Account Fiscal Position Rule Wizard"
 
-    company_id = fields.Many2one(
+    company_id = fields.Many2one(comodel_name="res.company", string="Company")
+
+    company_ids = fields.Many2many(
         comodel_name="res.company",
-        string="Company",
-        required=True,
-        default=lambda self: self.env["res.company"]._company_default_get(
-            "wizard.account.fiscal.position.rule"
-        ),
+        string="Companies",
+        default=lambda self: self.env.company,
+    )
+
+    update_existing = fields.Boolean(
+        string="Update Existing Rules",
+        help="Rules already generated from the templates are updated"
+        " with the template values, and the rules of archived templates"
+        " are removed. Otherwise they are left untouched.",
     )
 
-    def _template_vals(self, template, company_id, fiscal_position_id):
-        return {
-            "name": template.name,
-            "description": template.description,
-            "from_country": template.from_country.id,
-            "from_state": template.from_state.id,
-            "to_invoice_country": template.to_invoice_country.id,
-            "to_invoice_state": template.to_invoice_state.id,
-            "to_shipping_country": template.to_shipping_country.id,
-            "to_shipping_state": template.to_shipping_state.id,
-            "company_id": company_id,
-            "fiscal_position_id": fiscal_position_id,
-            "use_sale": template.use_sale,
-            "use_invoice": template.use_invoice,
-            "use_purchase": template.use_purchase,
-            "use_picking": template.use_picking,
-            "date_start": template.date_start,
-            "date_end": template.date_end,
-            "sequence": template.sequence,
-            "vat_rule": template.vat_rule,
-        }
+    def _get_target_companies(self):
+        self.ensure_one()
+        return self.company_ids | self.company_id
 
     def action_create(self):
-        obj_fpr_temp = self.env["account.fiscal.position.rule.template"]
-        company_id = self.company_id.id
-
-        fsc_rule_template = obj_fpr_temp.search([])
-        # TODO fix me doesn't work multi template that have empty fiscal
-        # position maybe we should link the rule with the account template
-        for fpr_template in fsc_rule_template:
-            fp_ids = False
-            if fpr_template.fiscal_position_id:
-                fp_ids = self.env["account.fiscal.position"].search(
-                    [("name", "=", fpr_template.fiscal_position_id.name)]
-                )
-                if not fp_ids:
-                    continue
-            values = self._template_vals(fpr_template, company_id, fp_ids[0].id)
-            self.env["account.fiscal.position.rule"].create(values)
+        templates = (
+            self.env["account.fiscal.position.rule.template"]
+            .with_context(active_test=False)
+            .search([])
+        )
+        templates._sync_rules(
+            self._get_target_companies(),
+            update_existing=self.update_existing,
+            remove_obsolete=self.update_existing,
+        )
         return True
@@ -0,0 +1,195 @@
+# License AGPL-3 - See http://www.gnu.org/licenses/agpl-3.0.html
+
+import itertools
+from collections import defaultdict
+
+from odoo import fields, models
+
+# Address fields matched by the rules, a False value matches any address
+CONDITION_FIELDS = [
+    "from_country",
+    "from_state",
+    "to_invoice_country",
+    "to_invoice_state",
+    "to_shipping_country",
+    "to_shipping_state",
+]
+
+USE_FIELDS = ["use_sale", "use_invoice", "use_purchase", "use_picking"]
+
+# Partners matched by each VAT rule, see ``_map_domain``
+VAT_COVERAGE = {
+    "with": frozenset(["vat"]),
+    "both": frozenset(["vat", "novat"]),
+    "without": frozenset(["novat"]),
+    False: frozenset(["novat"]),
+}
+
+REASONS = [
+    ("expired", "Expired"),
+    ("unused", "No Usage"),
+    ("duplicate", "Duplicate"),
+    ("shadowed", "Shadowed"),
+]
+
+
+class WizardAccountFiscalPositionRuleAnalyse(models.TransientModel):
+    """
+    Find the rules which can never be returned by the mapping.
+
+    The mapping returns the first matching rule by priority, so a rule is
+    shadowed when, for each of its usages, a rule of higher priority
+    matches every document it matches. It is a duplicate when that rule
+    has the same conditions and fiscal position. Rules whose end date is
+    past, or without any usage, are reported as well.
+    """
+
+    _name = "wizard.account.fiscal.position.rule.analyse"
+    _description = "Account Fiscal Position Rule Analyser"
+
+    company_ids = fields.Many2many(
+        comodel_name="res.company",
+        string="Companies",
+        default=lambda self: self.env.company,
+    )
+
+    date = fields.Date(
+        required=True,
+        default=fields.Date.context_today,
+        help="Rules ending before this date are reported as expired.",
+    )
+
+    line_ids = fields.One2many(
+        comodel_name="wizard.account.fiscal.position.rule.analyse.line",
+        inverse_name="wizard_id",
+        string="Redundant Rules",
+    )
+
+    def _covers_window(self, rule, other):
+        """ Whether the validity window of ``rule`` contains the other's """
+        if rule["date_start"] and (
+            not other["date_start"] or rule["date_start"] > other["date_start"]
+        ):
+            return False
+        if rule["date_end"] and (
+            not other["date_end"] or rule["date_end"] < other["date_end"]
+        ):
+            return False
+        return True
+
+    def _is_duplicate(self, rule, other):
+        return (
+            rule["key"] == other["key"]
+            and rule["vat_rule"] == other["vat_rule"]
+            and rule["date_start"] == other["date_start"]
+            and rule["date_end"] == other["date_end"]
+            and rule["fiscal_position_id"] == other["fiscal_position_id"]
+        )
+
+    def _find_shadowing_rule(self, rule, buckets):
+        """
+        Return the first rule of higher priority matching every document
+        the rule matches. Candidates are found by looking up the rule's
+        conditions with every combination of them generalised to "any".
+        """
+        options = [(value, False) if value else (False,) for value in rule["key"]]
+        vat_coverage = VAT_COVERAGE[rule["vat_rule"]]
+        candidates = []
+        for key in set(itertools.product(*options)):
+            for other in buckets.get(key, []):
+                covers_vat = VAT_COVERAGE[other["vat_rule"]] >= vat_coverage
+                if covers_vat and self._covers_window(other, rule):
+                    candidates.append(other)
+                    break
+        if not candidates:
+            return None
+        return min(candidates, key=lambda other: other["rank"])
+
+    def _analyse_company(self, company):
+        """ Return the redundant rules of the company, as line values """
+        rules = self.env["account.fiscal.position.rule"].search(
+            [("company_id", "=", company.id)]
+        )
+        rows = rules.read(
+            CONDITION_FIELDS
+            + USE_FIELDS
+            + ["sequence", "vat_rule", "date_start", "date_end", "fiscal_position_id"],
+            load=None,
+        )
+        rows.sort(key=lambda row: (row["sequence"], row["id"]))
+        buckets = {use: defaultdict(list) for use in USE_FIELDS}
+        lines = []
+        for rank, row in enumerate(rows):
+            row["rank"] = rank
+            row["key"] = tuple(row[fname] or False for fname in CONDITION_FIELDS)
+            uses = [use for use in USE_FIELDS if row[use]]
+            reason = shadowing = None
+            if row["date_end"] and row["date_end"] < self.date:
+                reason = "expired"
+            elif not uses:
+                reason = "unused"
+            else:
+                results = [self._find_shadowing_rule(row, buckets[use]) for use in uses]
+                if all(results):
+                    shadowing = results[0]
+                    duplicate = all(self._is_duplicate(other, row) for other in results)
+                    reason = duplicate and "duplicate" or "shadowed"
+                for use in uses:
+                    buckets[use][row["key"]].append(row)
+            if reason:
+                lines.append(
+                    {
+                        "rule_id": row["id"],
+                        "reason": reason,
+                        "shadowing_rule_id": shadowing and shadowing["id"] or False,
+                    }
+                )
+        return lines
+
+    def action_analyse(self):
+        self.ensure_one()
+        line_vals = []
+        for company in self.company_ids:
+            line_vals += self._analyse_company(company)
+        self.line_ids = [(5, 0, 0)] + [(0, 0, vals) for vals in line_vals]
+        return {
+            "type": "ir.actions.act_window",
+            "res_model": self._name,
+            "res_id": self.id,
+            "view_mode": "form",
+            "target": "new",
+        }
+
+    def action_archive(self):
+        self.mapped("line_ids.rule_id").write({"active": False})
+        return True
+
+
+class WizardAccountFiscalPositionRuleAnalyseLine(models.TransientModel):
+    _name = "wizard.account.fiscal.position.rule.analyse.line"
+    _description = "Account Fiscal Position Rule Analyser Line"
+
+    wizard_id = fields.Many2one(
+        comodel_name="wizard.account.fiscal.position.rule.analyse",
+        required=True,
+        ondelete="cascade",
+    )
+
+    rule_id = fields.Many2one(
+        comodel_name="account.fiscal.position.rule",
+        string="Rule",
+        required=True,
+        ondelete="cascade",
+    )
+
+    company_id = fields.Many2one(related="rule_id.company_id")
+
+    sequence = fields.Integer(related="rule_id.sequence")
+
+    reason = fields.Selection(selection=REASONS, required=True)
+
+    shadowing_rule_id = fields.Many2one(
+        comodel_name="account.fiscal.position.rule",
+        string="Shadowed By",
+        ondelete="cascade",
+    )
@@ -0,0 +1,41 @@
+# License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl.html)
+
+from odoo import api, models
+
+
+class PurchaseOrder(models.Model):
+    _name = "purchase.order"
+    _inherit = ["purchase.order", "account.fiscal.position.rule.mixin"]
+
+    _fiscal_position_rule_usage = "use_purchase"
+
+    def _prepare_fiscal_position_map_kwargs(self):
+        self.ensure_one()
+        kwargs = {"company_id": self.company_id, "partner_id": self.partner_id}
+        if self.dest_address_id:
+            kwargs["partner_shipping_id"] = self.dest_address_id
+        return kwargs
+
+    @api.onchange("partner_id", "company_id")
+    def onchange_partner_id(self):
+        # The standard onchange sets the partner's fiscal position,
+        # the rules have to apply after it
+        res = super().onchange_partner_id()
+        self.onchange_fiscal_position_map()
+        return res
+
+    @api.onchange("dest_address_id")
+    def onchange_fiscal_position_map(self):
+        kwargs = self._prepare_fiscal_position_map_kwargs()
+        obj_fiscal_position = self._fiscal_position_map(**kwargs)
+        if obj_fiscal_position:
+            self.fiscal_position_id = obj_fiscal_position.id
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        orders = super().create(vals_list)
+        # Orders created by the procurements have no fiscal position yet
+        orders.filtered(
+            lambda o: o.partner_id and not o.fiscal_position_id
+        )._apply_fiscal_position_map()
+        return orders
@@ -0,0 +1,102 @@
+# License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl).
+
+from odoo.tests.common import Form, SavepointCase
+
+from odoo.addons.account_lookup_cache.tests.common import LookupCacheCaseMixin
+
+
+class TestAccountFiscalPositionRulePurchase(LookupCacheCaseMixin, SavepointCase):
+    @classmethod
+    def setUpClass(cls):
+        super(TestAccountFiscalPositionRulePurchase, cls).setUpClass()
+
+        # MODELS
+        cls.fiscal_position_model = cls.env["account.fiscal.position"]
+        cls.fiscal_position_rule_model = cls.env["account.fiscal.position.rule"]
+        cls.partner_model = cls.env["res.partner"]
+        cls.purchase_order_model = cls.env["purchase.order"]
+
+        # INSTANCES
+        cls.company = cls.env.ref("base.main_company")
+        # Fiscal positions
+        cls.fiscal_position_01 = cls.fiscal_position_model.create(
+            {"name": "Fiscal position 01"}
+        )
+        cls.fiscal_position_02 = cls.fiscal_position_model.create(
+            {"name": "Fiscal position 02"}
+        )
+        # Partners
+        cls.partner_01 = cls.partner_model.create(
+            {"name": "Vendor 01", "country_id": cls.env.ref("base.fr").id}
+        )
+        cls.partner_02 = cls.partner_model.create(
+            {"name": "Vendor 02", "country_id": cls.env.ref("base.be").id}
+        )
+        # Fiscal position rules
+        cls.fiscal_position_rule_01 = cls.fiscal_position_rule_model.create(
+            {
+                "name": "Purchases from France",
+                "fiscal_position_id": cls.fiscal_position_01.id,
+                "company_id": cls.company.id,
+                "to_invoice_country": cls.env.ref("base.fr").id,
+                "use_purchase": True,
+                "sequence": 1,
+            }
+        )
+        cls.fiscal_position_rule_02 = cls.fiscal_position_rule_model.create(
+            {
+                "name": "Sales, anywhere",
+                "fiscal_position_id": cls.fiscal_position_02.id,
+                "company_id": cls.company.id,
+                "use_sale": True,
+            }
+        )
+
+    def test_01(self):
+        """
+        Data:
+            - A purchase rule for vendors in France, and a sale rule
+        Test case:
+            - Create purchase orders for a french and a belgian vendor
+        Expected result:
+            - Only the purchase rule applies, on the french vendor order
+        """
+        orders = self.purchase_order_model.create(
+            [{"partner_id": self.partner_01.id}, {"partner_id": self.partner_02.id}]
+        )
+        self.assertEqual(orders[0].fiscal_position_id, self.fiscal_position_01)
+        self.assertFalse(orders[1].fiscal_position_id)
+
+    def test_02(self):
+        """
+        Data:
+            - Purchase orders of a belgian vendor
+        Test case:
+            - Add a purchase rule for Belgium, and map the orders again
+        Expected result:
+            - The orders get the fiscal position of the new rule
+        """
+        orders = self.purchase_order_model.create(
+            [{"partner_id": self.partner_02.id} for _i in range(3)]
+        )
+        self.fiscal_position_rule_01.to_invoice_country = self.env.ref("base.be")
+        orders.action_fiscal_position_map()
+        self.assertEqual(orders.mapped("fiscal_position_id"), self.fiscal_position_01)
+
+    def test_03(self):
+        """
+        Data:
+            - A purchase rule for vendors in France
+        Test case:
+            - Change the vendor of a purchase order form
+        Expected result:
+            - The rule applies after the standard vendor onchange, and
+              the fiscal position follows the vendor
+        """
+        with Form(self.purchase_order_model) as order_form:
+            order_form.partner_id = self.partner_02
+            self.assertFalse(order_form.fiscal_position_id)
+            order_form.partner_id = self.partner_01
+            self.assertEqual(order_form.fiscal_position_id, self.fiscal_position_01)
+            order_form.partner_id = self.partner_02
+            self.assertFalse(order_form.fiscal_position_id)
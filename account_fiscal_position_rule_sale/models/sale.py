@@ -10,16 +10,10 @@ from odoo import api, models
 
 
 class SaleOrder(models.Model):
-    _inherit = "sale.order"
+    _name = "sale.order"
+    _inherit = ["sale.order", "account.fiscal.position.rule.mixin"]
 
-    def _fiscal_position_map(self, **kwargs):
-        ctx = dict(self._context)
-        ctx.update({"use_domain": ("use_sale", "=", True)})
-        return (
-            self.env["account.fiscal.position.rule"]
-            .with_context(ctx)
-            .apply_fiscal_mapping(**kwargs)
-        )
+    _fiscal_position_rule_usage = "use_sale"
 
     def _prepare_fiscal_position_map_kwargs(self):
         self.ensure_one()
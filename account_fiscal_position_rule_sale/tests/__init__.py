@@ -1 +1,2 @@
 from . import test_account_fiscal_position_rule_sale
+from . import test_account_fiscal_position_rule_sale_benchmark
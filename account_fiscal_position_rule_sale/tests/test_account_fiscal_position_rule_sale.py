@@ -1,7 +1,9 @@
 # Copyright 2020 ACSONE SA/NV
 # License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl).
 
-from odoo.tests.common import SavepointCase
+from unittest import mock
+
+from odoo.tests.common import Form, SavepointCase
 
 
 class TestAccountFiscalPositionRuleSale(SavepointCase):
@@ -93,3 +95,31 @@ class TestAccountFiscalPositionRuleSale(SavepointCase):
             self.sale_order_01.fiscal_position_id,
             self.fiscal_position_rule_01.fiscal_position_id,
         )
+
+    def test_03(self):
+        """
+        Data:
+            - No fiscal position on the partner
+            - A fiscal rule that should be used on the SO
+        Test case:
+            - Set the customer on a new SO, which cascades into the
+              invoice and delivery addresses onchanges
+        Expected result:
+            - The rules are searched once, and the rule's fiscal position
+              is set on the SO
+        """
+        rule_class = type(self.fiscal_position_rule_model)
+        self.fiscal_position_rule_model._invalidate_mapping_caches()
+        with mock.patch.object(
+            rule_class,
+            "_map_domain",
+            autospec=True,
+            side_effect=rule_class._map_domain,
+        ) as map_domain:
+            order_form = Form(self.sale_order_model)
+            order_form.partner_id = self.partner_02
+        self.assertEqual(map_domain.call_count, 1)
+        self.assertEqual(
+            order_form.fiscal_position_id,
+            self.fiscal_position_rule_01.fiscal_position_id,
+        )
@@ -0,0 +1,92 @@
+# Copyright 2020 ACSONE SA/NV
+# License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl).
+
+from odoo.tests.common import Form, SavepointCase, tagged
+
+from odoo.addons.account_fiscal_position_rule.tests.common import (
+    FiscalPositionRuleBenchmarkMixin,
+)
+
+
+@tagged("post_install", "-at_install")
+class TestAccountFiscalPositionRuleSaleBenchmark(
+    FiscalPositionRuleBenchmarkMixin, SavepointCase
+):
+    query_budgets = {"onchange_fiscal_position_map": 12, "sale_order_form_partner": 60}
+    rule_count = 500
+    partner_count = 5
+    product_count = 20
+    line_count_small = 1
+    line_count_large = 200
+
+    @classmethod
+    def setUpClass(cls):
+        super(TestAccountFiscalPositionRuleSaleBenchmark, cls).setUpClass()
+        cls.company = cls.env.ref("base.main_company")
+        cls._create_benchmark_rules(cls.company, cls.rule_count)
+        cls.partners = cls._create_benchmark_partners(cls.partner_count)
+        cls.products = cls.env["product.product"].create(
+            [
+                {"name": "Benchmark product %d" % i, "list_price": 10.0 + i}
+                for i in range(cls.product_count)
+            ]
+        )
+        cls.order_small = cls._create_benchmark_order(cls.line_count_small)
+        cls.order_large = cls._create_benchmark_order(cls.line_count_large)
+
+    @classmethod
+    def _create_benchmark_order(cls, line_count):
+        return cls.env["sale.order"].create(
+            {
+                "partner_id": cls.partners[0].id,
+                "company_id": cls.company.id,
+                "order_line": [
+                    (
+                        0,
+                        0,
+                        {
+                            "product_id": cls.products[i % cls.product_count].id,
+                            "product_uom_qty": 1 + i % 3,
+                        },
+                    )
+                    for i in range(line_count)
+                ],
+            }
+        )
+
+    def test_onchange_fiscal_position_map_scale(self):
+        """
+        Data:
+            - Sale orders with one and with many lines, and many rules
+        Test case:
+            - Trigger the fiscal position onchange on both orders
+        Expected result:
+            - The query count is within budget and does not depend on
+              the number of lines
+        """
+        self.order_small.onchange_fiscal_position_map()
+        self.order_large.onchange_fiscal_position_map()
+        budget = self._budget("onchange_fiscal_position_map")
+        with self.assertQueryBudget("onchange small order", budget) as small:
+            self.order_small.onchange_fiscal_position_map()
+        with self.assertQueryBudget("onchange large order", budget) as large:
+            self.order_large.onchange_fiscal_position_map()
+        self.assertLessEqual(large["count"], small["count"])
+
+    def test_sale_order_form_partner(self):
+        """
+        Data:
+            - Many rules
+        Test case:
+            - Set the customer on a new sale order form
+        Expected result:
+            - The onchange cascade stays within its query budget
+        """
+        with Form(self.env["sale.order"]) as order_form:
+            order_form.partner_id = self.partners[1]
+            with self.assertQueryBudget(
+                "sale order form partner", self._budget("sale_order_form_partner")
+            ):
+                order_form.partner_id = self.partners[2]
+            with order_form.order_line.new() as line_form:
+                line_form.product_id = self.products[0]
@@ -0,0 +1,13 @@
+# License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl.html)
+
+{
+    "name": "Account Fiscal Position Rule Stock",
+    "version": "13.0.1.0.0",
+    "category": "Generic Modules/Accounting",
+    "author": "Akretion,Odoo Community Association (OCA)",
+    "license": "AGPL-3",
+    "website": "https://github.com/OCA/account-fiscal-rule",
+    "depends": ["account_fiscal_position_rule", "stock"],
+    "data": ["views/stock_picking_view.xml"],
+    "installable": True,
+}
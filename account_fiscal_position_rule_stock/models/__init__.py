@@ -0,0 +1 @@
+from . import stock_picking
@@ -0,0 +1,45 @@
+# License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl.html)
+
+from odoo import api, fields, models
+
+
+class StockPicking(models.Model):
+    _name = "stock.picking"
+    _inherit = ["stock.picking", "account.fiscal.position.rule.mixin"]
+
+    _fiscal_position_rule_usage = "use_picking"
+
+    fiscal_position_id = fields.Many2one(
+        comodel_name="account.fiscal.position",
+        string="Fiscal Position",
+        domain="[('company_id', '=', company_id)]",
+        states={"done": [("readonly", True)], "cancel": [("readonly", True)]},
+    )
+
+    def _prepare_fiscal_position_map_kwargs(self):
+        self.ensure_one()
+        # The picking partner is the delivery address, the invoice address
+        # is resolved from its commercial partner
+        return {
+            "company_id": self.company_id,
+            "partner_id": self.partner_id.commercial_partner_id,
+            "partner_shipping_id": self.partner_id,
+        }
+
+    @api.onchange("partner_id", "company_id")
+    def onchange_fiscal_position_map(self):
+        if not self.partner_id:
+            return
+        kwargs = self._prepare_fiscal_position_map_kwargs()
+        obj_fiscal_position = self._fiscal_position_map(**kwargs)
+        if obj_fiscal_position:
+            self.fiscal_position_id = obj_fiscal_position.id
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        pickings = super().create(vals_list)
+        # Pickings created by the procurements have no fiscal position yet
+        pickings.filtered(
+            lambda p: p.partner_id and not p.fiscal_position_id
+        )._apply_fiscal_position_map()
+        return pickings
@@ -0,0 +1 @@
+from . import test_account_fiscal_position_rule_stock
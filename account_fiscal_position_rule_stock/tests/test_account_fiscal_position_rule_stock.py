@@ -0,0 +1,94 @@
+# License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl).
+
+from odoo.tests.common import Form, SavepointCase
+
+
+class TestAccountFiscalPositionRuleStock(SavepointCase):
+    @classmethod
+    def setUpClass(cls):
+        super(TestAccountFiscalPositionRuleStock, cls).setUpClass()
+
+        # MODELS
+        cls.fiscal_position_model = cls.env["account.fiscal.position"]
+        cls.fiscal_position_rule_model = cls.env["account.fiscal.position.rule"]
+        cls.partner_model = cls.env["res.partner"]
+        cls.picking_model = cls.env["stock.picking"]
+
+        # INSTANCES
+        cls.company = cls.env.ref("base.main_company")
+        cls.picking_type = cls.env.ref("stock.picking_type_out")
+        # Fiscal positions
+        cls.fiscal_position_01 = cls.fiscal_position_model.create(
+            {"name": "Fiscal position 01"}
+        )
+        # Partners
+        cls.partner_01 = cls.partner_model.create(
+            {
+                "name": "Customer 01",
+                "is_company": True,
+                "country_id": cls.env.ref("base.fr").id,
+            }
+        )
+        cls.delivery_01 = cls.partner_model.create(
+            {
+                "name": "Warehouse 01",
+                "parent_id": cls.partner_01.id,
+                "type": "delivery",
+                "country_id": cls.env.ref("base.be").id,
+            }
+        )
+        # Fiscal position rules
+        cls.fiscal_position_rule_01 = cls.fiscal_position_rule_model.create(
+            {
+                "name": "Deliveries to Belgium",
+                "fiscal_position_id": cls.fiscal_position_01.id,
+                "company_id": cls.company.id,
+                "to_invoice_country": cls.env.ref("base.fr").id,
+                "to_shipping_country": cls.env.ref("base.be").id,
+                "use_picking": True,
+            }
+        )
+
+    def _prepare_picking_vals(self, partner):
+        return {
+            "partner_id": partner.id,
+            "picking_type_id": self.picking_type.id,
+            "location_id": self.picking_type.default_location_src_id.id,
+            "location_dest_id": self.env.ref("stock.stock_location_customers").id,
+        }
+
+    def test_01(self):
+        """
+        Data:
+            - A picking rule for deliveries to Belgium, invoiced in France
+        Test case:
+            - Create pickings for the belgian delivery address, and for
+              the french customer itself
+        Expected result:
+            - The rule applies to the delivery address picking only
+        """
+        pickings = self.picking_model.create(
+            [
+                self._prepare_picking_vals(self.delivery_01),
+                self._prepare_picking_vals(self.partner_01),
+            ]
+        )
+        self.assertEqual(pickings[0].fiscal_position_id, self.fiscal_position_01)
+        self.assertFalse(pickings[1].fiscal_position_id)
+
+    def test_02(self):
+        """
+        Data:
+            - A picking rule for deliveries to Belgium, invoiced in France
+        Test case:
+            - Set the delivery address on a new picking
+        Expected result:
+            - The rule's fiscal position is set on the picking
+        """
+        picking_form = Form(
+            self.picking_model.with_context(
+                default_picking_type_id=self.picking_type.id
+            )
+        )
+        picking_form.partner_id = self.delivery_01
+        self.assertEqual(picking_form.fiscal_position_id, self.fiscal_position_01)
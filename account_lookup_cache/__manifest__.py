@@ -0,0 +1,15 @@
+# License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl.html)
+
+{
+    "name": "Account Lookup Cache",
+    "summary": "Cache shared by the workers for the tax and fiscal position lookups",
+    "version": "13.0.1.0.0",
+    "category": "Generic Modules/Accounting",
+    "author": "Odoo Community Association (OCA)",
+    "license": "AGPL-3",
+    "website": "https://github.com/OCA/account-fiscal-rule",
+    "depends": ["base"],
+    "data": ["data/ir_cron.xml"],
+    "post_load": "post_load",
+    "installable": True,
+}
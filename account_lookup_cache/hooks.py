@@ -0,0 +1,11 @@
+# License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl.html)
+
+from odoo import sql_db
+
+from .models.account_lookup_cache import savepoint
+
+
+def post_load():
+    """ Undo the lookup cache changes of the savepoints rolled back """
+    if not getattr(sql_db.Cursor.savepoint, "_account_lookup_cache", False):
+        sql_db.Cursor.savepoint = savepoint(sql_db.Cursor.savepoint)
@@ -0,0 +1 @@
+from . import account_lookup_cache
@@ -0,0 +1,333 @@
+# License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl.html)
+
+import functools
+import json
+import logging
+import time
+from contextlib import contextmanager
+
+import psycopg2
+
+from odoo import api, models, tools
+from odoo.tools.lru import LRU
+
+_logger = logging.getLogger(__name__)
+
+# Number of entries kept in memory by each worker, per database
+DEFAULT_SIZE = 8192
+
+# Limits of the warm-up done when a worker loads the registry
+DEFAULT_WARMUP_SECONDS = 10.0
+DEFAULT_WARMUP_ENTRIES = 5000
+
+# Key of the lookup cache state of a transaction in the cursor's cache
+TRANSACTION_STATE = "account_lookup_cache"
+
+_MISS = object()
+
+
+class AccountLookupCache(models.AbstractModel):
+    """
+    Cache of lookup results, such as mapped fiscal positions, Avatax taxes
+    or validated addresses, by namespace and key.
+
+    Entries are kept in a least recently used cache of each worker and,
+    when the ``account_lookup_cache.shared`` parameter is set, in an
+    unlogged table shared by all the workers. Values of the shared tier
+    go through JSON, so they must be made of plain types.
+
+    Each namespace has a generation, which is part of the entries' key.
+    The generations are read once per transaction. ``invalidate`` moves a
+    namespace to a new generation within the transaction, so the other
+    transactions, in every worker, stop using the previous entries when
+    it is committed. The entries stored by a transaction are only kept by
+    the worker once it is committed, and dropped if it, or the savepoint
+    they were stored in, is rolled back.
+    """
+
+    _name = "account.lookup.cache"
+    _description = "Lookup Cache"
+
+    def init(self):
+        cr = self.env.cr
+        cr.execute("CREATE SEQUENCE IF NOT EXISTS account_lookup_cache_generation_seq")
+        cr.execute(
+            """
+            CREATE TABLE IF NOT EXISTS account_lookup_cache_generation (
+                namespace varchar PRIMARY KEY,
+                generation bigint NOT NULL
+            )
+            """
+        )
+        cr.execute(
+            """
+            CREATE UNLOGGED TABLE IF NOT EXISTS account_lookup_cache_entry (
+                namespace varchar NOT NULL,
+                key text NOT NULL,
+                generation bigint NOT NULL,
+                value jsonb,
+                PRIMARY KEY (namespace, key)
+            )
+            """
+        )
+
+    def _get_memory_tier(self):
+        """ The in-memory entries of the worker, kept with the registry """
+        lru = getattr(self.pool, "_account_lookup_cache", None)
+        if lru is None:
+            size = int(tools.config.get("account_lookup_cache_size", DEFAULT_SIZE))
+            lru = self.pool._account_lookup_cache = LRU(size)
+        return lru
+
+    def _get_transaction_state(self):
+        """
+        The lookup cache state of the current transaction: the generations
+        of the namespaces, the entries it stored, and the journal of their
+        changes, undone when a savepoint is rolled back.
+        """
+        cr = self.env.cr
+        state = cr.cache.get(TRANSACTION_STATE)
+        if state is None:
+            cr.execute(
+                "SELECT namespace, generation FROM account_lookup_cache_generation"
+            )
+            state = cr.cache[TRANSACTION_STATE] = {
+                "generations": dict(cr.fetchall()),
+                "entries": {},
+                "journal": [],
+            }
+            cr.after("commit", functools.partial(self._after_commit, cr))
+            cr.after(
+                "rollback", functools.partial(cr.cache.pop, TRANSACTION_STATE, None)
+            )
+        return state
+
+    @api.model
+    def _update_transaction_state(self, state, name, key, value):
+        """ Set a generation or an entry of the transaction, in the journal """
+        state["journal"].append((name, key, state[name].get(key, _MISS)))
+        state[name][key] = value
+
+    def _after_commit(self, cr):
+        """ Keep the entries stored by the committed transaction in memory """
+        state = cr.cache.pop(TRANSACTION_STATE, None)
+        if not state:
+            return
+        generations = state["generations"]
+        lru = self._get_memory_tier()
+        for (namespace, generation, key), value in state["entries"].items():
+            # The entries of the generations it replaced are left out
+            if generations.get(namespace, 0) == generation:
+                lru[(namespace, generation, key)] = value
+
+    @api.model
+    def _is_shared(self):
+        param = self.env["ir.config_parameter"].sudo()
+        return tools.str2bool(param.get_param("account_lookup_cache.shared", "0"))
+
+    @api.model
+    def get(self, namespace, key, default=None):
+        """ Return the value cached for the key, or ``default`` """
+        state = self._get_transaction_state()
+        generation = state["generations"].get(namespace, 0)
+        value = state["entries"].get((namespace, generation, key), _MISS)
+        if value is not _MISS:
+            return value
+        lru = self._get_memory_tier()
+        value = lru.get((namespace, generation, key), _MISS)
+        if value is not _MISS:
+            return value
+        if not self._is_shared():
+            return default
+        self.env.cr.execute(
+            """
+            SELECT value FROM account_lookup_cache_entry
+            WHERE namespace = %s AND key = %s AND generation = %s
+            """,
+            (namespace, repr(key), generation),
+        )
+        row = self.env.cr.fetchone()
+        if not row:
+            return default
+        lru[(namespace, generation, key)] = row[0]
+        return row[0]
+
+    @api.model
+    def set(self, namespace, key, value):
+        state = self._get_transaction_state()
+        generation = state["generations"].get(namespace, 0)
+        self._update_transaction_state(
+            state, "entries", (namespace, generation, key), value
+        )
+        if not self._is_shared():
+            return
+        try:
+            with self.env.cr.savepoint():
+                self.env.cr.execute(
+                    """
+                    INSERT INTO account_lookup_cache_entry
+                        (namespace, key, generation, value)
+                    VALUES (%s, %s, %s, %s)
+                    ON CONFLICT (namespace, key) DO UPDATE SET
+                        generation = EXCLUDED.generation,
+                        value = EXCLUDED.value
+                    """,
+                    (namespace, repr(key), generation, json.dumps(value)),
+                )
+        except psycopg2.Error as e:
+            # A concurrent transaction stored the same entry: keep it
+            _logger.debug("Lookup cache entry not stored: %s", e)
+
+    @api.model
+    def get_or_compute(self, namespace, key, compute):
+        """ Return the value cached for the key, computing it on a miss """
+        value = self.get(namespace, key, _MISS)
+        if value is _MISS:
+            value = compute()
+            self.set(namespace, key, value)
+        return value
+
+    @api.model
+    def invalidate(self, *namespaces):
+        """
+        Drop the entries of the namespaces, moving them to new generations.
+        They come from a sequence, so a generation rolled back with its
+        transaction is never used again. The other transactions, in every
+        worker, get the new generations once the transaction is committed.
+        """
+        state = self._get_transaction_state()
+        for namespace in sorted(namespaces):
+            self.env.cr.execute(
+                """
+                INSERT INTO account_lookup_cache_generation (namespace, generation)
+                VALUES (%s, nextval('account_lookup_cache_generation_seq'))
+                ON CONFLICT (namespace) DO UPDATE SET
+                    generation = EXCLUDED.generation
+                RETURNING generation
+                """,
+                (namespace,),
+            )
+            self._update_transaction_state(
+                state, "generations", namespace, self.env.cr.fetchone()[0]
+            )
+
+    @api.model
+    def _get_warm_up_limits(self):
+        """ Maximum duration, in seconds, and number of entries of a warm-up """
+        param = self.env["ir.config_parameter"].sudo()
+        seconds = param.get_param("account_lookup_cache.warmup_seconds")
+        entries = param.get_param("account_lookup_cache.warmup_entries")
+        return (
+            float(seconds or DEFAULT_WARMUP_SECONDS),
+            int(entries or DEFAULT_WARMUP_ENTRIES),
+        )
+
+    @api.model
+    def _warm_up(self, label, loaders):
+        """
+        Preload lookup results. ``loaders`` are (name, iterable) pairs, the
+        iterables load the results lazily and yield once per result. They
+        are stopped once the time or entries limits are reached.
+        Returns the number of results loaded by name.
+        """
+        seconds, max_entries = self._get_warm_up_limits()
+        start = time.perf_counter()
+        deadline = start + seconds
+        loaded = {}
+        total = 0
+        stopped = False
+        for name, loader in loaders:
+            loaded[name] = 0
+            for _result in loader:
+                loaded[name] += 1
+                total += 1
+                if total >= max_entries or time.perf_counter() > deadline:
+                    stopped = True
+                    break
+            if stopped:
+                break
+        _logger.info(
+            "%s warm-up loaded %s in %.1f ms%s",
+            label,
+            ", ".join("%d %s" % (count, name) for name, count in loaded.items()),
+            (time.perf_counter() - start) * 1000.0,
+            stopped and ", stopped at its limits" or "",
+        )
+        return loaded
+
+    @api.model
+    def _warm_up_on_load(self, label, loaders):
+        """
+        Warm-up run when the registry is loaded, unless it is disabled by
+        the ``account_lookup_cache.warmup`` parameter, or modules are being
+        installed, updated or tested. Failures are logged and ignored.
+        """
+        param = self.env["ir.config_parameter"].sudo()
+        if not tools.str2bool(param.get_param("account_lookup_cache.warmup", "1")):
+            return
+        if tools.config["init"] or tools.config["update"]:
+            return
+        if tools.config["test_enable"]:
+            return
+        try:
+            with self.env.cr.savepoint():
+                self._warm_up(label, loaders)
+        except Exception:
+            _logger.warning("%s warm-up failed", label, exc_info=True)
+
+    @api.model
+    def _cron_cleanup(self):
+        """ Delete the shared entries of the previous generations """
+        self.env.cr.execute(
+            """
+            DELETE FROM account_lookup_cache_entry entry
+            WHERE entry.generation <> COALESCE(
+                (
+                    SELECT generation FROM account_lookup_cache_generation
+                    WHERE namespace = entry.namespace
+                ),
+                0
+            )
+            """
+        )
+        _logger.info("Removed %d outdated lookup cache entries", self.env.cr.rowcount)
+
+
+def _rollback_transaction_state(cr, state, mark):
+    """ Undo the lookup cache changes made since the journal's mark """
+    current_state = cr.cache.get(TRANSACTION_STATE)
+    if current_state is None:
+        return
+    if state is not current_state:
+        # The state was created within the savepoint
+        cr.cache.pop(TRANSACTION_STATE, None)
+        return
+    journal = state["journal"]
+    while len(journal) > mark:
+        name, key, value = journal.pop()
+        if value is _MISS:
+            state[name].pop(key, None)
+        else:
+            state[name][key] = value
+
+
+def savepoint(cursor_savepoint):
+    """
+    Wrap ``Cursor.savepoint``, so the lookup cache changes made within a
+    savepoint are undone when it is rolled back.
+    """
+
+    @contextmanager
+    @functools.wraps(cursor_savepoint)
+    def wrapper(cr, *args, **kwargs):
+        state = cr.cache.get(TRANSACTION_STATE)
+        mark = len(state["journal"]) if state else 0
+        try:
+            with cursor_savepoint(cr, *args, **kwargs):
+                yield
+        except Exception:
+            _rollback_transaction_state(cr, state, mark)
+            raise
+
+    wrapper._account_lookup_cache = True
+    return wrapper
@@ -0,0 +1,74 @@
+# License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl).
+
+import logging
+import time
+from contextlib import contextmanager
+
+from odoo.addons.account_lookup_cache.models.account_lookup_cache import (
+    TRANSACTION_STATE,
+)
+
+_logger = logging.getLogger(__name__)
+
+
+class LookupCacheCaseMixin(object):
+    """
+    Start each test with a new lookup cache state. The tests of a class
+    share a transaction, rolled back to a savepoint after each of them,
+    so the state of the previous test would outlive its data.
+    """
+
+    def setUp(self):
+        super(LookupCacheCaseMixin, self).setUp()
+        self.env.cr.cache.pop(TRANSACTION_STATE, None)
+
+
+class QueryBudgetMixin(object):
+    """
+    Check the SQL queries spent on a code block against a budget.
+
+    ``query_budgets`` holds the maximum number of SQL queries per operation,
+    either as a number, or as (base, per document line) for the operations
+    on documents. Lower them when an optimisation lands, never raise them
+    silently.
+    """
+
+    query_budgets = {}
+
+    def _budget(self, name, line_count=0):
+        budget = self.query_budgets[name]
+        if isinstance(budget, tuple):
+            base, per_line = budget
+            return base + per_line * line_count
+        return budget
+
+    @contextmanager
+    def assertQueryBudget(self, label, budget):
+        """
+        Check that the block runs at most ``budget`` SQL queries,
+        starting from a flushed and empty record cache.
+        The measured queries and wall time are logged,
+        and made available in the yielded dict.
+        """
+        self.env["base"].flush()
+        self.env.cache.invalidate()
+        measure = {}
+        queries = self.cr.sql_log_count
+        start = time.perf_counter()
+        yield measure
+        self.env["base"].flush()
+        count = self.cr.sql_log_count - queries
+        duration = (time.perf_counter() - start) * 1000.0
+        measure.update({"count": count, "duration": duration})
+        _logger.info(
+            "Benchmark %s: %d queries (budget %d), %.1f ms",
+            label,
+            count,
+            budget,
+            duration,
+        )
+        self.assertLessEqual(
+            count,
+            budget,
+            "%s ran %d queries, over its budget of %d" % (label, count, budget),
+        )
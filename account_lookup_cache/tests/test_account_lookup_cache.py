@@ -0,0 +1,129 @@
+# License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl).
+
+from odoo.tests.common import SavepointCase
+
+from odoo.addons.account_lookup_cache.models.account_lookup_cache import (
+    TRANSACTION_STATE,
+)
+
+from .common import LookupCacheCaseMixin
+
+
+class TestAccountLookupCache(LookupCacheCaseMixin, SavepointCase):
+    @classmethod
+    def setUpClass(cls):
+        super(TestAccountLookupCache, cls).setUpClass()
+        cls.cache = cls.env["account.lookup.cache"]
+        cls.param_model = cls.env["ir.config_parameter"].sudo()
+
+    def _count_shared_entries(self, namespace):
+        self.env.cr.execute(
+            "SELECT count(*) FROM account_lookup_cache_entry WHERE namespace = %s",
+            (namespace,),
+        )
+        return self.env.cr.fetchone()[0]
+
+    def _new_transaction(self):
+        """ Forget the lookup cache state, as a new transaction would """
+        self.env.cr.cache.pop(TRANSACTION_STATE, None)
+
+    def test_01_get_or_compute(self):
+        calls = []
+
+        def compute():
+            calls.append(1)
+            return {"tax_id": 42}
+
+        namespace = "test.lookup.cache.01"
+        self.assertIsNone(self.cache.get(namespace, ("a", 1)))
+        for _i in range(3):
+            value = self.cache.get_or_compute(namespace, ("a", 1), compute)
+            self.assertEqual(value, {"tax_id": 42})
+        self.assertEqual(len(calls), 1)
+        # Other keys and namespaces are separate
+        self.assertIsNone(self.cache.get(namespace, ("a", 2)))
+        self.assertIsNone(self.cache.get("test.lookup.cache.other", ("a", 1)))
+        # Falsy values are cached too
+        self.cache.set(namespace, ("b",), False)
+        self.assertIs(self.cache.get(namespace, ("b",)), False)
+
+    def test_02_invalidate(self):
+        namespace = "test.lookup.cache.02"
+        self.cache.set(namespace, "key", 1)
+        self.cache.set("test.lookup.cache.other", "key", 2)
+        self.cache.invalidate(namespace)
+        self.assertIsNone(self.cache.get(namespace, "key"))
+        self.assertEqual(self.cache.get("test.lookup.cache.other", "key"), 2)
+
+    def test_03_shared_tier(self):
+        namespace = "test.lookup.cache.03"
+        self.param_model.set_param("account_lookup_cache.shared", "1")
+        self.cache.set(namespace, ("key", 1), [1, 2])
+        self.assertEqual(self._count_shared_entries(namespace), 1)
+        # Another worker, with an empty memory tier, reads the shared entry
+        self._new_transaction()
+        self.cache._get_memory_tier().clear()
+        self.assertEqual(self.cache.get(namespace, ("key", 1)), [1, 2])
+        # Entries of previous generations are ignored, then cleaned up
+        self.cache.invalidate(namespace)
+        self.assertIsNone(self.cache.get(namespace, ("key", 1)))
+        self._new_transaction()
+        self.cache._get_memory_tier().clear()
+        self.assertIsNone(self.cache.get(namespace, ("key", 1)))
+        self.cache._cron_cleanup()
+        self.assertEqual(self._count_shared_entries(namespace), 0)
+
+    def test_04_warm_up(self):
+        def loader(count):
+            for i in range(count):
+                yield i
+
+        def failing_loader():
+            raise AssertionError("The warm-up did not stop at its limit")
+            yield
+
+        self.param_model.set_param("account_lookup_cache.warmup_entries", "3")
+        loaded = self.cache._warm_up(
+            "Test",
+            [("first", loader(2)), ("second", loader(5)), ("third", failing_loader())],
+        )
+        self.assertEqual(loaded, {"first": 2, "second": 1})
+
+    def test_05_commit(self):
+        namespace = "test.lookup.cache.05"
+        other_namespace = "test.lookup.cache.other"
+        lru = self.cache._get_memory_tier()
+        self.cache.set(other_namespace, "key", 1)
+        self.cache.invalidate(other_namespace)
+        self.cache.set(other_namespace, "key", 2)
+        self.cache.set(namespace, "key", 3)
+        # The other transactions of the worker don't see uncommitted entries
+        self.assertNotIn((namespace, 0, "key"), lru)
+        state = self.env.cr.cache[TRANSACTION_STATE]
+        generation = state["generations"][other_namespace]
+        self.cache._after_commit(self.env.cr)
+        self.assertEqual(lru.get((namespace, 0, "key")), 3)
+        self.assertEqual(lru.get((other_namespace, generation, "key")), 2)
+        # The next transaction reads the committed generations
+        self.assertEqual(self.cache.get(other_namespace, "key"), 2)
+        self.assertEqual(
+            self.env.cr.cache[TRANSACTION_STATE]["generations"][other_namespace],
+            generation,
+        )
+
+    def test_06_savepoint(self):
+        namespace = "test.lookup.cache.06"
+        self.cache.set(namespace, "kept", 1)
+        with self.assertRaises(ZeroDivisionError):
+            with self.env.cr.savepoint():
+                self.cache.set(namespace, "kept", 2)
+                self.cache.set(namespace, "dropped", 3)
+                self.cache.invalidate(namespace)
+                self.cache.set(namespace, "dropped", 4)
+                raise ZeroDivisionError()
+        # The changes made within the savepoint are undone
+        self.assertEqual(self.cache.get(namespace, "kept"), 1)
+        self.assertIsNone(self.cache.get(namespace, "dropped"))
+        with self.env.cr.savepoint():
+            self.cache.set(namespace, "released", 5)
+        self.assertEqual(self.cache.get(namespace, "released"), 5)
@@ -11,7 +11,10 @@ setuptools.setup(
         'odoo13-addon-account_avatax',
         'odoo13-addon-account_avatax_sale',
         'odoo13-addon-account_fiscal_position_rule',
+        'odoo13-addon-account_fiscal_position_rule_purchase',
         'odoo13-addon-account_fiscal_position_rule_sale',
+        'odoo13-addon-account_fiscal_position_rule_stock',
+        'odoo13-addon-account_lookup_cache',
     ],
     classifiers=[
         'Programming Language :: Python',